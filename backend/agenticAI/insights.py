@@ -28,6 +28,14 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 class TradingInsights(BaseModel):
     insights: List[str] = Field(description="List of trading strategy insights")
 
+def max_drawdown(data):
+    """Peak-to-trough drop of the bar-level equity curve; older reports fall back to the worst trade"""
+    equity_metrics = data.get("equity_metrics") or {}
+    if equity_metrics.get("max_drawdown") is not None:
+        return equity_metrics["max_drawdown"]
+    return abs(min(trade["profit_percentage"] for trade in data["trade_analysis"]["trade_details"]))
+
+
 def get_and_save_insights(data):
     """Generate insights using Groq with Llama 3.1 Versatile"""
     try:
@@ -61,6 +69,14 @@ def get_and_save_insights(data):
         - Average Loss: {average_loss}%
         - Total Return: {total_return}%
 
+        Risk Metrics:
+        - Max Drawdown: {max_drawdown}%
+        - Max Drawdown Duration: {max_drawdown_duration_days} days
+        - Sharpe Ratio: {sharpe_ratio}
+        - Sortino Ratio: {sortino_ratio}
+        - Calmar Ratio: {calmar_ratio}
+        - Exposure: {exposure}% of bars in a position
+
         Trade Analysis:
         - Number of Large Wins: {large_wins}
         - Number of Medium Wins: {medium_wins}
@@ -92,6 +108,7 @@ def get_and_save_insights(data):
         # Format the prompt with metrics data
         basic_metrics = data["basic_metrics"]
         trade_analysis = data["trade_analysis"]["pattern_metrics"]["profit_distribution"]
+        equity_metrics = data.get("equity_metrics") or {}
 
         messages = prompt.format_messages(
             total_trades=basic_metrics["total_trades"],
@@ -103,6 +120,12 @@ def get_and_save_insights(data):
             largest_loss=basic_metrics["largest_loss"],
             average_loss=basic_metrics["average_loss"],
             total_return=basic_metrics["total_return"],
+            max_drawdown=max_drawdown(data),
+            max_drawdown_duration_days=equity_metrics.get("max_drawdown_duration_days", "N/A"),
+            sharpe_ratio=equity_metrics.get("sharpe_ratio", "N/A"),
+            sortino_ratio=equity_metrics.get("sortino_ratio", "N/A"),
+            calmar_ratio=equity_metrics.get("calmar_ratio", "N/A"),
+            exposure=equity_metrics.get("exposure", "N/A"),
             large_wins=trade_analysis["large_wins"],
             medium_wins=trade_analysis["medium_wins"],
             small_wins=trade_analysis["small_wins"],
@@ -141,7 +164,7 @@ def get_and_save_insights(data):
             "average_loss": basic_metrics["average_loss"],
             "risk_reward_ratio": abs(basic_metrics["average_profit"] / basic_metrics["average_loss"]),
             "profit": basic_metrics["total_return"],
-            "max_drawdown": abs(min(trade["profit_percentage"] for trade in data["trade_analysis"]["trade_details"])),
+            "max_drawdown": max_drawdown(data),
             }
 
         report_data = {
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, send_file, request, render_template_string
+from flask import Flask, Response, jsonify, send_file, request, render_template_string
 from flask_cors import CORS
 from auth.routes import auth
 from routes.backtest_routes import backtest_routes, init_routes
@@ -7,6 +7,7 @@ import os
 from datetime import datetime
 from auth.models import Database
 from chatbot.openai import chat_completion
+from backtest.instrumentation import registry
 
 
 app = Flask(__name__)
@@ -106,6 +107,11 @@ def process_data():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    """Backtest pipeline stage timings and throughput in Prometheus text format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/report/<report_id>')
 def get_report(report_id):
     format = request.args.get('format', 'html')
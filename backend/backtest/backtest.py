@@ -1,7 +1,19 @@
 from datetime import datetime
 
-def execute_trade(entry_price, exit_price,entry_time,exit_time):
-    """Execute a trade and calculate the results"""
+def execute_trade(entry_price, exit_price,entry_time,exit_time, exit_reason=None, execution=None):
+    """Execute a trade and calculate the results, net of the execution model's costs if any"""
+    if execution is not None and execution.has_costs:
+        costs = execution.fill(entry_price, exit_price, exit_reason)
+        return {
+            'entry_price': costs['entry_fill'],
+            'exit_price': costs['exit_fill'],
+            'profit_percentage': costs['profit_percentage'],
+            'fee_percentage': costs['fee_percentage'],
+            'entry_time': entry_time,
+            'exit_time': exit_time,
+            'exit_reason': exit_reason
+        }
+
     profit_percentage = ((exit_price - entry_price) / entry_price) * 100
     return {
         'entry_price': entry_price,
@@ -11,29 +23,47 @@ def execute_trade(entry_price, exit_price,entry_time,exit_time):
         'profit_percentage': profit_percentage,
 
         'entry_time': entry_time,
-        'exit_time': exit_time
+        'exit_time': exit_time,
+        'exit_reason': exit_reason
     }
 
     
 
+def iter_rows(df):
+    """Yield each row of df as a plain dict, much cheaper than df.iloc[t]"""
+    columns = list(df.columns)
+    for values in df.itertuples(index=False, name=None):
+        yield dict(zip(columns, values))
+
+
 def backtest_strategy(coin_object, current_data, strategy, verbose=False):
     current_price = current_data['close']
     close_time = current_data['close time']
     # print("ffffffe")
     # Check exit conditions if in position
     if coin_object.position and coin_object.curr_coin == coin_object.name:
-        # print("ffffffe")
-        if strategy.check_exit(current_data, coin_object.entry_price):
-            print("Exiting trade...")
+        exit_reason = None
+        exit_price = current_price
+        # A stop/take-profit touched inside the bar fills before anything at the close
+        if strategy.execution.intrabar:
+            intrabar = strategy.execution.intrabar_exit(
+                strategy.risk_manager, coin_object.entry_price,
+                current_data['open'], current_data['high'], current_data['low']
+            )
+            if intrabar:
+                exit_reason, exit_price = intrabar
+        if exit_reason is None and strategy.check_exit(current_data, coin_object.entry_price):
+            exit_reason = strategy.exit_reason
+
+        if exit_reason is not None:
             trade_result = execute_trade(
                 entry_price=coin_object.entry_price,
-                exit_price=current_price,
+                exit_price=exit_price,
                 entry_time=coin_object.entry_time,
-                exit_time= close_time
-                # stop_loss=coin_object.stop_loss,
-                # take_profit=coin_object.take_profit
+                exit_time= close_time,
+                exit_reason=exit_reason,
+                execution=strategy.execution
             )
-            # print(current_data['sma_20'], trade_result['profit_percentage'])
             coin_object.exit_trade(trade_result, trade_result['profit_percentage'])
             strategy.reset_risk_manager()
             
@@ -41,7 +71,6 @@ def backtest_strategy(coin_object, current_data, strategy, verbose=False):
     if not coin_object.position:
         # print("fsddcds")
         if strategy.check_entry(current_data):
-            print("Entering trade...")
             strategy.risk_manager.initialize_trade(current_price)
             coin_object.enter_trade(current_price,close_time)
             # print("fss")
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from backtest.backtest import iter_rows
+from backtest.candles import KLINE_COLUMNS, arrays_to_frame, klines_to_arrays
+from backtest.log import get_logger
+from backtest.utils import fetch_price_history_by_interval, interval_to_ms
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+def subtract_ranges(start, end, covered):
+    """Return the parts of [start, end] not covered by any of the (sorted, merged) ranges"""
+    missing = []
+    cursor = start
+    for range_start, range_end in covered:
+        if range_end < cursor:
+            continue
+        if range_start > end:
+            break
+        if range_start > cursor:
+            missing.append([cursor, range_start - 1])
+        cursor = max(cursor, range_end + 1)
+        if cursor > end:
+            break
+    if cursor <= end:
+        missing.append([cursor, end])
+    return missing
+
+
+def merge_ranges(ranges):
+    merged = []
+    for range_start, range_end in sorted(ranges):
+        if merged and range_start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+class CandleStore:
+    """
+    Persistent on-disk kline cache, one directory per symbol/interval.
+    Each column is a separate .npy file loaded memory-mapped, and coverage.json
+    records which open-time ranges have already been downloaded, so only the
+    gaps of a requested range are fetched from Binance.
+    """
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    @staticmethod
+    def get_store_dir():
+        """Default store location, overridable with CANDLE_STORE_DIR"""
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.getenv('CANDLE_STORE_DIR', os.path.join(backend_dir, 'data', 'candles'))
+
+    def __init__(self, root=None, fetch=fetch_price_history_by_interval):
+        self.root = root or self.get_store_dir()
+        self.fetch = fetch
+
+    def _dataset_dir(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    @contextmanager
+    def _locked(self, symbol, interval):
+        """Serialize access to one dataset across threads and (on POSIX) processes"""
+        dataset_dir = self._dataset_dir(symbol, interval)
+        os.makedirs(dataset_dir, exist_ok=True)
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(dataset_dir, threading.Lock())
+        with thread_lock:
+            with open(os.path.join(dataset_dir, '.lock'), 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield dataset_dir
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_coverage(self, dataset_dir):
+        path = os.path.join(dataset_dir, 'coverage.json')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def _read_arrays(self, dataset_dir):
+        if not os.path.exists(os.path.join(dataset_dir, 'coverage.json')):
+            return klines_to_arrays([])
+        return {
+            name: np.load(os.path.join(dataset_dir, f"{name.replace(' ', '_')}.npy"), mmap_mode='r')
+            for name, _ in KLINE_COLUMNS
+        }
+
+    def _write(self, dataset_dir, arrays, coverage):
+        # Columns are written to temp files and swapped in with os.replace;
+        # coverage.json goes last so a crash never marks unwritten data as present
+        for name, _ in KLINE_COLUMNS:
+            path = os.path.join(dataset_dir, f"{name.replace(' ', '_')}.npy")
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, arrays[name])
+            os.replace(tmp_path, path)
+        tmp_path = os.path.join(dataset_dir, 'coverage.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(coverage, f)
+        os.replace(tmp_path, os.path.join(dataset_dir, 'coverage.json'))
+
+    def missing_ranges(self, symbol, interval, start_time, end_time):
+        """Open-time ranges within [start_time, end_time] that are not on disk yet"""
+        with self._locked(symbol, interval) as dataset_dir:
+            return subtract_ranges(start_time, end_time, self._read_coverage(dataset_dir))
+
+    def update(self, symbol, interval, start_time, end_time):
+        """Download whatever part of [start_time, end_time] is missing and merge it into the store"""
+        interval_ms = interval_to_ms(interval)
+        # Only candles that have already closed are stored
+        last_closed_open_time = int(time.time() * 1000) - interval_ms
+        end_time = min(end_time, last_closed_open_time)
+        if end_time < start_time:
+            return
+
+        with self._locked(symbol, interval) as dataset_dir:
+            coverage = self._read_coverage(dataset_dir)
+            missing = subtract_ranges(start_time, end_time, coverage)
+            if not missing:
+                return
+
+            fetched = []
+            for range_start, range_end in missing:
+                get_logger().info(f"Fetching {symbol} {interval} candles {range_start} - {range_end}")
+                fetched.append(klines_to_arrays(self.fetch(symbol, interval, range_start, range_end)))
+            new = {name: np.concatenate([arrays[name] for arrays in fetched]) for name, _ in KLINE_COLUMNS}
+            keep = new["open time"] <= end_time
+            new = {name: values[keep] for name, values in new.items()}
+
+            stored = self._read_arrays(dataset_dir)
+            merged = {name: np.concatenate([np.asarray(stored[name]), new[name]]) for name, _ in KLINE_COLUMNS}
+
+            # Sort by open time and drop duplicate candles, keeping the freshest copy
+            order = np.argsort(merged["open time"], kind='stable')
+            open_times = merged["open time"][order]
+            keep = np.ones(len(order), dtype=bool)
+            keep[:-1] = open_times[1:] != open_times[:-1]
+            merged = {name: values[order][keep] for name, values in merged.items()}
+
+            self._write(dataset_dir, merged, merge_ranges(coverage + missing))
+
+    def load(self, symbol, interval, start_time, end_time):
+        """Return memory-mapped column arrays for candles opening within [start_time, end_time]"""
+        self.update(symbol, interval, start_time, end_time)
+        with self._locked(symbol, interval) as dataset_dir:
+            arrays = self._read_arrays(dataset_dir)
+        open_times = arrays["open time"]
+        lo = np.searchsorted(open_times, start_time, side='left')
+        hi = np.searchsorted(open_times, end_time, side='right')
+        return {name: values[lo:hi] for name, values in arrays.items()}
+
+    def get_frame(self, symbol, interval, start_time, end_time):
+        """Drop-in replacement for fetch_price_history_by_interval + transform_data"""
+        df = arrays_to_frame(self.load(symbol, interval, start_time, end_time))
+        get_logger().debug(f"Retrieved {len(df)} {symbol} {interval} candles")
+        return df
+
+    def iter_candles(self, symbol, interval, start_time, end_time):
+        """Yield candles one at a time as row dicts, for feeding streaming indicators"""
+        df = arrays_to_frame(self.load(symbol, interval, start_time, end_time))
+        yield from iter_rows(df)
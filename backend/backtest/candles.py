@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Fields of a raw Binance kline, in payload order
+KLINE_FIELDS = [
+    "open time", "open", "high", "low", "close", "volume",
+    "close time", "quote asset volume", "number of trades",
+    "taker buy base asset volume", "taker buy quote asset volume", "ignore"
+]
+
+# Stored kline columns and their on-disk dtypes (the trailing "ignore" field is not stored)
+KLINE_COLUMNS = [
+    ("open time", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.float64),
+    ("close time", np.int64),
+    ("quote asset volume", np.float64),
+    ("number of trades", np.int64),
+    ("taker buy base asset volume", np.float64),
+    ("taker buy quote asset volume", np.float64),
+]
+
+# In-memory candle frame schema. Prices and volumes stay float64 (conditions compare
+# them against exact thresholds), trade counts fit int32, and times are epoch-ms
+# int64 viewed as datetime64[ms].
+FRAME_DTYPES = {
+    "open time": "datetime64[ms]",
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+    "close time": "datetime64[ms]",
+    "quote asset volume": np.float64,
+    "number of trades": np.int32,
+    "taker buy base asset volume": np.float64,
+    "taker buy quote asset volume": np.float64,
+}
+
+
+def parse_klines_json(text):
+    """
+    Parse a /api/v3/klines response body straight into an (n, 12) float64 array.
+    Every field is numeric (prices arrive as quoted strings), so numpy converts
+    the decoded rows in one call instead of building a list per candle.
+    Raises ValueError for bodies that aren't complete kline rows.
+    """
+    try:
+        klines = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"Malformed klines response: {str(e)}")
+    if not isinstance(klines, list):
+        raise ValueError(f"Expected a list of klines, got: {text[:200]}")
+    if not klines:
+        return np.empty((0, len(KLINE_FIELDS)))
+    try:
+        values = np.array(klines, dtype=float)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Klines response has non-numeric or ragged rows: {str(e)}")
+    if values.ndim != 2 or values.shape[1] != len(KLINE_FIELDS):
+        raise ValueError(f"Expected klines with {len(KLINE_FIELDS)} fields, got shape {values.shape}")
+    return values
+
+
+def klines_to_arrays(klines):
+    """Convert klines (parsed (n, 12) array or raw list of lists) into one typed array per column"""
+    if len(klines) == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in KLINE_COLUMNS}
+    if not isinstance(klines, np.ndarray):
+        klines = np.array([kline[:len(KLINE_COLUMNS)] for kline in klines], dtype=object)
+    return {
+        name: klines[:, i].astype(dtype)
+        for i, (name, dtype) in enumerate(KLINE_COLUMNS)
+    }
+
+
+def arrays_to_frame(arrays):
+    """Candle dataframe in the compact FRAME_DTYPES schema from stored column arrays"""
+    return pd.DataFrame({
+        name: np.asarray(arrays[name]).astype(dtype, copy=False)
+        for name, dtype in FRAME_DTYPES.items()
+    })
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from backtest.strategy import Strategy
+from backtest.resample import add_all_indicators, load_frame
+
+
+def parse_time_range(config):
+    """start_date/end_date from the config as epoch milliseconds"""
+    try:
+        start_date_object = datetime.strptime(config['start_date'], "%Y-%m-%d")
+        end_date_object = datetime.strptime(config['end_date'], "%Y-%m-%d")
+    except Exception as e:
+        raise ValueError(f"Invalid date format: {str(e)}")
+
+    start_time = int(start_date_object.timestamp()) * 1000
+    end_time = int(end_date_object.timestamp()) * 1000
+    return start_time, end_time
+
+
+def load_indicator_frame(config, candle_store, symbol=None, required=None):
+    """Candles for the config's range and interval with the indicators its strategy uses (or required)"""
+    start_time, end_time = parse_time_range(config)
+    symbol = (symbol or config['ticker']).upper()
+    df = load_frame(config, candle_store, symbol, start_time, end_time)
+    if required is None:
+        required = Strategy(config).required_columns()
+    return add_all_indicators(df, config, required, candle_store, symbol, start_time, end_time)
@@ -0,0 +1,311 @@
+"""
+Differential testing of backtest engines against the reference row-by-row
+backtest_strategy loop: random strategy configs are run through both on the
+same candles, and trade lists and report metrics must match.
+
+    cd backend && python -m backtest.differential --configs 200 --seed 0
+    cd backend && python -m backtest.differential --symbol BTCUSDT --interval 1h --start 2024-01-01 --end 2024-06-01
+
+Candles come from data/CLVUSDT.csv or the local candle store, never the network.
+"""
+import argparse
+import copy
+import functools
+import io
+import json
+import math
+import os
+import random
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest.backtest import backtest_strategy, iter_rows
+from backtest.candles import FRAME_DTYPES
+from backtest.forward import ForwardTester, ReplayCandleStream
+from backtest.kernels import HAS_NUMBA
+from backtest.log import TradeEventBuffer
+from backtest.main import BacktestContext, Coin
+from backtest.portfolio import PortfolioData, run_portfolio_backtest
+from backtest.report_generator import ReportGenerator
+from backtest.strategy import OPERATORS, Strategy
+from backtest.utils import IndicatorCalculator
+from backtest.vectorized import run_vectorized_backtest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLV_PATH = os.path.join(os.path.dirname(BACKEND_DIR), 'data', 'CLVUSDT.csv')
+
+# Condition operands: IndicatorCalculator's base columns plus a few parameterized ones
+PARAMETERIZED_COLUMNS = ['sma_7', 'ema_12', 'ema_26', 'rsi_7', 'atr_wilder_14', 'roc', 'macd', 'macd_signal', 'macd_hist']
+# '==' on floats almost never fires, so it is left out of the random operators
+RANDOM_OPERATORS = [operator for operator in OPERATORS if operator != '==']
+# Relative tolerance for prices, profits and report metrics
+DEFAULT_TOLERANCE = 1e-9
+
+
+def new_coin(df, config):
+    """Coin with its own run state; trade events are not logged"""
+    context = BacktestContext(events=TradeEventBuffer('WARNING'))
+    return Coin(config.get('ticker', ''), config.get('ticker', '').upper(), df, context)
+
+
+def run_reference(df, config):
+    """Trades of the reference engine: backtest_strategy over every row"""
+    coin = new_coin(df, config)
+    strategy = Strategy(config)
+    for row in iter_rows(df):
+        backtest_strategy(coin, row, strategy)
+    return coin.context.all_trades
+
+
+def run_vectorized(df, config, implementation=None):
+    coin = new_coin(df, config)
+    run_vectorized_backtest(coin, Strategy(config), implementation)
+    return coin.context.all_trades
+
+
+def run_portfolio(df, config):
+    """The portfolio engine with the frame as its only symbol, so every trade gets the full equity"""
+    strategy = Strategy(config)
+    fields = strategy.required_columns() | {'open', 'high', 'low'}
+    data = PortfolioData.from_frames({config.get('ticker', '').upper(): df}, fields)
+    result = run_portfolio_backtest(data, config)
+    # Position sizing fields have no counterpart in the single-symbol trade log
+    return [
+        {key: value for key, value in trade.items() if key not in ('symbol', 'allocation', 'pnl')}
+        for trade in result["all_trades"]
+    ]
+
+
+def run_forward(df, config):
+    """ForwardTester replaying the frame's candles, with indicators from the incremental engine"""
+    candles = df[list(FRAME_DTYPES)]
+    tester = ForwardTester()
+    runner = tester.add_strategy('differential', config, ReplayCandleStream(candles, config.get('ticker', ''), 'replay'))
+    tester.start()
+    tester.join()
+    return runner.trades
+
+
+# Fast engines under test: name -> function(indicator frame, config) -> trades
+ENGINES = {
+    'vectorized': run_vectorized,
+    'vectorized_python': functools.partial(run_vectorized, implementation='python'),
+    'vectorized_numpy': functools.partial(run_vectorized, implementation='numpy'),
+    'portfolio': run_portfolio,
+    'forward': run_forward,
+}
+if HAS_NUMBA:
+    ENGINES['vectorized_compiled'] = functools.partial(run_vectorized, implementation='compiled')
+
+
+def load_candles(symbol=None, interval=None, start=None, end=None, candle_store=None):
+    """
+    The bundled CLVUSDT candles, or a range already in the local candle store.
+    The store is opened without a fetch function, so a missing range fails instead of downloading.
+    """
+    if symbol is None:
+        df = pd.read_csv(CLV_PATH)
+        df['open time'] = pd.to_datetime(df['open time'])
+        df['close time'] = pd.to_datetime(df['close time'])
+        # Same dtypes (int32 trade counts) as frames served by the candle store
+        return df[list(FRAME_DTYPES)].astype(FRAME_DTYPES)
+
+    from backtest.candle_store import CandleStore
+    from backtest.data import parse_time_range
+
+    def offline_fetch(symbol, interval, start_time, end_time):
+        raise RuntimeError(f"{symbol} {interval} {start_time} - {end_time} is not in the local candle store")
+
+    store = candle_store or CandleStore(fetch=offline_fetch)
+    start_time, end_time = parse_time_range({"start_date": start, "end_date": end})
+    return store.get_frame(symbol, interval, start_time, end_time)
+
+
+def indicator_frame(candles):
+    """Candles with every column random configs may reference"""
+    calculator = IndicatorCalculator(cache=None)
+    df = calculator.add_indicators(candles.copy())
+    return calculator.add_indicators(df, required=PARAMETERIZED_COLUMNS)
+
+
+def condition_columns(df):
+    return [
+        column for column in df.columns
+        if column not in ('open time', 'close time') and df[column].dtype.kind in 'fiu'
+    ]
+
+
+def random_condition(rng, df, columns):
+    """lhs vs another column, or vs a threshold drawn from the lhs column's own distribution"""
+    lhs = rng.choice(columns)
+    if rng.random() < 0.4:
+        rhs = {"type": "indicator", "indicator": rng.choice(columns)}
+    else:
+        values = df[lhs].to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        threshold = float(np.quantile(values, rng.uniform(0.05, 0.95))) if len(values) else 0.0
+        rhs = {"type": "number_input", "value": round(threshold, 6)}
+    return {"lhs": lhs, "operator": rng.choice(RANDOM_OPERATORS), "rhs": rhs}
+
+
+def random_conditions(rng, df, columns, min_groups):
+    return [
+        [random_condition(rng, df, columns) for _ in range(rng.randint(1, 3))]
+        for _ in range(rng.randint(min_groups, 3))
+    ]
+
+
+def random_risk_management(rng):
+    """Any subset of fixed and trailing rules, with fractional percentages"""
+    risk_management = {}
+    if rng.random() < 0.5:
+        risk_management['stop_loss'] = {"type": "fixed", "value": rng.choice([0.5, 1, 2, 3.5]), "sign": "%"}
+    if rng.random() < 0.5:
+        risk_management['take_profit'] = {"type": "fixed", "value": rng.choice([1, 2.5, 5, 10]), "sign": "%"}
+    for key in ('trailing_stop_loss', 'trailing_take_profit'):
+        if rng.random() < 0.4:
+            risk_management[key] = {
+                "type": "trailing",
+                "activation": {"value": rng.choice([0.5, 1, 2, 3]), "sign": "%"},
+                "callback": {"value": rng.choice([0.5, 1, 1.5, 2]), "sign": "%"},
+            }
+    return risk_management
+
+
+def random_execution(rng):
+    return rng.choice([
+        {},
+        {"taker_fee": 0.1, "maker_fee": 0.02, "slippage": 0.05},
+        {"intrabar": True},
+        {"intrabar": True, "taker_fee": 0.04, "maker_fee": 0.02, "slippage": 0.01},
+    ])
+
+
+def random_config(rng, df, columns):
+    return {
+        "ticker": "diff",
+        "entry_conditions": random_conditions(rng, df, columns, 1),
+        "exit_conditions": random_conditions(rng, df, columns, 0),
+        "risk_management": random_risk_management(rng),
+        "execution": random_execution(rng),
+    }
+
+
+def close_enough(expected, actual, tolerance):
+    if isinstance(expected, float) or isinstance(actual, float):
+        if expected is None or actual is None:
+            return expected is actual
+        if math.isnan(expected) and math.isnan(actual):
+            return True
+        return math.isclose(expected, actual, rel_tol=tolerance, abs_tol=tolerance)
+    return expected == actual
+
+
+def diff_values(expected, actual, path='', tolerance=DEFAULT_TOLERANCE):
+    """Differences between two nested dicts/lists of report values, numbers compared within tolerance"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in expected.keys() | actual.keys():
+            if key not in expected or key not in actual:
+                diffs.append(f"{path}.{key}: only in {'reference' if key in expected else 'engine'}")
+            else:
+                diffs.extend(diff_values(expected[key], actual[key], f"{path}.{key}", tolerance))
+        return diffs
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        if len(expected) != len(actual):
+            return [f"{path}: {len(expected)} items vs {len(actual)}"]
+        diffs = []
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            diffs.extend(diff_values(a, b, f"{path}[{i}]", tolerance))
+        return diffs
+    if isinstance(expected, np.generic):
+        expected = expected.item()
+    if isinstance(actual, np.generic):
+        actual = actual.item()
+    if not close_enough(expected, actual, tolerance):
+        return [f"{path}: {expected!r} vs {actual!r}"]
+    return []
+
+
+def diff_trades(expected, actual, tolerance=DEFAULT_TOLERANCE):
+    """Trade-by-trade differences; times and exit reasons must match exactly"""
+    if len(expected) != len(actual):
+        first = next(
+            (i for i, (a, b) in enumerate(zip(expected, actual)) if a['entry_time'] != b['entry_time']),
+            min(len(expected), len(actual))
+        )
+        return [f"{len(expected)} trades vs {len(actual)}, first divergence at trade {first}"]
+    return diff_values(expected, actual, 'trades', tolerance)
+
+
+def diff_reports(expected, actual, tolerance=DEFAULT_TOLERANCE):
+    """Differences between the full reports generated from two trade lists"""
+    with redirect_stdout(io.StringIO()):
+        expected_report = ReportGenerator(expected, initial_balance=1).generate_full_report()
+        actual_report = ReportGenerator(actual, initial_balance=1).generate_full_report()
+    return diff_values(expected_report, actual_report, 'report', tolerance)
+
+
+def compare_engine(df, config, engine, tolerance=DEFAULT_TOLERANCE):
+    """(reference trades, differences) for one config on one fast engine"""
+    with redirect_stdout(io.StringIO()):
+        expected = run_reference(df, copy.deepcopy(config))
+        actual = ENGINES[engine](df, copy.deepcopy(config))
+    diffs = diff_trades(expected, actual, tolerance)
+    if not diffs:
+        diffs = diff_reports(expected, actual, tolerance)
+    return expected, diffs
+
+
+def run_differential(df, n_configs=100, seed=0, engines=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Run n_configs random configs through the reference loop and each engine on
+    an indicator frame. Returns a summary with every failing config and its diffs.
+    """
+    rng = random.Random(seed)
+    columns = condition_columns(df)
+    engines = engines or list(ENGINES)
+    failures = []
+    trades = 0
+    for i in range(n_configs):
+        config = random_config(rng, df, columns)
+        for engine in engines:
+            expected, diffs = compare_engine(df, config, engine, tolerance)
+            trades += len(expected)
+            if diffs:
+                failures.append({"index": i, "engine": engine, "config": config, "diffs": diffs[:20]})
+    return {"configs": n_configs, "engines": engines, "seed": seed, "reference_trades": trades, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential test of fast backtest engines against the reference loop")
+    parser.add_argument('--configs', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=None)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--symbol', help="Use cached candle store data instead of data/CLVUSDT.csv")
+    parser.add_argument('--interval', default='1h')
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default=datetime.utcnow().strftime('%Y-%m-%d'))
+    args = parser.parse_args()
+
+    candles = load_candles(args.symbol, args.interval, args.start, args.end) if args.symbol else load_candles()
+    with redirect_stdout(io.StringIO()):
+        df = indicator_frame(candles)
+    result = run_differential(df, args.configs, args.seed, args.engines, args.tolerance)
+    for failure in result["failures"]:
+        print(f"Config {failure['index']} differs on {failure['engine']}:")
+        print(json.dumps(failure["config"], indent=2))
+        for diff in failure["diffs"]:
+            print(f"  {diff}")
+    print(f"{result['configs']} configs, {result['reference_trades']} reference trades, "
+          f"{len(result['failures'])} failures")
+    if result["failures"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
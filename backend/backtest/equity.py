@@ -0,0 +1,126 @@
+import numpy as np
+
+MS_PER_YEAR = 365 * 24 * 3600 * 1000
+# Points kept in the report's equity curve
+CURVE_POINTS = 500
+
+
+def trade_bars(close_times, trades, open_entry_time=None):
+    """
+    Bar indices of each trade's entry and exit, found from the trade close times.
+    A still-open trade (open_entry_time) is held until the last bar.
+    """
+    close_times = np.asarray(close_times, dtype='datetime64[ns]')
+    entry_times = [trade['entry_time'] for trade in trades]
+    exit_times = [trade['exit_time'] for trade in trades]
+    if open_entry_time is not None:
+        entry_times.append(open_entry_time)
+    entries = np.searchsorted(close_times, np.array(entry_times, dtype='datetime64[ns]'))
+    exits = np.searchsorted(close_times, np.array(exit_times, dtype='datetime64[ns]'))
+    if open_entry_time is not None:
+        exits = np.append(exits, len(close_times) - 1)
+    return entries, exits
+
+
+def holding_mask(n_bars, entries, exits):
+    """True on bars whose close-to-close return belongs to a trade (entry+1 .. exit)"""
+    # +1 where a holding starts, -1 after it ends; a running sum marks the held bars
+    change = np.zeros(n_bars + 1, dtype=np.int64)
+    np.add.at(change, entries + 1, 1)
+    np.add.at(change, exits + 1, -1)
+    return np.cumsum(change[:n_bars]) > 0
+
+
+def equity_curve(close, entries, exits, initial_balance=1, trade_returns=None):
+    """
+    Mark-to-market equity on every bar for a strategy fully invested while in a trade.
+    trade_returns (% per closed trade) lets the exit bar absorb fees, slippage and
+    intrabar fills, so equity at each exit matches the trade log.
+    """
+    close = np.asarray(close, dtype=float)
+    held = holding_mask(len(close), entries, exits)
+    bar_returns = np.zeros(len(close))
+    bar_returns[1:] = close[1:] / close[:-1] - 1
+    growth = 1 + np.where(held, bar_returns, 0)
+    if trade_returns is not None and len(trade_returns):
+        closed = len(trade_returns)
+        entry_bars, exit_bars = entries[:closed], exits[:closed]
+        growth[exit_bars] *= (1 + np.asarray(trade_returns, dtype=float) / 100) / (close[exit_bars] / close[entry_bars])
+    return initial_balance * np.cumprod(growth), held
+
+
+def periods_per_year(close_times):
+    """Bars per year from the median bar spacing (crypto trades around the clock)"""
+    close_times = np.asarray(close_times, dtype='datetime64[ms]').astype(np.int64)
+    if len(close_times) < 2:
+        return 0
+    spacing = np.median(np.diff(close_times))
+    return MS_PER_YEAR / spacing if spacing > 0 else 0
+
+
+def drawdown_stats(equity):
+    """Max drawdown (%) and the longest stretch of bars spent below a previous peak"""
+    peaks = np.maximum.accumulate(equity)
+    drawdown = equity / peaks - 1
+    bars = np.arange(len(equity))
+    last_peak = np.maximum.accumulate(np.where(equity >= peaks, bars, 0))
+    underwater = bars - last_peak
+    return -drawdown.min() * 100, int(underwater.max()), drawdown
+
+
+def equity_metrics(equity, close_times, held, traded_value=0.0):
+    """
+    Risk-adjusted metrics from a bar-level equity curve.
+    traded_value is the total notional bought and sold, for turnover.
+    """
+    if len(equity) < 2:
+        return {}
+    ppy = periods_per_year(close_times)
+    returns = equity[1:] / equity[:-1] - 1
+    max_drawdown, drawdown_bars, _ = drawdown_stats(equity)
+
+    std = returns.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    total_return = equity[-1] / equity[0] - 1
+    years = len(returns) / ppy if ppy else 0
+    cagr = (equity[-1] / equity[0]) ** (1 / years) - 1 if years and equity[-1] > 0 else None
+    bar_ms = MS_PER_YEAR / ppy if ppy else 0
+
+    return {
+        "total_return": round(total_return * 100, 2),
+        "cagr": round(cagr * 100, 2) if cagr is not None else None,
+        "max_drawdown": round(max_drawdown, 2),
+        "max_drawdown_duration_bars": drawdown_bars,
+        "max_drawdown_duration_days": round(drawdown_bars * bar_ms / 86_400_000, 2),
+        "sharpe_ratio": round(returns.mean() / std * np.sqrt(ppy), 2) if std > 0 else None,
+        "sortino_ratio": round(returns.mean() / downside * np.sqrt(ppy), 2) if downside > 0 else None,
+        "calmar_ratio": round(cagr * 100 / max_drawdown, 2) if cagr is not None and max_drawdown > 0 else None,
+        "exposure": round(held.mean() * 100, 2),
+        "turnover": round(traded_value / equity.mean(), 2),
+    }
+
+
+def downsample_curve(close_times, equity, points=CURVE_POINTS):
+    """At most points evenly spaced bars (always keeping the last one) for charting"""
+    if len(equity) == 0:
+        return []
+    indices = np.unique(np.linspace(0, len(equity) - 1, min(points, len(equity))).astype(np.int64))
+    times = np.datetime_as_string(np.asarray(close_times, dtype='datetime64[ms]')[indices], unit='s')
+    return [
+        {"time": time, "equity": round(float(value), 6)}
+        for time, value in zip(times.tolist(), equity[indices].tolist())
+    ]
+
+
+def single_symbol_equity(df, trades, open_entry_time=None, initial_balance=1):
+    """Equity curve report section for one symbol's trades on its indicator frame"""
+    close_times = df['close time'].to_numpy()
+    entries, exits = trade_bars(close_times, trades, open_entry_time)
+    trade_returns = [trade['profit_percentage'] for trade in trades]
+    equity, held = equity_curve(df['close'].to_numpy(dtype=float), entries, exits, initial_balance, trade_returns)
+    # Fully invested: each trade buys with the equity at entry and sells at the equity at exit
+    traded_value = equity[entries].sum() + equity[exits[:len(trades)]].sum()
+    return {
+        "metrics": equity_metrics(equity, close_times, held, traded_value),
+        "curve": downsample_curve(close_times, equity)
+    }
@@ -0,0 +1,60 @@
+# Exits filled by a resting limit order (maker); everything else crosses the spread (taker)
+MAKER_EXITS = ('take_profit',)
+
+
+class ExecutionModel:
+    """
+    Fees, slippage and intrabar stop/take-profit fills, from the config's "execution" block:
+    {"maker_fee": 0.02, "taker_fee": 0.1, "slippage": 0.05, "intrabar": true} (fees and slippage in %).
+    With the defaults (all zero, intrabar off) trades fill at the close exactly as before.
+    """
+    def __init__(self, config):
+        self.maker_fee = float(config.get('maker_fee', 0)) / 100
+        self.taker_fee = float(config.get('taker_fee', 0)) / 100
+        self.slippage = float(config.get('slippage', 0)) / 100
+        # Check fixed stop-loss/take-profit against each bar's low/high instead of its close
+        self.intrabar = bool(config.get('intrabar', False))
+        if min(self.maker_fee, self.taker_fee, self.slippage) < 0:
+            raise ValueError("Execution fees and slippage can't be negative")
+        self.has_costs = bool(self.maker_fee or self.taker_fee or self.slippage)
+
+    def levels(self, risk_manager, entry_price):
+        """Fixed stop-loss and take-profit prices for a trade (None when not configured)"""
+        stop_price = entry_price * (1 - risk_manager.stop_loss_pct/100) if risk_manager.stop_loss else None
+        take_profit_price = entry_price * (1 + risk_manager.take_profit_pct/100) if risk_manager.take_profit else None
+        return stop_price, take_profit_price
+
+    def intrabar_exit(self, risk_manager, entry_price, bar_open, high, low):
+        """
+        (reason, fill price) if this bar's range crossed the stop or take-profit, else None.
+        Fills are at the level itself, or at the open when the bar gapped through it.
+        When both levels are inside the range the stop is assumed to have hit first.
+        """
+        stop_price, take_profit_price = self.levels(risk_manager, entry_price)
+        if stop_price is not None and low <= stop_price:
+            return 'stop_loss', min(bar_open, stop_price)
+        if take_profit_price is not None and high >= take_profit_price:
+            return 'take_profit', max(bar_open, take_profit_price)
+        return None
+
+    def entry_cost(self, entry_price):
+        """Cash spent per unit bought at entry_price, slippage and taker fee included"""
+        return entry_price * (1 + self.slippage) * (1 + self.taker_fee)
+
+    def fill(self, entry_price, exit_price, exit_reason=None):
+        """Slipped fill prices, fees (% of the entry fill) and the net profit % for one round trip"""
+        entry_fill = entry_price * (1 + self.slippage)
+        entry_cost = self.entry_cost(entry_price)
+        if exit_reason in MAKER_EXITS and self.intrabar:
+            exit_fill = exit_price
+            exit_fee = self.maker_fee
+        else:
+            exit_fill = exit_price * (1 - self.slippage)
+            exit_fee = self.taker_fee
+        exit_proceeds = exit_fill * (1 - exit_fee)
+        return {
+            "entry_fill": entry_fill,
+            "exit_fill": exit_fill,
+            "fee_percentage": (entry_fill * self.taker_fee + exit_fill * exit_fee) / entry_fill * 100,
+            "profit_percentage": ((exit_proceeds - entry_cost) / entry_cost) * 100
+        }
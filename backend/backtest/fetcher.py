@@ -0,0 +1,175 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from backtest.candles import KLINE_FIELDS, parse_klines_json
+
+
+BASE_URL = "https://api.binance.com"
+
+# Binance kline interval lengths in milliseconds ("1M" is approximated as 31 days)
+INTERVAL_MS = {
+    "1s": 1000,
+    "1m": 60_000, "3m": 3 * 60_000, "5m": 5 * 60_000, "15m": 15 * 60_000, "30m": 30 * 60_000,
+    "1h": 3_600_000, "2h": 2 * 3_600_000, "4h": 4 * 3_600_000, "6h": 6 * 3_600_000,
+    "8h": 8 * 3_600_000, "12h": 12 * 3_600_000,
+    "1d": 86_400_000, "3d": 3 * 86_400_000, "1w": 7 * 86_400_000, "1M": 31 * 86_400_000,
+}
+
+def interval_to_ms(interval):
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Unsupported interval: {interval}. Must be one of {list(INTERVAL_MS)}")
+
+
+class RateLimiter:
+    """
+    Token bucket over Binance request weight.
+    Tokens refill continuously at capacity per minute, and the bucket is
+    re-synced from the X-MBX-USED-WEIGHT-1M header the server returns.
+    """
+    def __init__(self, capacity=5000, period=60.0):
+        self.capacity = capacity
+        self.refill_rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def acquire(self, weight=1):
+        """Block until weight tokens are available, then take them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = max(self.blocked_until - now, (weight - self.tokens) / self.refill_rate)
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """Never assume more budget than the server says is left this minute"""
+        used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('x-mbx-used-weight-1m')
+        if used is None:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, self.capacity - int(used))
+
+    def back_off(self, seconds):
+        """Stop handing out tokens for a while (HTTP 429/418 with Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class KlineFetcher:
+    """
+    Downloads a kline range as precomputed 1000-candle windows in parallel
+    through one pooled session, throttled by a shared RateLimiter.
+    """
+    LIMIT = 1000
+    # Request weight of /api/v3/klines with limit=1000
+    WEIGHT = 2
+    MAX_RETRIES = 5
+
+    def __init__(self, max_workers=8, limiter=None, base_url=BASE_URL):
+        self.max_workers = max_workers
+        self.limiter = limiter or RateLimiter()
+        self.url = f"{base_url}/api/v3/klines"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def windows(self, interval, start_time, end_time):
+        """Split [start_time, end_time] into windows holding at most LIMIT candles each"""
+        step = self.LIMIT * interval_to_ms(interval)
+        return [
+            (window_start, min(window_start + step - 1, end_time))
+            for window_start in range(start_time, end_time + 1, step)
+        ]
+
+    def fetch_window(self, symbol, interval, start_time, end_time):
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": start_time,
+            "endTime": end_time,
+            "limit": self.LIMIT,
+        }
+        for attempt in range(self.MAX_RETRIES):
+            self.limiter.acquire(self.WEIGHT)
+            response = self.session.get(self.url, params=params)
+            self.limiter.update_from_headers(response.headers)
+            if response.status_code in (418, 429):
+                retry_after = int(response.headers.get('Retry-After', 2 ** attempt))
+                print(f"Rate limited by Binance, retrying in {retry_after}s")
+                self.limiter.back_off(retry_after)
+                continue
+            response.raise_for_status()
+            return parse_klines_json(response.text)
+        # Still rate limited after every retry
+        response.raise_for_status()
+
+    def fetch_sequential(self, symbol, interval, start_time, end_time=None):
+        """Page by the previous close time; used when window bounds can't be precomputed"""
+        pages = []
+        while True:
+            params = {
+                "symbol": symbol,
+                "interval": interval,
+                "startTime": start_time,
+                "limit": self.LIMIT,
+            }
+            if end_time:
+                params["endTime"] = end_time
+            self.limiter.acquire(self.WEIGHT)
+            response = self.session.get(self.url, params=params)
+            self.limiter.update_from_headers(response.headers)
+            response.raise_for_status()
+            data = parse_klines_json(response.text)
+            if not len(data):
+                break
+            pages.append(data)
+            start_time = int(data[-1, 6]) + 1
+            if end_time and start_time >= end_time:
+                break
+        return np.concatenate(pages) if pages else np.empty((0, len(KLINE_FIELDS)))
+
+    def fetch(self, symbol, interval, start_time, end_time=None):
+        """
+        Fetch every kline opening within [start_time, end_time], ordered and
+        de-duplicated, as an (n, 12) float64 array in kline field order
+        """
+        # Calendar months have no fixed length, so their pages can't be precomputed
+        if interval == "1M":
+            return self.fetch_sequential(symbol, interval, start_time, end_time)
+        if end_time is None:
+            end_time = int(time.time() * 1000)
+
+        windows = self.windows(interval, start_time, end_time)
+        print(f"Fetching {len(windows)} pages of {symbol} {interval} klines...")
+        if len(windows) == 1:
+            pages = [self.fetch_window(symbol, interval, *windows[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(windows))) as pool:
+                pages = list(pool.map(lambda window: self.fetch_window(symbol, interval, *window), windows))
+
+        # Pages come back in window order; drop any candle repeated on a page boundary
+        klines = np.concatenate(pages)
+        if len(klines) < 2:
+            return klines
+        open_times = klines[:, 0]
+        latest_before = np.maximum.accumulate(open_times)[:-1]
+        return klines[np.r_[True, open_times[1:] > latest_before]]
@@ -0,0 +1,300 @@
+import json
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from backtest.backtest import backtest_strategy, iter_rows
+from backtest.fetcher import interval_to_ms
+from backtest.main import BacktestContext, Coin
+from backtest.streaming import IncrementalIndicatorEngine
+from backtest.strategy import Strategy
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443/ws"
+
+
+class ReplayCandleStream:
+    """
+    Replays closed candles from a CSV in transform_data's layout (e.g. data/CLVUSDT.csv),
+    or from a candle dataframe already in memory
+    """
+    def __init__(self, path, symbol, interval, delay=0):
+        self.path = path
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.delay = delay
+
+    def __iter__(self):
+        if isinstance(self.path, pd.DataFrame):
+            df = self.path
+        else:
+            df = pd.read_csv(self.path)
+            df['open time'] = pd.to_datetime(df['open time'])
+            df['close time'] = pd.to_datetime(df['close time'])
+        for candle in iter_rows(df):
+            yield candle
+            if self.delay:
+                time.sleep(self.delay)
+
+
+def parse_ws_kline(kline):
+    """Binance websocket kline payload ("k" field) to a candle dict like transform_data's rows"""
+    return {
+        'open time': pd.to_datetime(kline['t'], unit='ms'),
+        'open': float(kline['o']),
+        'high': float(kline['h']),
+        'low': float(kline['l']),
+        'close': float(kline['c']),
+        'volume': float(kline['v']),
+        'close time': pd.to_datetime(kline['T'], unit='ms'),
+        'quote asset volume': float(kline['q']),
+        'number of trades': int(kline['n']),
+        'taker buy base asset volume': float(kline['V']),
+        'taker buy quote asset volume': float(kline['Q']),
+    }
+
+
+def parse_rest_kline(kline):
+    """Row of a parsed /api/v3/klines array (see parse_klines_json) to the same candle dict as parse_ws_kline"""
+    return {
+        'open time': pd.to_datetime(int(kline[0]), unit='ms'),
+        'open': float(kline[1]),
+        'high': float(kline[2]),
+        'low': float(kline[3]),
+        'close': float(kline[4]),
+        'volume': float(kline[5]),
+        'close time': pd.to_datetime(int(kline[6]), unit='ms'),
+        'quote asset volume': float(kline[7]),
+        'number of trades': int(kline[8]),
+        'taker buy base asset volume': float(kline[9]),
+        'taker buy quote asset volume': float(kline[10]),
+    }
+
+
+class BinanceKlineStream:
+    """
+    Live Binance kline websocket feed yielding each candle once it has closed.
+    Dropped connections are reopened with exponential backoff, and candles that
+    closed while disconnected are fetched over REST before live ones resume,
+    so strategies never skip a bar.
+    """
+    # Seconds between reconnect attempts, doubling up to MAX_BACKOFF
+    MIN_BACKOFF = 1
+    MAX_BACKOFF = 60
+
+    def __init__(self, symbol, interval, url=BINANCE_WS_URL, fetcher=None):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.url = f"{url}/{symbol.lower()}@kline_{interval}"
+        # KlineFetcher used for backfills; the shared rate-limited one by default
+        self.fetcher = fetcher
+        # Open time (ms) of the last candle yielded, so nothing is yielded twice
+        self.last_open_time = None
+
+    def backfill(self):
+        """Candles that closed after the last yielded one, as (open time ms, candle) pairs"""
+        if self.last_open_time is None:
+            return []
+        if self.fetcher is None:
+            from backtest.utils import kline_fetcher
+            self.fetcher = kline_fetcher
+        now = int(time.time() * 1000)
+        klines = self.fetcher.fetch(self.symbol, self.interval, self.last_open_time + interval_to_ms(self.interval), now)
+        # The newest kline is usually still open
+        return [(int(kline[0]), parse_rest_kline(kline)) for kline in klines if kline[6] < now]
+
+    def __iter__(self):
+        try:
+            import websocket
+        except ImportError:
+            raise ImportError("BinanceKlineStream requires the websocket-client package")
+
+        backoff = self.MIN_BACKOFF
+        while True:
+            connection = None
+            try:
+                connection = websocket.create_connection(self.url)
+                # Connected before backfilling, so candles closing meanwhile arrive on the socket
+                for open_time, candle in self.backfill():
+                    if open_time > self.last_open_time:
+                        self.last_open_time = open_time
+                        yield candle
+                backoff = self.MIN_BACKOFF
+                while True:
+                    message = json.loads(connection.recv())
+                    kline = message.get('k')
+                    # Intermediate updates of the still-open candle are ignored
+                    if kline and kline.get('x') and (self.last_open_time is None or kline['t'] > self.last_open_time):
+                        self.last_open_time = kline['t']
+                        yield parse_ws_kline(kline)
+            except (websocket.WebSocketException, OSError, ValueError) as e:
+                # OSError covers socket errors and failed REST backfills, ValueError bad payloads
+                print(f"Binance kline stream {self.symbol} {self.interval} failed: {str(e)}, reconnecting in {backoff}s")
+            finally:
+                if connection is not None:
+                    connection.close()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+
+class StrategyRunner:
+    """One forward-tested strategy: its compiled Strategy plus its own position state"""
+    def __init__(self, strategy_id, config):
+        self.strategy_id = strategy_id
+        self.config = config
+        self.strategy = Strategy(config)
+        self.coin = Coin(config['ticker'], config['ticker'].upper(), None, BacktestContext())
+
+    @property
+    def trades(self):
+        return self.coin.context.all_trades
+
+    def on_candle(self, values):
+        """Evaluate one closed candle and return the trade events it produced"""
+        was_in_position = self.coin.position
+        n_trades = len(self.trades)
+        backtest_strategy(self.coin, values, self.strategy)
+
+        events = []
+        if len(self.trades) > n_trades:
+            events.append(self._event('exit', values, trade=self.trades[-1]))
+        if self.coin.position and (not was_in_position or len(self.trades) > n_trades):
+            events.append(self._event('entry', values, price=self.coin.entry_price))
+        return events
+
+    def _event(self, kind, values, **fields):
+        return {
+            "type": kind,
+            "strategy_id": self.strategy_id,
+            "symbol": self.coin.pair,
+            "time": values['close time'],
+            **fields
+        }
+
+
+class Feed:
+    """A candle stream shared by every strategy trading the same symbol, interval and custom indicators"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.runners = []
+        self.engine = None
+        self.latest_latency = 0.0
+        self.max_latency = 0.0
+        self.candles = 0
+
+    def build_engine(self):
+        required = set()
+        for runner in self.runners:
+            required.update(runner.strategy.required_columns())
+        self.engine = IncrementalIndicatorEngine(required, self.runners[0].config.get('custom_indicators'))
+
+    def process(self, candle):
+        """Update indicators once, then evaluate every strategy on the new values"""
+        started = time.perf_counter()
+        values = self.engine.update(candle)
+        events = []
+        for runner in self.runners:
+            events.extend(runner.on_candle(values))
+        self.latest_latency = time.perf_counter() - started
+        self.max_latency = max(self.max_latency, self.latest_latency)
+        self.candles += 1
+        return events
+
+
+class ForwardTester:
+    """
+    Paper-trades many strategies on live (or replayed) candle streams.
+    Each stream runs in its own thread and updates one incremental indicator
+    engine per candle, so per-candle work is the indicator updates plus one
+    condition check per strategy. Trade events are handed to subscribers from
+    a separate dispatcher thread so a slow subscriber never delays a candle.
+    """
+    def __init__(self, latency_budget=None):
+        self.feeds = {}
+        self.runners = {}
+        self.subscribers = []
+        self.events = queue.Queue()
+        # Seconds; a warning is printed for any candle that takes longer
+        self.latency_budget = latency_budget
+        self._threads = []
+        self._dispatcher = None
+        self._stop = threading.Event()
+
+    def add_strategy(self, strategy_id, config, stream):
+        """Register a strategy config on a stream. Must be called before start()"""
+        if strategy_id in self.runners:
+            raise ValueError(f"Strategy {strategy_id} is already registered")
+        runner = StrategyRunner(strategy_id, config)
+        feed_key = (
+            stream.symbol,
+            stream.interval,
+            json.dumps(config.get('custom_indicators') or [], sort_keys=True)
+        )
+        if feed_key not in self.feeds:
+            self.feeds[feed_key] = Feed(stream)
+        self.feeds[feed_key].runners.append(runner)
+        self.runners[strategy_id] = runner
+        return runner
+
+    def subscribe(self, callback):
+        """callback(event) is called for every entry/exit event"""
+        self.subscribers.append(callback)
+
+    def _dispatch(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            for callback in self.subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error in forward test subscriber: {str(e)}")
+
+    def _run_feed(self, feed, warm_up):
+        if warm_up is not None:
+            feed.engine.warm_up(warm_up)
+        for candle in feed.stream:
+            if self._stop.is_set():
+                break
+            for event in feed.process(candle):
+                self.events.put(event)
+            if self.latency_budget and feed.latest_latency > self.latency_budget:
+                print(f"Forward test {feed.stream.symbol} {feed.stream.interval} candle took "
+                      f"{feed.latest_latency * 1000:.1f}ms for {len(feed.runners)} strategies")
+
+    def start(self, warm_up=None):
+        """
+        Start one thread per feed. warm_up optionally maps (symbol, interval) to
+        historical candles (e.g. CandleStore.iter_candles) fed to the indicators first.
+        """
+        warm_up = warm_up or {}
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        for feed in self.feeds.values():
+            feed.build_engine()
+            history = warm_up.get((feed.stream.symbol, feed.stream.interval))
+            thread = threading.Thread(target=self._run_feed, args=(feed, history), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        """Wait for every stream to end (replay files do, live feeds only after stop())"""
+        for thread in self._threads:
+            thread.join()
+        self.events.put(None)
+        self._dispatcher.join()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            f"{feed.stream.symbol} {feed.stream.interval}": {
+                "strategies": len(feed.runners),
+                "candles": feed.candles,
+                "max_latency_ms": feed.max_latency * 1000
+            }
+            for feed in self.feeds.values()
+        }
@@ -0,0 +1,125 @@
+import threading
+import time
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class RunMetrics:
+    """
+    Stage timers and counters for one pipeline run. stage(name) closes the
+    running stage and starts the next, so it can sit behind the pipeline's
+    progress callback; counters hold work done, e.g. bars and condition evaluations.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.status = None
+        self.started_at = time.perf_counter()
+        self._stage = None
+        self._stage_started = None
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self._close_stage(now)
+        self._stage = name
+        self._stage_started = now
+
+    def _close_stage(self, now):
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._stage_started
+            self._stage = None
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self, status):
+        """Close the running stage and return the final snapshot"""
+        self._close_stage(time.perf_counter())
+        self.status = status
+        return self.to_dict()
+
+    def to_dict(self):
+        """Completed stages, counters and throughput of the backtest stage"""
+        engine_seconds = self.stages.get('backtest', 0.0)
+        metrics = {
+            "status": self.status,
+            "total_seconds": round(time.perf_counter() - self.started_at, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+        if engine_seconds > 0:
+            metrics["bars_per_second"] = round(self.counters.get('bars', 0) / engine_seconds, 2)
+            metrics["condition_evaluations_per_second"] = round(
+                self.counters.get('condition_evaluations', 0) / engine_seconds, 2
+            )
+        return metrics
+
+
+class MetricsRegistry:
+    """Process-wide totals over finished runs, rendered in the Prometheus text format"""
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.runs = {}
+        self.counters = {}
+        # stage -> [bucket counts, sum, count]
+        self.stage_seconds = {}
+        self.last_throughput = {}
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        """Add one run's RunMetrics.to_dict() snapshot (which may come from a worker process)"""
+        with self._lock:
+            status = metrics.get('status') or 'unknown'
+            self.runs[status] = self.runs.get(status, 0) + 1
+            for name, value in metrics.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for stage, seconds in metrics.get('stages', {}).items():
+                histogram = self.stage_seconds.setdefault(stage, [[0] * len(self.buckets), 0.0, 0])
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        histogram[0][i] += 1
+                histogram[1] += seconds
+                histogram[2] += 1
+            for name in ('bars_per_second', 'condition_evaluations_per_second'):
+                # A run that failed mid-loop would report a misleading rate
+                if name in metrics and status != 'error':
+                    self.last_throughput[name] = metrics[name]
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP backtest_runs_total Finished backtest pipeline runs by outcome.",
+                "# TYPE backtest_runs_total counter",
+            ]
+            for status, count in sorted(self.runs.items()):
+                lines.append(f'backtest_runs_total{{status="{status}"}} {count}')
+
+            lines += [
+                "# HELP backtest_stage_seconds Wall time of each pipeline stage.",
+                "# TYPE backtest_stage_seconds histogram",
+            ]
+            for stage, (bucket_counts, total, count) in sorted(self.stage_seconds.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f'backtest_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+                lines.append(f'backtest_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+                lines.append(f'backtest_stage_seconds_sum{{stage="{stage}"}} {total}')
+                lines.append(f'backtest_stage_seconds_count{{stage="{stage}"}} {count}')
+
+            for name, value in sorted(self.counters.items()):
+                lines += [
+                    f"# HELP backtest_{name}_total Total {name.replace('_', ' ')} over all runs.",
+                    f"# TYPE backtest_{name}_total counter",
+                    f"backtest_{name}_total {value}",
+                ]
+            for name, value in sorted(self.last_throughput.items()):
+                lines += [
+                    f"# HELP backtest_{name} Engine throughput of the most recent run.",
+                    f"# TYPE backtest_{name} gauge",
+                    f"backtest_{name} {value}",
+                ]
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every pipeline run in this process; served by the /metrics endpoint
+registry = MetricsRegistry()
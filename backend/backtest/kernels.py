@@ -0,0 +1,286 @@
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional: fall back to the NumPy implementation
+    njit = None
+
+HAS_NUMBA = njit is not None
+
+# Exit reason codes returned by the kernels; EXIT_REASONS[code] is the trade log's exit_reason
+NO_EXIT = 0
+SIGNAL = 1
+STOP_LOSS = 2
+TAKE_PROFIT = 3
+TRAILING_STOP = 4
+TRAILING_TAKE_PROFIT = 5
+EXIT_REASONS = (None, 'signal', 'stop_loss', 'take_profit', 'trailing_stop', 'trailing_take_profit')
+
+# Bars scanned per step by the NumPy implementation when looking for a risk exit
+RISK_SCAN_CHUNK = 512
+
+
+def risk_params(risk_manager):
+    """
+    RiskManager percentages as a float64 array for the kernels (NaN = rule not configured):
+    stop loss, take profit, trailing stop activation/callback, trailing take-profit activation/callback.
+    """
+    params = np.full(6, np.nan)
+    if risk_manager.stop_loss:
+        params[0] = risk_manager.stop_loss_pct
+    if risk_manager.take_profit:
+        params[1] = risk_manager.take_profit_pct
+    if risk_manager.trailing_stop:
+        params[2] = risk_manager.trailing_stop_activation
+        params[3] = risk_manager.trailing_stop_callback
+    if risk_manager.trailing_take_profit:
+        params[4] = risk_manager.trailing_take_profit_activation
+        params[5] = risk_manager.trailing_take_profit_callback
+    return params
+
+
+def _risk_reason(current_price, entry_price, highest_price, params):
+    """RiskManager.exit_reason as a reason code, with the same arithmetic so results match bit for bit"""
+    profit_pct = ((current_price - entry_price) / entry_price) * 100
+
+    if not math.isnan(params[0]):
+        if current_price <= entry_price * (1 - params[0]/100):
+            return STOP_LOSS
+    if not math.isnan(params[1]):
+        if current_price >= entry_price * (1 + params[1]/100):
+            return TAKE_PROFIT
+    if not math.isnan(params[2]):
+        if profit_pct >= params[2] and current_price <= highest_price * (1 - params[3]/100):
+            return TRAILING_STOP
+    if not math.isnan(params[4]):
+        if profit_pct >= params[4]:
+            drawdown_from_peak = ((highest_price - current_price) / highest_price) * 100
+            if drawdown_from_peak >= params[5]:
+                return TRAILING_TAKE_PROFIT
+    return NO_EXIT
+
+
+def _intrabar_exit(entry_price, bar_open, high, low, params):
+    """ExecutionModel.intrabar_exit as (reason code, fill price); stop first, gaps fill at the open"""
+    if not math.isnan(params[0]):
+        stop_price = entry_price * (1 - params[0]/100)
+        if low <= stop_price:
+            return STOP_LOSS, min(bar_open, stop_price)
+    if not math.isnan(params[1]):
+        take_profit_price = entry_price * (1 + params[1]/100)
+        if high >= take_profit_price:
+            return TAKE_PROFIT, max(bar_open, take_profit_price)
+    return NO_EXIT, 0.0
+
+
+def _simulate_loop(close, bar_open, high, low, entry_signals, exit_signals, params, intrabar):
+    """
+    backtest_strategy's position logic over whole arrays, one bar at a time.
+    Plain loops over NumPy arrays so numba can compile it; also runs as Python.
+    """
+    n = len(close)
+    entries = np.empty(n, dtype=np.int64)
+    exits = np.empty(n, dtype=np.int64)
+    reasons = np.empty(n, dtype=np.int8)
+    exit_prices = np.empty(n, dtype=np.float64)
+    count = 0
+    in_position = False
+    entry_price = 0.0
+    highest_price = 0.0
+
+    for t in range(n):
+        if in_position:
+            reason = NO_EXIT
+            price = close[t]
+            if intrabar:
+                reason, fill = _intrabar_exit(entry_price, bar_open[t], high[t], low[t], params)
+                if reason != NO_EXIT:
+                    price = fill
+            if reason == NO_EXIT:
+                risk_reason = NO_EXIT
+                # RiskManager.triggered_exit skips (and doesn't track) a zero entry price
+                if entry_price != 0:
+                    highest_price = max(highest_price, close[t])
+                    risk_reason = _risk_reason(close[t], entry_price, highest_price, params)
+                reason = SIGNAL if exit_signals[t] else risk_reason
+            if reason != NO_EXIT:
+                exits[count] = t
+                reasons[count] = reason
+                exit_prices[count] = price
+                count += 1
+                in_position = False
+
+        # A new trade can be opened on the same bar the previous one was closed
+        if not in_position and entry_signals[t]:
+            in_position = True
+            entry_price = close[t]
+            highest_price = entry_price
+            entries[count] = t
+
+    if in_position:
+        exits[count] = -1
+        reasons[count] = NO_EXIT
+        exit_prices[count] = np.nan
+        count += 1
+    return entries[:count], exits[:count], reasons[:count], exit_prices[:count]
+
+
+def risk_exit_mask(prices, entry_prices, highest_prices, params):
+    """Vectorized _risk_reason != NO_EXIT, elementwise over prices with their trade's entry and peak prices"""
+    mask = np.zeros(np.shape(prices), dtype=bool)
+    profit_pct = ((prices - entry_prices) / entry_prices) * 100
+    if not math.isnan(params[0]):
+        mask |= prices <= entry_prices * (1 - params[0]/100)
+    if not math.isnan(params[1]):
+        mask |= prices >= entry_prices * (1 + params[1]/100)
+    if not math.isnan(params[2]):
+        mask |= (profit_pct >= params[2]) & (prices <= highest_prices * (1 - params[3]/100))
+    if not math.isnan(params[4]):
+        drawdown_from_peak = ((highest_prices - prices) / highest_prices) * 100
+        mask |= (profit_pct >= params[4]) & (drawdown_from_peak >= params[5])
+    return mask
+
+
+def intrabar_exit_mask(entry_prices, high, low, params):
+    """Vectorized _intrabar_exit != NO_EXIT, elementwise over bars with their trade's entry price"""
+    mask = np.zeros(np.shape(high), dtype=bool)
+    if not math.isnan(params[0]):
+        mask |= low <= entry_prices * (1 - params[0]/100)
+    if not math.isnan(params[1]):
+        mask |= high >= entry_prices * (1 + params[1]/100)
+    return mask
+
+
+def _risk_mask(prices, entry_price, peak_price, params):
+    """risk_exit_mask over consecutive prices of one trade, tracking its running peak"""
+    if not entry_price:
+        return np.zeros(len(prices), dtype=bool)
+    highest_price = np.maximum(np.maximum.accumulate(prices), peak_price)
+    return risk_exit_mask(prices, entry_price, highest_price, params)
+
+
+def _find_exit(close, bar_open, high, low, entry_index, next_signal_exit, params, intrabar):
+    """(exit index, reason code, fill price) of the trade entered at entry_index, index -1 if still open"""
+    entry_price = close[entry_index]
+    end = next_signal_exit if next_signal_exit is not None else len(close) - 1
+    peak_price = entry_price
+    start = entry_index + 1
+
+    # Scan forward in chunks so short trades don't pay for the whole remaining series
+    chunk = RISK_SCAN_CHUNK
+    while start <= end:
+        stop = min(start + chunk, end + 1)
+        prices = close[start:stop]
+        mask = _risk_mask(prices, entry_price, peak_price, params)
+        if intrabar:
+            mask |= intrabar_exit_mask(entry_price, high[start:stop], low[start:stop], params)
+        hits = np.flatnonzero(mask)
+        if hits.size:
+            exit_index = start + hits[0]
+            peak_price = max(peak_price, prices[:hits[0] + 1].max())
+            break
+        peak_price = max(peak_price, prices.max())
+        start = stop
+        chunk *= 2
+    else:
+        if next_signal_exit is None:
+            return -1, NO_EXIT, np.nan
+        exit_index = next_signal_exit
+
+    # Same order of checks as the bar loop: intrabar fill, strategy signal, then risk rules
+    if intrabar:
+        reason, fill = _intrabar_exit(entry_price, bar_open[exit_index], high[exit_index], low[exit_index], params)
+        if reason != NO_EXIT:
+            return exit_index, reason, fill
+    if exit_index == next_signal_exit:
+        return exit_index, SIGNAL, close[exit_index]
+    return exit_index, _risk_reason(close[exit_index], entry_price, peak_price, params), close[exit_index]
+
+
+def _simulate_numpy(close, bar_open, high, low, entry_signals, exit_signals, params, intrabar):
+    """_simulate_loop without numba: jump between signal bars and scan each trade's risk exits in chunks"""
+    entry_bars = np.flatnonzero(entry_signals)
+    exit_bars = np.flatnonzero(exit_signals)
+    entries, exits, reasons, exit_prices = [], [], [], []
+
+    t = 0
+    while True:
+        # Next bar (at or after t) where the entry conditions hold
+        k = np.searchsorted(entry_bars, t)
+        if k == len(entry_bars):
+            break
+        entry_index = entry_bars[k]
+        # Strategy exits are only checked on bars after the entry bar
+        m = np.searchsorted(exit_bars, entry_index, side='right')
+        next_signal_exit = exit_bars[m] if m < len(exit_bars) else None
+
+        exit_index, reason, price = _find_exit(
+            close, bar_open, high, low, entry_index, next_signal_exit, params, intrabar
+        )
+        entries.append(entry_index)
+        exits.append(exit_index)
+        reasons.append(reason)
+        exit_prices.append(price)
+        if exit_index == -1:
+            break
+        t = exit_index
+
+    return (
+        np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64),
+        np.array(reasons, dtype=np.int8), np.array(exit_prices, dtype=np.float64)
+    )
+
+
+if HAS_NUMBA:
+    # Rebound before compiling _simulate_loop, which calls them by their global names
+    _risk_reason = njit(cache=True)(_risk_reason)
+    _intrabar_exit = njit(cache=True)(_intrabar_exit)
+    _simulate_compiled = njit(cache=True)(_simulate_loop)
+
+
+def simulate_trades(close, entry_signals, exit_signals, params, bar_open=None, high=None, low=None,
+                    intrabar=False, implementation=None):
+    """
+    Every trade of a long-only strategy in one pass: entries on entry_signals bars
+    while flat, exits on exit_signals or the risk rules in params (risk_params), with
+    stop-loss/take-profit filled inside the bar when intrabar is set.
+    Returns (entry indices, exit indices, reason codes, exit prices); a trade still
+    open at the end has exit index -1.
+
+    The signal masks only depend on the conditions, so a sweep over risk settings
+    reuses them and calls this once per params row (see sweep_risk_params).
+    implementation is 'compiled' (numba), 'numpy' or 'python'; by default the
+    compiled kernel when numba is installed, otherwise the NumPy one.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    entry_signals = np.ascontiguousarray(entry_signals, dtype=np.bool_)
+    exit_signals = np.ascontiguousarray(exit_signals, dtype=np.bool_)
+    params = np.ascontiguousarray(params, dtype=np.float64)
+    if intrabar:
+        bar_open, high, low = (np.ascontiguousarray(values, dtype=np.float64) for values in (bar_open, high, low))
+    else:
+        # Never read without intrabar fills, but compiled code needs typed arrays
+        bar_open = high = low = close
+
+    if implementation is None:
+        implementation = 'compiled' if HAS_NUMBA else 'numpy'
+    if implementation == 'compiled':
+        if not HAS_NUMBA:
+            raise ValueError("The compiled kernel needs numba, which is not installed")
+        return _simulate_compiled(close, bar_open, high, low, entry_signals, exit_signals, params, bool(intrabar))
+    if implementation == 'numpy':
+        return _simulate_numpy(close, bar_open, high, low, entry_signals, exit_signals, params, bool(intrabar))
+    if implementation == 'python':
+        return _simulate_loop(close, bar_open, high, low, entry_signals, exit_signals, params, bool(intrabar))
+    raise ValueError(f"Unknown kernel implementation: {implementation}")
+
+
+def sweep_risk_params(close, entry_signals, exit_signals, params_grid, bar_open=None, high=None, low=None,
+                      intrabar=False, implementation=None):
+    """simulate_trades for each row of params_grid on the same signals"""
+    return [
+        simulate_trades(close, entry_signals, exit_signals, params, bar_open, high, low, intrabar, implementation)
+        for params in np.atleast_2d(params_grid)
+    ]
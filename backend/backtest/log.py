@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import struct
+from datetime import datetime
+
+import numpy as np
+
+# Process-wide threshold, e.g. BACKTEST_LOG_LEVEL=DEBUG; a run's config["log_level"] overrides it
+DEFAULT_LEVEL = os.getenv('BACKTEST_LOG_LEVEL', 'INFO')
+# Individual trade events kept per run; counts are always complete
+MAX_EVENTS = 1000
+TRACE_MAGIC = b"BTTRACE1"
+
+
+def get_logger():
+    """The 'backtest' logger, with a stderr handler unless the host app configured logging"""
+    logger = logging.getLogger('backtest')
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(parse_level(DEFAULT_LEVEL))
+    return logger
+
+
+def parse_level(level):
+    """'debug' / 'INFO' / 10 -> logging level number"""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Invalid log level: {level}")
+    return value
+
+
+class TradeEventBuffer:
+    """
+    Trade entries and exits of one run, collected in memory instead of printed
+    from the bar loop, and written as one log record per run by flush().
+    Counts cover every event; individual events are logged at DEBUG, sampled
+    to every sample_every-th one of each kind and capped at max_events.
+    """
+    def __init__(self, level=None, sample_every=1, max_events=MAX_EVENTS):
+        self.level = parse_level(level) if level is not None else get_logger().getEffectiveLevel()
+        self.sample_every = max(1, int(sample_every))
+        self.max_events = max_events
+        # Storing details only pays off when they will be logged
+        self.keep_events = self.level <= logging.DEBUG
+        self.counts = {}
+        self.events = []
+
+    def record(self, kind, symbol, time, price, reason=None):
+        key = kind if reason is None else f"{kind}:{reason}"
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        # Sampled per event kind, so entries and exits are both represented
+        if self.keep_events and len(self.events) < self.max_events and (count - 1) % self.sample_every == 0:
+            self.events.append((kind, symbol, time, price, reason))
+
+    def flush(self, name=''):
+        """Log the buffered summary (INFO) and sampled events (DEBUG), then clear the buffer"""
+        logger = get_logger()
+        if self.counts and self.level <= logging.INFO:
+            summary = ", ".join(f"{key}={count}" for key, count in sorted(self.counts.items()))
+            self._emit(logger, logging.INFO, f"{name} trade events: {summary}".strip())
+        if self.events and self.level <= logging.DEBUG:
+            lines = [
+                f"{kind} {symbol} {time} @ {price}" + (f" ({reason})" if reason else "")
+                for kind, symbol, time, price, reason in self.events
+            ]
+            sampled = f" (every {self.sample_every})" if self.sample_every > 1 else ""
+            self._emit(logger, logging.DEBUG, f"{name} {len(lines)} trade events{sampled}:\n" + "\n".join(lines))
+        self.counts = {}
+        self.events = []
+
+    def _emit(self, logger, level, message):
+        # The run's own level decides, so config["log_level"] can be more verbose than the process default
+        logger.handle(logger.makeRecord(logger.name, level, __file__, 0, message, None, None))
+
+
+def get_trace_dir():
+    """Where debug traces are written (BACKTEST_TRACE_DIR, default backend/data/traces)"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv('BACKTEST_TRACE_DIR', os.path.join(backend_dir, 'data', 'traces'))
+
+
+def condition_labels(strategy):
+    """'entry[0][1]: close > sma_20' style label for every condition, in trace row order"""
+    labels = []
+    for side, groups in (('entry', strategy.entry_conditions), ('exit', strategy.exit_conditions)):
+        for g, group in enumerate(groups):
+            for c, condition in enumerate(group):
+                rhs = getattr(condition.rhs_operand, 'name', None) or condition.rhs_operand.value_
+                labels.append(f"{side}[{g}][{c}]: {condition.lhs} {condition.operator} {rhs}")
+    return labels
+
+
+def write_condition_trace(path, strategy, df):
+    """
+    Record every condition's outcome on every bar: a JSON header, then one
+    np.packbits row per condition (1 bit per bar). Conditions only read their
+    own bar, so the outcomes are evaluated as whole-column masks after the run.
+    """
+    conditions = [
+        condition
+        for groups in (strategy.entry_conditions, strategy.exit_conditions)
+        for group in groups
+        for condition in group
+    ]
+    arrays = {}
+    outcomes = np.zeros((len(conditions), len(df)), dtype=bool)
+    for i, condition in enumerate(conditions):
+        outcomes[i] = condition.evaluate_array(df, arrays)
+
+    close_times = df['close time'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    header = json.dumps({
+        "conditions": condition_labels(strategy),
+        "n_bars": len(df),
+        "first_close_time": int(close_times[0]) if len(df) else None,
+        "last_close_time": int(close_times[-1]) if len(df) else None,
+    }).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(TRACE_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(np.packbits(outcomes, axis=1).tobytes())
+    return path
+
+
+def read_condition_trace(path):
+    """(header, bool array of shape (conditions, bars)) from write_condition_trace"""
+    with open(path, 'rb') as f:
+        if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"{path} is not a condition trace")
+        header_size, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_size))
+        packed = np.frombuffer(f.read(), dtype=np.uint8)
+    n_conditions, n_bars = len(header['conditions']), header['n_bars']
+    packed = packed.reshape(n_conditions, -1) if n_conditions else packed.reshape(0, 0)
+    return header, np.unpackbits(packed, axis=1, count=n_bars).astype(bool)
+
+
+def debug_trace_path(symbol):
+    """New trace file name for one run"""
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    return os.path.join(get_trace_dir(), f"trace_{symbol}_{stamp}.bin")
@@ -1,6 +1,8 @@
 import os
 import pandas as pd
 
+from backtest.log import TradeEventBuffer
+
 # from utils import fetch_price_history_by_interval, transform_data, add_technical_indicators
 # from backtest import backtest_strategy
 # import time
@@ -10,18 +12,26 @@ import pandas as pd
 # from report_generator import ReportGenerator
 
 
-class Coin:
-    usdt_balance = 1
-    position = False
-    curr_coin = "USDT"
-    all_trades = []
+class BacktestContext:
+    """Portfolio and position state of a single backtest run, shared by all of its coins"""
+    def __init__(self, usdt_balance=1, events=None):
+        self.usdt_balance = usdt_balance
+        self.position = False
+        self.curr_coin = "USDT"
+        self.all_trades = []
+        # Trade entries/exits, logged in bulk when the run flushes them
+        self.events = events if events is not None else TradeEventBuffer()
+
 
-    
-    def __init__(self, name, pair, df, entry_price=0, entry_time=-1,  trades=[]):
+class Coin:
+    def __init__(self, name, pair, df, context=None, entry_price=0, entry_time=-1):
         # Basic info
         self.name = name
         self.pair = pair
         self.df = df
+
+        # Run state lives in the context so concurrent backtests never share it
+        self.context = context if context is not None else BacktestContext()
         
         # Position info
         self.entry_price = entry_price
@@ -30,30 +40,36 @@ class Coin:
         # Performance tracking
         self.trade_history = []
 
-    @classmethod
-    def reset(cls):
-        cls.all_trades = []
-        cls.curr_coin = "USDT"
-        cls.usdt_balance = 1
-        cls.position = False
-        
+    @property
+    def position(self):
+        return self.context.position
 
-        
+    @property
+    def curr_coin(self):
+        return self.context.curr_coin
+
+    @property
+    def usdt_balance(self):
+        return self.context.usdt_balance
 
     def enter_trade(self, entry_price, close_time_timestamp):
-        self.__class__.position = True
-        self.__class__.curr_coin = self.name
+        self.context.position = True
+        self.context.curr_coin = self.name
 
         self.entry_price = entry_price
         self.entry_time = close_time_timestamp
+        self.context.events.record('entry', self.pair, close_time_timestamp, entry_price)
         
 
 
     def exit_trade(self, trade_result, profit_pct):
-        self.__class__.position = False
-        self.__class__.all_trades.append(trade_result)
-        self.__class__.curr_coin = "USDT"
-        self.__class__.usdt_balance += (self.usdt_balance * profit_pct/100)
+        self.context.position = False
+        self.context.all_trades.append(trade_result)
+        self.context.curr_coin = "USDT"
+        self.context.usdt_balance += (self.context.usdt_balance * profit_pct/100)
+        self.context.events.record(
+            'exit', self.pair, trade_result['exit_time'], trade_result['exit_price'], trade_result.get('exit_reason')
+        )
 
         # self.trades.append(trade_result)
 
@@ -66,4 +82,3 @@ class Coin:
     def update_trade_history(self, trade):
         """Update trade history and check for blocking conditions"""
         self.trade_history.append(trade)
-
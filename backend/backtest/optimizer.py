@@ -0,0 +1,279 @@
+import argparse
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest.candle_store import CandleStore
+from backtest.data import load_indicator_frame
+from backtest.main import Coin
+from backtest.report_generator import ReportGenerator
+from backtest.strategy import Strategy
+from backtest.vectorized import run_risk_sweep, run_vectorized_backtest
+
+# Guard against accidentally exploding grids
+MAX_COMBINATIONS = 20000
+
+
+class SharedFrame:
+    """
+    Numeric/datetime columns of a dataframe copied once into a single shared
+    memory block. Worker processes attach by name and get a dataframe whose
+    columns are views on that block, so the frame is never pickled or copied per run.
+    """
+    def __init__(self, shm, spec):
+        self.shm = shm
+        self.spec = spec
+
+    @classmethod
+    def create(cls, df):
+        columns = [name for name in df.columns if df[name].dtype.kind in 'fiumM']
+        n_rows = len(df)
+        # Columns keep their own width (int32 trade counts), each starting 8-byte aligned
+        offsets = []
+        size = 0
+        for name in columns:
+            offsets.append(size)
+            size += -(-df[name].dtype.itemsize * n_rows // 8) * 8
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        layout = []
+        for name, offset in zip(columns, offsets):
+            values = df[name].to_numpy()
+            target = np.ndarray((n_rows,), dtype=values.dtype, buffer=shm.buf, offset=offset)
+            target[:] = values
+            layout.append((name, values.dtype.str, offset))
+        spec = {"name": shm.name, "n_rows": n_rows, "columns": layout}
+        return cls(shm, spec)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(shared_memory.SharedMemory(name=spec["name"]), spec)
+
+    def frame(self, start=0, stop=None):
+        """Dataframe over rows [start, stop) backed directly by the shared block"""
+        n_rows = self.spec["n_rows"]
+        stop = n_rows if stop is None else stop
+        data = {}
+        for name, dtype, offset in self.spec["columns"]:
+            column = np.ndarray((n_rows,), dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+            data[name] = column[start:stop]
+        return pd.DataFrame(data, copy=False)
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def parse_path(path):
+    return [int(key) if key.isdigit() else key for key in path.split('.')]
+
+
+def set_path(config, path, value):
+    """Set a nested config value addressed like 'risk_management.stop_loss.value' or 'entry_conditions.0.0.rhs.value'"""
+    keys = parse_path(path)
+    target = config
+    for key in keys[:-1]:
+        target = target[key]
+    target[keys[-1]] = value
+
+
+def expand_values(spec):
+    """A list of values, or a {"start", "stop", "step"} range (stop inclusive)"""
+    if isinstance(spec, list):
+        return spec
+    start, stop, step = spec['start'], spec['stop'], spec.get('step', 1)
+    if step <= 0:
+        raise ValueError(f"Invalid step {step} in range {spec}")
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return [round(start + i * step, 10) for i in range(count)]
+
+
+def expand_grid(config, param_grid):
+    """Every combination of the grid applied to a copy of config, as (params, config) pairs"""
+    paths = list(param_grid)
+    values = [expand_values(param_grid[path]) for path in paths]
+    total = int(np.prod([len(v) for v in values])) if values else 1
+    if total > MAX_COMBINATIONS:
+        raise ValueError(f"Parameter grid has {total} combinations, the limit is {MAX_COMBINATIONS}")
+
+    for path in paths:
+        # Fail early on paths that don't exist in the base config
+        keys = parse_path(path)
+        target = config
+        try:
+            for key in keys[:-1]:
+                target = target[key]
+            target[keys[-1]]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Parameter path not found in strategy config: {path}")
+
+    combinations = []
+    for combination in itertools.product(*values):
+        params = dict(zip(paths, combination))
+        variant = copy.deepcopy(config)
+        for path, value in params.items():
+            set_path(variant, path, value)
+        combinations.append((params, variant))
+    return combinations
+
+
+def backtest_trades(df, config):
+    """Run the vectorized engine on an indicator frame and return its trades"""
+    coin = Coin(config.get('ticker', ''), config.get('ticker', '').upper(), df)
+    run_vectorized_backtest(coin, Strategy(config))
+    return coin.context.all_trades
+
+
+def trade_metrics(trades):
+    return ReportGenerator(trades, initial_balance=1).calculate_basic_metrics()
+
+
+def evaluate_config(df, config):
+    """Run the vectorized engine on an indicator frame and return its basic metrics"""
+    return trade_metrics(backtest_trades(df, config))
+
+
+def sweep_trades(df, configs):
+    """backtest_trades for configs that differ only in risk_management, evaluating their conditions once"""
+    coins = [Coin(config.get('ticker', ''), config.get('ticker', '').upper(), df) for config in configs]
+    run_risk_sweep(coins, [Strategy(config) for config in configs])
+    return [coin.context.all_trades for coin in coins]
+
+
+def risk_sweep_key(config):
+    """Equal for configs that differ at most in risk_management, so one signal evaluation serves them all"""
+    return json.dumps({key: value for key, value in config.items() if key != 'risk_management'}, sort_keys=True, default=str)
+
+
+def batch_combinations(combinations, batch_size):
+    """Indices of grid combinations grouped by risk_sweep_key, in batches of at most batch_size"""
+    groups = {}
+    for i, (_, config) in enumerate(combinations):
+        groups.setdefault(risk_sweep_key(config), []).append(i)
+    return [group[i:i + batch_size] for group in groups.values() for i in range(0, len(group), batch_size)]
+
+
+def evaluate_combination(df, combination):
+    params, config = combination
+    try:
+        return {"params": params, "metrics": evaluate_config(df, config)}
+    except Exception as e:
+        return {"params": params, "metrics": {}, "error": str(e)}
+
+
+def evaluate_batch(df, batch):
+    """Results for one batch of combinations from batch_combinations, in batch order"""
+    try:
+        all_trades = sweep_trades(df, [config for _, config in batch])
+        return [{"params": params, "metrics": trade_metrics(trades)} for (params, _), trades in zip(batch, all_trades)]
+    except Exception:
+        # Run them one by one, so a single invalid variant only fails itself
+        return [evaluate_combination(df, combination) for combination in batch]
+
+
+def in_grid_order(batches, batch_results, n_combinations):
+    """Per-batch results put back in combination order, so ties rank the same as before batching"""
+    results = [None] * n_combinations
+    for batch, results_of_batch in zip(batches, batch_results):
+        for i, result in zip(batch, results_of_batch):
+            results[i] = result
+    return results
+
+
+def evaluate_grid(df, combinations):
+    """Every combination on df in this process, sweeping risk settings over shared signals"""
+    batches = batch_combinations(combinations, len(combinations))
+    batch_results = [evaluate_batch(df, [combinations[i] for i in batch]) for batch in batches]
+    return in_grid_order(batches, batch_results, len(combinations))
+
+
+def grid_required_columns(combinations):
+    """Columns needed by any variant, so one indicator pass serves the whole grid"""
+    required = set()
+    for _, variant in combinations:
+        required.update(Strategy(variant).required_columns())
+    return required
+
+
+# Set in each worker process by _init_worker
+_shared_frame = None
+
+
+def _init_worker(spec):
+    global _shared_frame
+    _shared_frame = SharedFrame.attach(spec)
+
+
+def _evaluate_batch(batch):
+    return evaluate_batch(_shared_frame.frame(), batch)
+
+
+def rank_results(results, metric='total_return', top=None):
+    """Sort by metric (highest first); runs without trades or with errors go last"""
+    def sort_key(result):
+        value = result["metrics"].get(metric)
+        return (value is not None, value if value is not None else 0)
+
+    ranked = sorted(results, key=sort_key, reverse=True)
+    for rank, result in enumerate(ranked, start=1):
+        result["rank"] = rank
+    return ranked[:top] if top else ranked
+
+
+def run_grid(df, combinations, metric='total_return', top=None, max_workers=None):
+    """Evaluate expand_grid combinations on df across a process pool sharing df through shared memory"""
+    shared = SharedFrame.create(df)
+    try:
+        mp_context = multiprocessing.get_context('spawn')
+        workers = max_workers or int(os.getenv('OPTIMIZER_WORKERS', os.cpu_count() or 2))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(shared.spec,)) as pool:
+            # Variants differing only in risk settings share one signal evaluation per batch
+            batches = batch_combinations(combinations, max(1, len(combinations) // (workers * 4)))
+            batch_results = pool.map(_evaluate_batch, [[combinations[i] for i in batch] for batch in batches])
+            results = in_grid_order(batches, batch_results, len(combinations))
+    finally:
+        shared.unlink()
+    return rank_results(results, metric, top)
+
+
+def optimize(config, param_grid, candle_store, metric='total_return', top=None, max_workers=None):
+    """Fetch candles and indicators once, then sweep the grid over them"""
+    combinations = expand_grid(config, param_grid)
+    df = load_indicator_frame(config, candle_store, required=grid_required_columns(combinations))
+    return {
+        "combinations": len(combinations),
+        "metric": metric,
+        "results": run_grid(df, combinations, metric, top, max_workers)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-search numeric strategy parameters")
+    parser.add_argument('config', help="Strategy config JSON (same format as POST /api/backtest)")
+    parser.add_argument('grid', help='JSON mapping config paths to value lists or {"start", "stop", "step"} ranges')
+    parser.add_argument('--metric', default='total_return', help="Basic metric to rank by")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    with open(args.grid) as f:
+        param_grid = json.load(f)
+
+    result = optimize(config, param_grid, CandleStore(), args.metric, args.top, args.workers)
+    print(json.dumps(result, indent=4, default=float))
+
+
+if __name__ == "__main__":
+    main()
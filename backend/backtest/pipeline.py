@@ -0,0 +1,230 @@
+from agenticAI.insights import generate_insights
+from backtest.backtest import backtest_strategy, iter_rows
+from backtest.data import parse_time_range
+from backtest.equity import downsample_curve, equity_metrics, single_symbol_equity
+from backtest.instrumentation import RunMetrics, registry
+from backtest.log import TradeEventBuffer, debug_trace_path, write_condition_trace
+from backtest.main import BacktestContext, Coin
+from backtest.portfolio import build_portfolio_data, load_portfolio_candles, portfolio_summary, run_portfolio_backtest
+from backtest.report_generator import ReportGenerator
+from backtest.resample import add_all_indicators, load_frame
+from backtest.strategy import Strategy
+from backtest.vectorized import run_vectorized_backtest
+
+# Stages reported to progress callbacks, in execution order
+STAGES = ['fetch', 'indicators', 'backtest', 'report', 'insights', 'store']
+
+
+class PipelineError(Exception):
+    """A pipeline failure with the message and HTTP status the API should return"""
+    # RunMetrics snapshot of the failed run, set by run_backtest_pipeline
+    metrics = None
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def run_single_symbol(config, candle_store, start_time, end_time, progress, metrics):
+    """Candles, indicators and engine for config['ticker']; returns the trades and equity section"""
+    coins = [config["ticker"]]
+    # Per-request portfolio state, so concurrent backtests don't interfere
+    events = TradeEventBuffer(config.get('log_level'), config.get('log_sample_every', 1))
+    context = BacktestContext(events=events)
+    coin_objects = []
+
+    progress('fetch')
+    for coin in coins:
+        try:
+            df = None
+            PAIR = coin.upper()
+            # Served from the local candle store, only missing ranges are downloaded
+            print("Loading candles from candle store")
+            df = load_frame(config, candle_store, PAIR, start_time, end_time)
+            print("Loaded candles from candle store")
+            coin_objects.append(Coin(coin, PAIR, df, context))
+        except Exception as e:
+            print(f"Error handling coin {coin}: {str(e)}")
+            raise PipelineError(f"Error handling coin {coin}: {str(e)}")
+
+    # Compiled first so only the indicators it references get computed
+    strategy = Strategy(config)
+
+    progress('indicators')
+    try:
+        print("Calling add_technical_indicators function")
+        # Columns like 'sma_20@4h' come from candles resampled out of the 1m store
+        df = add_all_indicators(df, config, strategy.required_columns(), candle_store, PAIR, start_time, end_time)
+        print("Returned from add_technical_indicators function")
+    except Exception as e:
+        print(f"Error adding technical indicators: {str(e)}")
+        raise PipelineError(f"Error adding technical indicators: {str(e)}")
+
+    # Run backtest
+    progress('backtest')
+    try:
+        print("Starting backtest...")
+        if config.get('engine', 'loop') == 'vectorized':
+            for coin in coin_objects:
+                run_vectorized_backtest(coin, strategy)
+        else:
+            rows = zip(*(iter_rows(coin.df) for coin in coin_objects))
+            for current_rows in rows:
+                for coin, current_data in zip(coin_objects, current_rows):
+                    backtest_strategy(coin, current_data, strategy)
+    except Exception as e:
+        print(f"Error during backtest loop: {str(e)}")
+        raise PipelineError(f"Error during backtest loop: {str(e)}")
+    metrics.count('bars', len(df) * len(coin_objects))
+    metrics.count('condition_evaluations', strategy.condition_evaluations)
+
+    # Event logging, the condition trace and the equity curve are report work, not engine time
+    progress('report')
+    events.flush(PAIR)
+
+    # Opt-in: every condition's per-bar outcome, bit-packed to a file instead of logged
+    if config.get('debug_trace'):
+        trace_path = write_condition_trace(debug_trace_path(PAIR), strategy, df)
+        print(f"Wrote condition trace to {trace_path}")
+
+    coin = coin_objects[0]
+    equity = single_symbol_equity(df, context.all_trades, coin.entry_time if coin.position else None)
+    return context.all_trades, equity
+
+
+def run_portfolio(config, candle_store, progress, metrics):
+    """Candles, indicators and portfolio engine for config['tickers']; returns (trades, summary, equity)"""
+    progress('fetch')
+    try:
+        print("Loading portfolio candles")
+        candles = load_portfolio_candles(config, candle_store)
+    except ValueError as e:
+        raise PipelineError(str(e), 400)
+    except Exception as e:
+        print(f"Error loading portfolio candles: {str(e)}")
+        raise PipelineError(f"Error loading portfolio candles: {str(e)}")
+
+    progress('indicators')
+    try:
+        print("Adding portfolio indicators")
+        data = build_portfolio_data(config, candle_store, candles)
+    except Exception as e:
+        print(f"Error adding portfolio indicators: {str(e)}")
+        raise PipelineError(f"Error adding portfolio indicators: {str(e)}")
+
+    progress('backtest')
+    try:
+        print("Starting portfolio backtest...")
+        result = run_portfolio_backtest(data, config)
+    except ValueError as e:
+        raise PipelineError(str(e), 400)
+    except Exception as e:
+        print(f"Error during portfolio backtest: {str(e)}")
+        raise PipelineError(f"Error during portfolio backtest: {str(e)}")
+    metrics.count('bars', len(data.close_times) * len(data.symbols))
+    metrics.count('condition_evaluations', result["condition_evaluations"])
+
+    progress('report')
+    summary = portfolio_summary(data, result)
+    equity = {
+        "metrics": equity_metrics(result["equity_curve"], data.close_times, result["invested"], result["traded_value"]),
+        "curve": downsample_curve(data.close_times, result["equity_curve"])
+    }
+    return result["all_trades"], summary, equity
+
+
+def run_backtest_pipeline(config, backtest_model, candle_store, progress=None):
+    """
+    Run one backtest end to end: candles, indicators, engine, report, insights and DB write.
+    progress(stage) is called as each stage starts. Returns the success response body.
+    Stage timings and counters are returned under "metrics", stored with the backtest
+    document and added to the process-wide registry served by /metrics.
+    """
+    if progress is None:
+        progress = lambda stage: None
+
+    metrics = RunMetrics()
+    def track(stage):
+        metrics.stage(stage)
+        progress(stage)
+
+    try:
+        result = _run_pipeline(config, backtest_model, candle_store, track, metrics)
+    except Exception as e:
+        # Unexpected errors are recorded too, then left for the caller to handle
+        run_metrics = metrics.finish('error')
+        registry.record(run_metrics)
+        if isinstance(e, PipelineError):
+            e.metrics = run_metrics
+        raise
+    result["metrics"] = metrics.finish('success' if "backtest_id" in result else 'no_trades')
+    registry.record(result["metrics"])
+    return result
+
+
+def _run_pipeline(config, backtest_model, candle_store, progress, metrics):
+    """run_backtest_pipeline's stages; progress also drives the stage timers"""
+    try:
+        start_time, end_time = parse_time_range(config)
+    except ValueError as e:
+        print(str(e))
+        raise PipelineError(str(e), 400)
+
+    portfolio = None
+    if config.get('tickers'):
+        # Portfolio mode: one strategy over several symbols sharing capital
+        all_trades, portfolio, equity = run_portfolio(config, candle_store, progress, metrics)
+    else:
+        all_trades, equity = run_single_symbol(config, candle_store, start_time, end_time, progress, metrics)
+    metrics.count('trades', len(all_trades))
+
+    if len(all_trades) == 0:
+        return {
+            "status": "success",
+            "message": "No trades generated"
+        }
+
+    # Generate report (the engines already started the report stage)
+    try:
+        report_generator = ReportGenerator(all_trades, initial_balance=1)
+        report = report_generator.generate_full_report()
+        # Bar-level mark-to-market metrics and a downsampled curve for charts
+        report["equity_metrics"] = equity["metrics"]
+        report["equity_curve"] = equity["curve"]
+        if portfolio:
+            # Shared-capital figures from the portfolio equity, not compounded per-trade returns
+            report["basic_metrics"].update(portfolio["basic_metrics"])
+            report["symbol"] = ", ".join(portfolio["symbols"])
+            report["portfolio"] = portfolio
+        else:
+            report["symbol"] = config["ticker"]
+
+        progress('insights')
+        insightsAndReportID = generate_insights(report)
+        report_id = insightsAndReportID['report_id']
+
+        # Store in MongoDB
+        progress('store')
+        backtest_id = backtest_model.create_backtest(
+            user_id="123",
+            # user_id=current_user['_id'],
+            input_params=config,
+            results=report,
+            report_id=report_id,
+            insights=insightsAndReportID['insights'],
+            # Everything up to the DB write; the response carries the complete run
+            metrics=metrics.to_dict()
+        )
+
+        return {
+            "status": "success",
+            "backtest_id": backtest_id,
+            "report_url": f"/report/{report_id}",
+            "report_id": report_id,
+            "data": report,
+            "insights": insightsAndReportID
+        }
+    except Exception as e:
+        print(f"Error generating report or saving to database: {str(e)}")
+        raise PipelineError(f"Error generating report or saving to database: {str(e)}")
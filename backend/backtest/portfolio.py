@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+from backtest.backtest import execute_trade
+from backtest.data import parse_time_range
+from backtest.equity import drawdown_stats
+from backtest.kernels import intrabar_exit_mask, risk_exit_mask, risk_params
+from backtest.report_generator import ReportGenerator
+from backtest.resample import add_all_indicators, load_frame
+from backtest.strategy import Strategy
+
+ALLOCATION_METHODS = ('equal_weight', 'fixed_fraction')
+
+
+class PortfolioData:
+    """
+    N symbols aligned on a shared close-time index, held as one
+    (time x symbol x field) float array. Bars a symbol has no candle for are NaN.
+    """
+    def __init__(self, symbols, fields, close_times, values):
+        self.symbols = symbols
+        self.fields = fields
+        self.close_times = close_times
+        self.values = values
+        self.field_index = {name: i for i, name in enumerate(fields)}
+
+    @classmethod
+    def from_frames(cls, frames, fields):
+        """frames maps symbol -> indicator dataframe; fields are the columns to keep"""
+        symbols = list(frames)
+        fields = sorted(fields)
+        close_times = np.unique(np.concatenate([
+            frames[symbol]['close time'].to_numpy() for symbol in symbols
+        ]))
+        values = np.full((len(close_times), len(symbols), len(fields)), np.nan)
+        for s, symbol in enumerate(symbols):
+            df = frames[symbol]
+            rows = np.searchsorted(close_times, df['close time'].to_numpy())
+            for f, field in enumerate(fields):
+                values[rows, s, f] = df[field].to_numpy(dtype=float)
+        return cls(symbols, fields, close_times, values)
+
+    def field(self, name):
+        """(time x symbol) view of one field"""
+        return self.values[:, :, self.field_index[name]]
+
+
+def conditions_mask(condition_groups, arrays, shape):
+    """Strategy._conditions_mask over (time x symbol) arrays: OR across groups, AND within one"""
+    mask = np.zeros(shape, dtype=bool)
+    for condition_group in condition_groups:
+        group_mask = np.ones(shape, dtype=bool)
+        for condition in condition_group:
+            group_mask &= condition.evaluate_array(None, arrays)
+        mask |= group_mask
+    return mask
+
+
+def parse_allocation(config, n_symbols):
+    """
+    {"method": "equal_weight" | "fixed_fraction", "max_positions": N, "fraction": 0.1}.
+    equal_weight gives each new position equity / max_positions,
+    fixed_fraction gives it fraction * equity; both are capped by free cash.
+    """
+    allocation = config.get('allocation', {})
+    method = allocation.get('method', 'equal_weight')
+    if method not in ALLOCATION_METHODS:
+        raise ValueError(f"Invalid allocation method: {method}. Must be one of {list(ALLOCATION_METHODS)}")
+    max_positions = int(allocation.get('max_positions', n_symbols))
+    if max_positions < 1:
+        raise ValueError("max_positions must be at least 1")
+    if method == 'equal_weight':
+        fraction = 1 / max_positions
+    else:
+        fraction = float(allocation.get('fraction', 0.1))
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Invalid allocation fraction: {fraction}. Must be in (0, 1]")
+    return max_positions, fraction
+
+
+def run_portfolio_backtest(data, config, initial_balance=1):
+    """
+    Trade one strategy over every symbol of a PortfolioData with shared capital.
+    Signals for all bars and symbols come from one vectorized evaluation; the bar
+    loop then applies exits, then entries (in symbol order) like backtest_strategy.
+    """
+    strategy = Strategy(config)
+    risk_manager = strategy.risk_manager
+    # Fees, slippage and intrabar fills from config['execution'], as in single-symbol runs
+    execution = strategy.execution
+    # RiskManager percentages in the exit kernel's layout, checked for all held symbols at once
+    risk = risk_params(risk_manager)
+    max_positions, fraction = parse_allocation(config, len(data.symbols))
+
+    arrays = {name: data.field(name) for name in data.fields}
+    shape = (len(data.close_times), len(data.symbols))
+    entry_signals = conditions_mask(strategy.entry_conditions, arrays, shape)
+    exit_signals = conditions_mask(strategy.exit_conditions, arrays, shape)
+    # Every condition is evaluated over the whole (time x symbol) grid
+    strategy.condition_evaluations += shape[0] * shape[1] * (strategy.entry_size + strategy.exit_size)
+    close = data.field('close')
+    if execution.intrabar:
+        bar_open, high, low = data.field('open'), data.field('high'), data.field('low')
+    close_times = data.close_times
+
+    n_symbols = len(data.symbols)
+    cash = float(initial_balance)
+    held = np.zeros(n_symbols, dtype=bool)
+    quantity = np.zeros(n_symbols)
+    # Cash spent on each open position, fees and slippage included
+    cost_basis = np.zeros(n_symbols)
+    entry_price = np.zeros(n_symbols)
+    highest_price = np.zeros(n_symbols)
+    entry_bar = np.zeros(n_symbols, dtype=np.int64)
+    # Held symbols without a candle on a bar are marked at their last close
+    last_price = np.zeros(n_symbols)
+    trades = {symbol: [] for symbol in data.symbols}
+    equity_curve = np.empty(len(close_times))
+    # Bars with any open position, and the notional bought and sold, for equity metrics
+    invested = np.zeros(len(close_times), dtype=bool)
+    traded_value = 0.0
+
+    for t in range(len(close_times)):
+        prices = close[t]
+        priced = ~np.isnan(prices)
+        last_price[priced] = prices[priced]
+
+        # Exits for held symbols with a candle on this bar
+        active = held & priced
+        if active.any():
+            highest_price[active] = np.maximum(highest_price[active], prices[active])
+            exits = active & exit_signals[t]
+            exits[active] |= risk_exit_mask(prices[active], entry_price[active], highest_price[active], risk)
+            if execution.intrabar:
+                exits[active] |= intrabar_exit_mask(entry_price[active], high[t, active], low[t, active], risk)
+            for s in np.flatnonzero(exits):
+                # Same precedence as backtest_strategy: intrabar fill, strategy signal, then risk rules
+                exit_price = prices[s]
+                intrabar = execution.intrabar and execution.intrabar_exit(
+                    risk_manager, entry_price[s], bar_open[t, s], high[t, s], low[t, s]
+                )
+                if intrabar:
+                    exit_reason, exit_price = intrabar
+                elif exit_signals[t, s]:
+                    exit_reason = 'signal'
+                else:
+                    exit_reason = risk_manager.exit_reason(prices[s], entry_price[s], highest_price[s])
+                trade = execute_trade(
+                    entry_price[s], exit_price,
+                    pd.Timestamp(close_times[entry_bar[s]]), pd.Timestamp(close_times[t]),
+                    exit_reason=exit_reason, execution=execution
+                )
+                # Net of fees and slippage, so cash always agrees with the trade's profit_percentage
+                proceeds = cost_basis[s] * (1 + trade['profit_percentage'] / 100)
+                trade['symbol'] = data.symbols[s]
+                trade['allocation'] = cost_basis[s]
+                trade['pnl'] = proceeds - cost_basis[s]
+                trades[data.symbols[s]].append(trade)
+                cash += proceeds
+                traded_value += proceeds
+                held[s] = False
+                quantity[s] = 0
+                cost_basis[s] = 0
+
+        equity = cash + (quantity * last_price)[held].sum()
+
+        # Entries, symbol order decides who gets the last free slots
+        candidates = np.flatnonzero(entry_signals[t] & ~held & priced)
+        for s in candidates:
+            if held.sum() >= max_positions:
+                break
+            allocation = min(equity * fraction, cash)
+            if allocation <= 0:
+                break
+            cash -= allocation
+            traded_value += allocation
+            held[s] = True
+            quantity[s] = allocation / execution.entry_cost(prices[s])
+            cost_basis[s] = allocation
+            entry_price[s] = prices[s]
+            highest_price[s] = prices[s]
+            entry_bar[s] = t
+
+        equity_curve[t] = equity
+        invested[t] = held.any()
+
+    final_equity = cash + (quantity * last_price)[held].sum()
+    all_trades = sorted(
+        (trade for symbol_trades in trades.values() for trade in symbol_trades),
+        key=lambda trade: trade['exit_time']
+    )
+    return {
+        "trades": trades,
+        "all_trades": all_trades,
+        "open_positions": [data.symbols[s] for s in np.flatnonzero(held)],
+        "equity_curve": equity_curve,
+        "invested": invested,
+        "traded_value": traded_value,
+        "final_equity": final_equity,
+        "total_return": (final_equity / initial_balance - 1) * 100,
+        "condition_evaluations": strategy.condition_evaluations
+    }
+
+
+def portfolio_summary(data, result):
+    """
+    The report's portfolio section for a run_portfolio_backtest result. basic_metrics
+    replaces ReportGenerator's return figures, which compound every trade's
+    profit_percentage as if it had used all the capital.
+    """
+    max_drawdown = drawdown_stats(result["equity_curve"])[0] if len(result["equity_curve"]) else 0.0
+    return {
+        "symbols": data.symbols,
+        "final_equity": result["final_equity"],
+        "total_return": result["total_return"],
+        "open_positions": result["open_positions"],
+        "basic_metrics": {
+            "total_return": round(result["total_return"], 2),
+            "final_balance": result["final_equity"],
+            "max_drawdown": round(max_drawdown, 2),
+        },
+        "per_symbol": {
+            symbol: ReportGenerator(trades, initial_balance=1).calculate_basic_metrics()
+            for symbol, trades in result["trades"].items()
+        }
+    }
+
+
+def load_portfolio_candles(config, candle_store):
+    """Candles for every symbol in config['tickers'], as symbol -> dataframe"""
+    symbols = [ticker.upper() for ticker in config['tickers']]
+    if len(set(symbols)) != len(symbols):
+        raise ValueError("Duplicate symbols in tickers")
+    start_time, end_time = parse_time_range(config)
+    return {symbol: load_frame(config, candle_store, symbol, start_time, end_time) for symbol in symbols}
+
+
+def build_portfolio_data(config, candle_store, candles):
+    """Strategy indicators for load_portfolio_candles' frames, aligned on close time"""
+    start_time, end_time = parse_time_range(config)
+    strategy = Strategy(config)
+    fields = strategy.required_columns()
+    frames = {
+        symbol: add_all_indicators(df, config, fields, candle_store, symbol, start_time, end_time)
+        for symbol, df in candles.items()
+    }
+    if strategy.execution.intrabar:
+        fields |= {'open', 'high', 'low'}
+    return PortfolioData.from_frames(frames, fields)
+
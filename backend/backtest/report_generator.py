@@ -1,106 +1,112 @@
 import json
+from collections import Counter
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+# Profit size buckets, each above the next threshold (the last one takes everything else)
+PROFIT_SIZES = ['large_win', 'medium_win', 'small_win', 'small_loss', 'medium_loss', 'large_loss']
+PROFIT_SIZE_THRESHOLDS = [20, 10, 0, -10, -20]
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+
+class TradeColumns:
+    """The trade log as one NumPy array per field, built in a single pass over the trade dicts"""
+    def __init__(self, trades):
+        # Original values are kept for rounding and summing so output matches per-trade code exactly
+        self.profit_values = [t.get('profit_percentage', 0) for t in trades]
+        self.profit = np.array(self.profit_values, dtype=float)
+        self.entry_time = pd.to_datetime(pd.Series([t.get('entry_time') for t in trades], dtype=object),
+                                         errors='coerce').to_numpy(dtype='datetime64[ns]')
+        self.exit_time = pd.to_datetime(pd.Series([t.get('exit_time') for t in trades], dtype=object),
+                                        errors='coerce').to_numpy(dtype='datetime64[ns]')
+
+    def __len__(self):
+        return len(self.profit)
+
+
 class ReportGenerator:
     def __init__(self, trades, initial_balance=1):
         self.trades = trades
         self.initial_balance = initial_balance
-        
+        self._columns = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = TradeColumns(self.trades)
+        return self._columns
+
     def calculate_basic_metrics(self):
         metrics = {}
-        
+
         try:
             if not self.trades:
                 return metrics
-                
-            winning_trades = [t for t in self.trades if t.get('profit_percentage', 0) > 0]
-            losing_trades = [t for t in self.trades if t.get('profit_percentage', 0) <= 0]
 
-            try:
-                profits = [t.get('profit_percentage', 0) for t in self.trades]
-                cumulative_returns = np.cumprod(1 + np.array(profits) / 100) - 1
-            except Exception as e:
-                print(f"Error calculating returns: {e}")
-                cumulative_returns = []
+            profits = self.columns.profit
+            wins = profits > 0
+            # Not ~wins: a NaN profit is neither a win nor a loss, as in the per-trade code
+            losses = profits <= 0
+            n_trades = len(profits)
+            n_wins = int(wins.sum())
+            win_profits = profits[wins]
+            loss_profits = profits[losses]
+            cumulative_returns = np.cumprod(1 + profits / 100) - 1
 
             metrics.update({
-                "total_trades": len(self.trades),
-                "winning_trades": len(winning_trades),
-                "losing_trades": len(losing_trades),
-                "win_rate": round(len(winning_trades) / len(self.trades)*100, 2) if self.trades else 0,
+                "total_trades": n_trades,
+                "winning_trades": n_wins,
+                "losing_trades": int(losses.sum()),
+                "win_rate": round(n_wins / n_trades*100, 2),
+                "average_profit": round(np.mean(profits), 2),
+                "largest_win": round(max(self.columns.profit_values), 2),
+                "largest_loss": round(min(self.columns.profit_values), 2),
+                "average_win": round(np.mean(win_profits), 2) if len(win_profits) else 0,
+                "average_loss": round(np.mean(loss_profits), 2) if len(loss_profits) else 0,
+                "total_return": round((cumulative_returns[-1] * 100), 2)
             })
 
-            # handle  metrics that might fail 
-            try:
-                metrics["average_profit"] = round(np.mean([t.get('profit_percentage', 0) for t in self.trades]), 2)
-            except Exception as e:
-                print(f"Error calculating average profit: {e}")
-                metrics["average_profit"] = None
-
-            try:
-                metrics["largest_win"] = round(max([t.get('profit_percentage', 0) for t in self.trades]), 2)
-                metrics["largest_loss"] = round(min([t.get('profit_percentage', 0) for t in self.trades]), 2)
-            except Exception as e:
-                print(f"Error calculating largest win/loss: {e}")
-                metrics["largest_win"] = None
-                metrics["largest_loss"] = None
-
-            try:
-                metrics["average_win"] = round(np.mean([t.get('profit_percentage', 0) for t in winning_trades]), 2) if winning_trades else 0
-                metrics["average_loss"] = round(np.mean([t.get('profit_percentage', 0) for t in losing_trades]), 2) if losing_trades else 0
-            except Exception as e:
-                print(f"Error calculating average win/loss: {e}")
-                metrics["average_win"] = None
-                metrics["average_loss"] = None
-
-            try:
-                metrics["total_return"] = round((cumulative_returns[-1] * 100), 2) if len(cumulative_returns) > 0 else 0
-            except Exception as e:
-                print(f"Error calculating total return: {e}")
-                metrics["total_return"] = None
-
         except Exception as e:
             print(f"Error in basic metrics calculation: {e}")
-            
+
         return metrics
-        
-        
-    
-        
+
     def calculate_time_based_metrics(self):
+        empty = {
+            "monthly_metrics": {},
+            "best_month": None,
+            "worst_month": None
+        }
         try:
-            df = pd.DataFrame(self.trades)
-            df['exit_time'] = pd.to_datetime(df['exit_time'], errors='coerce')
-            df = df.dropna(subset=['exit_time'])  # Remove rows with invalid dates
-            
-            if df.empty:
-                return {
-                    "monthly_metrics": {},
-                    "best_month": None,
-                    "worst_month": None
-                }
+            if not self.trades:
+                return empty
+
+            exit_time = self.columns.exit_time
+            # Trades with invalid exit dates are left out
+            valid = np.flatnonzero(~np.isnat(exit_time))
+            if len(valid) == 0:
+                return empty
+
+            months, inverse, counts = np.unique(
+                exit_time[valid].astype('datetime64[M]'), return_inverse=True, return_counts=True
+            )
+            order = valid[np.argsort(inverse, kind='stable')]
+            profit_values = self.columns.profit_values
+            wins = self.columns.profit > 0
 
-            df['month'] = df['exit_time'].dt.to_period('M')
-            
             monthly_returns = {}
-            for month, group in df.groupby('month'):
-                try:
-                    monthly_returns[str(month)] = {
-                        "return": round(sum(group.get('profit_percentage', 0)), 2),
-                        "trades": len(group),
-                        "win_rate": round(len(group[group['profit_percentage'] > 0]) / len(group), 2)
-                    }
-                except Exception as e:
-                    print(f"Error calculating metrics for month {month}: {e}")
-                    continue
-
-            if not monthly_returns:
-                return {
-                    "monthly_metrics": {},
-                    "best_month": None,
-                    "worst_month": None
+            stop = 0
+            for month, count in zip(months, counts):
+                rows = order[stop:stop + count]
+                stop += count
+                monthly_returns[np.datetime_as_string(month, unit='M')] = {
+                    "return": round(sum(profit_values[i] for i in rows), 2),
+                    "trades": int(count),
+                    "win_rate": round(int(wins[rows].sum()) / int(count), 2)
                 }
 
             return {
@@ -111,107 +117,72 @@ class ReportGenerator:
 
         except Exception as e:
             print(f"Error in time-based metrics calculation: {e}")
-            return {
-                "monthly_metrics": {},
-                "best_month": None,
-                "worst_month": None
-            }
-        
+            return empty
+
     def analyze_trade_patterns(self):
         if not self.trades:
             return {"trade_details": [], "pattern_metrics": {}}
-            
-        trade_details = []
-        running_balance = self.initial_balance
-        
-        for i, trade in enumerate(self.trades):
-            try:
-                profit_pct = trade.get('profit_percentage', 0)
-                running_balance *= (1 + profit_pct/100)
-                
-                trade_info = {
-                    # "entry_price": round(trade.get('entry_price', 0), 4),
-                    # "exit_price": round(trade.get('exit_price', 0), 4),
-                    "profit_percentage": round(profit_pct, 2),
-                    # "entry_time": trade.get('entry_time'),
-                    # "exit_time": trade.get('exit_time'),
-                    # "trade_type": "win" if profit_pct > 0 else "loss",
-                    "profit_size": self.classify_profit_size(profit_pct),
-                }
 
-                # Add duration only if both times are available
-                try:
-                    trade_info["trade_duration"] = self.calculate_trade_duration(trade)
-                except Exception as e:
-                    print(f"Error calculating trade duration: {e}")
-                    trade_info["trade_duration"] = "unknown"
-
-                trade_details.append(trade_info)
-                
-            except Exception as e:
-                print(f"Error processing trade {i}: {e}")
-                continue
+        profits = self.columns.profit
+        profit_sizes = np.select(
+            [profits > threshold for threshold in PROFIT_SIZE_THRESHOLDS],
+            PROFIT_SIZES[:-1],
+            default=PROFIT_SIZES[-1]
+        ).tolist()
+        durations = self.format_durations(self.columns.entry_time, self.columns.exit_time)
+
+        trade_details = [
+            {
+                "profit_percentage": round(profit_pct, 2),
+                "profit_size": profit_size,
+                "trade_duration": duration,
+            }
+            for profit_pct, profit_size, duration in zip(self.columns.profit_values, profit_sizes, durations)
+        ]
 
         return {
             "trade_details": trade_details,
             "pattern_metrics": self.calculate_pattern_metrics(trade_details)
         }
-        
-    def classify_profit_size(self, profit_pct):
-        if profit_pct > 20:
-            return "large_win"
-        elif profit_pct > 10:
-            return "medium_win"
-        elif profit_pct > 0:
-            return "small_win"
-        elif profit_pct > -10:
-            return "small_loss"
-        elif profit_pct > -20:
-            return "medium_loss"
-        else:
-            return "large_loss"
-            
-    def calculate_trade_duration(self, trade):
-        try:
-            entry_time = pd.to_datetime(trade['entry_time'])
-            exit_time = pd.to_datetime(trade['exit_time'])
-            # print(entry_time,exit_time)
-            duration = exit_time - entry_time
-            
-            # Convert duration to a more readable format
-            days = duration.days
-            hours = duration.seconds // 3600
-            minutes = (duration.seconds % 3600) // 60
-            # print(duration,days,hours,minutes)
 
+    def format_durations(self, entry_time, exit_time):
+        """'1d4h30m' style duration of every trade ("unknown" without both times), computed on whole arrays"""
+        valid = ~(np.isnat(entry_time) | np.isnat(exit_time))
+        duration = np.where(valid, exit_time.astype(np.int64) - entry_time.astype(np.int64), 0)
+        days = duration // NS_PER_DAY
+        remainder = duration - days * NS_PER_DAY
+        hours = remainder // NS_PER_HOUR
+        minutes = (remainder % NS_PER_HOUR) // NS_PER_MINUTE
+
+        durations = []
+        for is_valid, d, h, m in zip(valid.tolist(), days.tolist(), hours.tolist(), minutes.tolist()):
+            if not is_valid:
+                durations.append("unknown")
+                continue
             duration_parts = ""
-            if days > 0:    
-                duration_parts += f"{days}d"
-            if hours > 0:
-                duration_parts += f"{hours}h"
-            if minutes > 0:
-                duration_parts += f"{minutes}m"
-            
-            return duration_parts if len(duration_parts)>0 else "0m"
-            
-        except (ValueError, KeyError):
-            return "unknown"
-        
+            if d > 0:
+                duration_parts += f"{d}d"
+            if h > 0:
+                duration_parts += f"{h}h"
+            if m > 0:
+                duration_parts += f"{m}m"
+            durations.append(duration_parts if len(duration_parts)>0 else "0m")
+        return durations
+
     def calculate_pattern_metrics(self, trade_details):
         if not trade_details:
             return {}
-            
-        df = pd.DataFrame(trade_details)
-        # print("eeeeeeeeeeeee")
+
         print("Calculating pattern metrics")
+        counts = Counter(trade['profit_size'] for trade in trade_details)
         return {
             "profit_distribution": {
-                "large_wins": len(df[df['profit_size'] == 'large_win']),
-                "medium_wins": len(df[df['profit_size'] == 'medium_win']),
-                "small_wins": len(df[df['profit_size'] == 'small_win']),
-                "small_losses": len(df[df['profit_size'] == 'small_loss']),
-                "medium_losses": len(df[df['profit_size'] == 'medium_loss']),
-                "large_losses": len(df[df['profit_size'] == 'large_loss'])
+                "large_wins": counts['large_win'],
+                "medium_wins": counts['medium_win'],
+                "small_wins": counts['small_win'],
+                "small_losses": counts['small_loss'],
+                "medium_losses": counts['medium_loss'],
+                "large_losses": counts['large_loss']
             }
         }
         
@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from backtest.candle_store import KLINE_COLUMNS, arrays_to_frame
+from backtest.utils import add_technical_indicators, interval_to_ms
+
+BASE_INTERVAL = "1m"
+BASE_INTERVAL_MS = interval_to_ms(BASE_INTERVAL)
+# Binance weeks open on Monday 00:00 UTC, four days after the epoch
+WEEK_OFFSET_MS = 4 * 86_400_000
+# Summed rather than first/last/max/min when candles are merged
+SUM_COLUMNS = [
+    "volume", "quote asset volume", "number of trades",
+    "taker buy base asset volume", "taker buy quote asset volume",
+]
+
+
+def bucket_start(open_times, interval):
+    """Open time of the interval candle each open time falls into"""
+    if interval == "1M":
+        raise ValueError("Resampling to 1M is not supported, calendar months have no fixed length")
+    interval_ms = interval_to_ms(interval)
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (open_times - offset) // interval_ms * interval_ms + offset
+
+
+def resample_arrays(arrays, interval):
+    """
+    Aggregate 1m kline column arrays into interval candles: first open, max high,
+    min low, last close and summed volume/trade columns. A trailing candle whose
+    period isn't fully covered by the input is dropped.
+    """
+    interval_ms = interval_to_ms(interval)
+    open_times = np.asarray(arrays["open time"])
+    if len(open_times) == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in KLINE_COLUMNS}
+
+    buckets = bucket_start(open_times, interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(open_times)] - 1
+
+    resampled = {
+        "open time": buckets[starts],
+        "open": np.asarray(arrays["open"])[starts],
+        "high": np.maximum.reduceat(np.asarray(arrays["high"]), starts),
+        "low": np.minimum.reduceat(np.asarray(arrays["low"]), starts),
+        "close": np.asarray(arrays["close"])[ends],
+        "close time": buckets[starts] + interval_ms - 1,
+    }
+    for name in SUM_COLUMNS:
+        resampled[name] = np.add.reduceat(np.asarray(arrays[name]), starts)
+
+    if open_times[-1] < resampled["open time"][-1] + interval_ms - BASE_INTERVAL_MS:
+        resampled = {name: values[:-1] for name, values in resampled.items()}
+    return {name: resampled[name].astype(dtype) for name, dtype in KLINE_COLUMNS}
+
+
+class TimeframeStore:
+    """
+    Any interval built on demand from the candle store's 1m candles, so one
+    1m download serves every higher timeframe. Results are kept in a small
+    LRU cache shared by every TimeframeStore in the process.
+    """
+    MAX_ENTRIES = 32
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, candle_store):
+        self.candle_store = candle_store
+
+    def load(self, symbol, interval, start_time, end_time):
+        """Column arrays for interval candles opening within [start_time, end_time]"""
+        if interval == BASE_INTERVAL:
+            return self.candle_store.load(symbol, interval, start_time, end_time)
+
+        first_open = int(bucket_start(np.int64(start_time), interval))
+        last_open = int(bucket_start(np.int64(end_time), interval))
+        # Loaded (and topped up from Binance) first, it's memory-mapped so this is cheap
+        base = self.candle_store.load(
+            symbol, BASE_INTERVAL, first_open, last_open + interval_to_ms(interval) - BASE_INTERVAL_MS
+        )
+        # A range reaching the present gains 1m candles over time, and with them newly completed buckets
+        base_open_times = base["open time"]
+        base_end = int(base_open_times[-1]) if len(base_open_times) else None
+        key = (self.candle_store.root, symbol.upper(), interval, start_time, end_time, len(base_open_times), base_end)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        arrays = resample_arrays(base, interval)
+        keep = arrays["open time"] >= start_time
+        arrays = {name: values[keep] for name, values in arrays.items()}
+
+        with self._lock:
+            self._cache[key] = arrays
+            while len(self._cache) > self.MAX_ENTRIES:
+                self._cache.popitem(last=False)
+        return arrays
+
+    def get_frame(self, symbol, interval, start_time, end_time):
+        """Same layout as CandleStore.get_frame"""
+        df = arrays_to_frame(self.load(symbol, interval, start_time, end_time))
+        print(f"Resampled {len(df)} {interval} candles from {BASE_INTERVAL}.")
+        return df
+
+
+def parse_timeframe_reference(name):
+    """'sma_20@4h' -> ('sma_20', '4h'); None for same-timeframe names"""
+    if '@' not in name:
+        return None
+    indicator, interval = name.rsplit('@', 1)
+    interval_to_ms(interval)
+    return indicator, interval
+
+
+def split_required(required):
+    """Same-timeframe columns, and the indicators needed from each other timeframe"""
+    base = set()
+    other = {}
+    for name in required:
+        reference = parse_timeframe_reference(name)
+        if reference is None:
+            base.add(name)
+        else:
+            other.setdefault(reference[1], set()).add(reference[0])
+    return base, other
+
+
+def add_timeframe_indicators(df, required, custom_indicators, timeframes, symbol, start_time, end_time):
+    """
+    Add 'indicator@interval' columns to df. Each value is the one from the most
+    recent interval candle that had closed by the base candle's close, so a
+    bar never sees a higher-timeframe candle that was still forming.
+    """
+    _, other = split_required(required)
+    base_close = df['close time'].to_numpy(dtype='datetime64[ms]')
+    for interval, names in other.items():
+        frame = timeframes.get_frame(symbol, interval, start_time, end_time)
+        frame = add_technical_indicators(
+            frame, custom_indicators, names,
+            dataset_key=(symbol.upper(), interval, start_time, end_time, BASE_INTERVAL)
+        )
+        frame_close = frame['close time'].to_numpy(dtype='datetime64[ms]')
+        rows = np.searchsorted(frame_close, base_close, side='right') - 1
+        valid = rows >= 0
+        for name in names:
+            if name not in frame.columns:
+                raise KeyError(f"Indicator '{name}' not available on the {interval} timeframe")
+            values = frame[name].to_numpy(dtype=float)
+            df[f"{name}@{interval}"] = np.where(valid, values[np.maximum(rows, 0)], np.nan) if len(values) else np.nan
+    return df
+
+
+def load_frame(config, candle_store, symbol, start_time, end_time):
+    """Candles for the config's interval, resampled from 1m when config["resample"] is set"""
+    if config.get('resample'):
+        return TimeframeStore(candle_store).get_frame(symbol, config['interval'], start_time, end_time)
+    return candle_store.get_frame(symbol, config['interval'], start_time, end_time)
+
+
+def add_all_indicators(df, config, required, candle_store, symbol, start_time, end_time):
+    """add_technical_indicators for same-timeframe columns, then any 'indicator@interval' columns"""
+    base_required, other = split_required(required)
+    dataset_key = (symbol, config['interval'], start_time, end_time)
+    if config.get('resample'):
+        dataset_key += (BASE_INTERVAL,)
+    df = add_technical_indicators(df, config.get('custom_indicators'), base_required, dataset_key)
+    if other:
+        df = add_timeframe_indicators(
+            df, required, config.get('custom_indicators'), TimeframeStore(candle_store), symbol, start_time, end_time
+        )
+    return df
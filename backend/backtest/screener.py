@@ -0,0 +1,126 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import requests
+
+from backtest.candle_store import CandleStore
+from backtest.data import load_indicator_frame
+from backtest.fetcher import BASE_URL, KlineFetcher, RateLimiter
+from backtest.optimizer import evaluate_config, rank_results
+
+# Refresh the cached exchange info after a day
+EXCHANGE_INFO_MAX_AGE = 24 * 3600
+ALL_USDT_PAIRS = "all_usdt"
+
+
+def get_exchange_info_path():
+    """Cached exchangeInfo location, next to the candle store"""
+    return os.path.join(os.path.dirname(CandleStore.get_store_dir()), 'exchange_info.json')
+
+
+def load_exchange_info(path=None, max_age=EXCHANGE_INFO_MAX_AGE):
+    """Binance exchangeInfo from the local cache, downloaded again when missing or stale"""
+    path = path or get_exchange_info_path()
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age:
+        with open(path) as f:
+            return json.load(f)
+
+    print("Downloading Binance exchange info")
+    response = requests.get(f"{BASE_URL}/api/v3/exchangeInfo")
+    response.raise_for_status()
+    info = response.json()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(info, f)
+    os.replace(tmp_path, path)
+    return info
+
+
+def usdt_pairs(exchange_info):
+    """Symbols currently trading against USDT"""
+    return sorted(
+        symbol['symbol'] for symbol in exchange_info['symbols']
+        if symbol.get('quoteAsset') == 'USDT' and symbol.get('status') == 'TRADING'
+    )
+
+
+def resolve_symbols(symbols):
+    """A list of symbols, or "all_usdt" for every USDT pair in the cached exchange info"""
+    if isinstance(symbols, str):
+        if symbols.lower() != ALL_USDT_PAIRS:
+            raise ValueError(f"Invalid symbols: {symbols}. Must be a list of symbols or '{ALL_USDT_PAIRS}'")
+        return usdt_pairs(load_exchange_info())
+    if not symbols:
+        raise ValueError("No symbols to screen")
+    return list(dict.fromkeys(symbol.upper() for symbol in symbols))
+
+
+# Set in each worker process by _init_worker
+_candle_store = None
+
+
+def _init_worker(store_root, workers):
+    global _candle_store
+    # Workers share Binance's per-IP weight budget, so each fetches with its slice
+    fetcher = KlineFetcher(limiter=RateLimiter(capacity=max(1, RateLimiter().capacity // workers)))
+    _candle_store = CandleStore(store_root, fetch=fetcher.fetch)
+
+
+def _screen_symbol(symbol, config):
+    try:
+        df = load_indicator_frame(config, _candle_store, symbol)
+        return {"symbol": symbol, "metrics": evaluate_config(df, config)}
+    except Exception as e:
+        return {"symbol": symbol, "metrics": {}, "error": str(e)}
+
+
+def screen(config, symbols, candle_store, metric='total_return', max_workers=None):
+    """
+    Backtest config on every symbol across a process pool. Yields each
+    {"symbol", "metrics"} result as it finishes, then a final ranked
+    {"leaderboard": [...]} entry.
+    """
+    symbols = resolve_symbols(symbols)
+    workers = max_workers or int(os.getenv('SCREENER_WORKERS', os.cpu_count() or 2))
+    workers = max(1, min(workers, len(symbols)))
+    mp_context = multiprocessing.get_context('spawn')
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(candle_store.root, workers)) as pool:
+        futures = [pool.submit(_screen_symbol, symbol, config) for symbol in symbols]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            yield {**result, "completed": done, "total": len(symbols)}
+
+    yield {"leaderboard": rank_results(results, metric), "metric": metric}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one strategy across many symbols and rank them")
+    parser.add_argument('config', help="Strategy config JSON (same format as POST /api/backtest)")
+    parser.add_argument('symbols', nargs='*', help=f"Symbols to screen (default: {ALL_USDT_PAIRS})")
+    parser.add_argument('--metric', default='total_return', help="Basic metric to rank by")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+
+    for entry in screen(config, args.symbols or ALL_USDT_PAIRS, CandleStore(), args.metric, args.workers):
+        if "leaderboard" in entry:
+            print(json.dumps(entry["leaderboard"][:args.top], indent=4, default=float))
+        else:
+            status = entry.get("error") or entry["metrics"].get(args.metric)
+            print(f"[{entry['completed']}/{entry['total']}] {entry['symbol']}: {status}")
+
+
+if __name__ == "__main__":
+    main()
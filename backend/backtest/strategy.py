@@ -1,63 +1,103 @@
+import operator
+import numpy as np
+
+from backtest.execution import ExecutionModel
+
+OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '==': operator.eq,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+
+class Operand:
+    """An indicator reference resolved once when the strategy is compiled"""
+    def __init__(self, name):
+        self.name = name
+        # '20-50-ratio' is a built-in derived value, everything else is a dataframe column
+        if name == '20-50-ratio':
+            self.columns = ('sma_20', 'sma_50')
+        else:
+            self.columns = (name,)
+
+    def value(self, data):
+        try:
+            if len(self.columns) == 2:
+                return data[self.columns[0]] / data[self.columns[1]]
+            return data[self.name]
+        except KeyError:
+            raise KeyError(f"Indicator '{self.name}' not found in data. Available indicators: {list(data.keys())}")
+
+    def array(self, df, arrays):
+        """Whole-column values; arrays caches columns already pulled out of df"""
+        values = []
+        for column in self.columns:
+            if column not in arrays:
+                try:
+                    arrays[column] = df[column].to_numpy(dtype=float)
+                except KeyError:
+                    raise KeyError(f"Indicator '{column}' not found in data. Available indicators: {list(df.columns)}")
+            values.append(arrays[column])
+        if len(values) == 2:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return values[0] / values[1]
+        return values[0]
+
+
+class Constant:
+    """A number_input operand, parsed to float once"""
+    columns = ()
+
+    def __init__(self, value):
+        self.value_ = float(value)
+
+    def value(self, data):
+        return self.value_
+
+    def array(self, df, arrays):
+        return self.value_
+
+
 class Condition:
     def __init__(self, lhs, operator, rhs):
         self.lhs = lhs 
         self.operator = operator 
         self.rhs = rhs 
+
+        # Compile once so evaluate() does no per-bar interpretation of the config
+        if operator not in OPERATORS:
+            raise ValueError(f"Invalid operator: {operator}. Must be one of {list(OPERATORS)}")
+        self.compare = OPERATORS[operator]
+        self.lhs_operand = Operand(lhs)
+        self.rhs_operand = self._compile_rhs(rhs)
+
+    def _compile_rhs(self, rhs):
+        if rhs.get('type') == 'indicator' and 'indicator' in rhs:
+            return Operand(rhs['indicator'])
+        elif rhs.get('type') == 'number_input':
+            return Constant(rhs['value'])
+        raise ValueError(f"Invalid RHS value: {rhs}")
+
+    @property
+    def columns(self):
+        """Dataframe columns this condition reads"""
+        return self.lhs_operand.columns + self.rhs_operand.columns
         
     def evaluate(self, data):
         """Evaluate the condition against market data"""
-        lhs_value = self._get_value(self.lhs, data)
-        
-        if self.rhs['type'] == 'indicator':
-            if 'indicator' in self.rhs:
-                rhs_value = self._get_value(self.rhs['indicator'], data)
-            else:
-                rhs_value = None
-        elif self.rhs['type'] == 'number_input':  # number_input
-            rhs_value = float(self.rhs['value'])
-        
-        # Ensure rhs_value is valid before proceeding with comparisons
-        if rhs_value is None:
-            raise ValueError(f"Invalid RHS value: {self.rhs}")
-        
-        # Evaluate condition
-        if self.operator == '>':
-            return lhs_value > rhs_value
-        elif self.operator == '<':
-            return lhs_value < rhs_value
-        elif self.operator == '==':
-            return lhs_value == rhs_value
-        elif self.operator == '>=':
-            return lhs_value >= rhs_value
-        elif self.operator == '<=':
-            return lhs_value <= rhs_value
-
-    def _get_value(self, indicator, data):
-        # Check if indicator is a custom one
-        if indicator == '20-50-ratio':
-            # Compute custom indicator value
-            sma_20 = data['sma_20']  # Assuming sma_20 is available in data
-            sma_50 = data['sma_50']  # Assuming sma_50 is available in data
-            return sma_20 / sma_50  # This is the custom calculation for 20-50 ratio
-        
-        # Otherwise, handle standard indicators
-        try:
-            if indicator == 'close':
-                return data['close']
-            elif indicator == 'volume':
-                return data['volume']
-            elif indicator == 'sma_20':
-                return data['sma_20']
-            elif indicator == 'sma_50':
-                return data['sma_50']
-            elif indicator == 'atr':
-                return data['atr']
-            elif indicator == 'rsi':
-                return data['rsi']
-            else:
-                return data[indicator]
-        except KeyError:
-            raise KeyError(f"Indicator '{indicator}' not found in data. Available indicators: {list(data.keys())}")
+        return self.compare(self.lhs_operand.value(data), self.rhs_operand.value(data))
+
+    def evaluate_array(self, df, arrays=None):
+        """Evaluate the condition against every row of the dataframe at once"""
+        if arrays is None:
+            arrays = {}
+        lhs_values = self.lhs_operand.array(df, arrays)
+        rhs_values = self.rhs_operand.array(df, arrays)
+        # NaN comparisons are False, same as the row-by-row evaluation
+        with np.errstate(invalid='ignore'):
+            return self.compare(lhs_values, rhs_values)
 
 
 
@@ -65,21 +105,38 @@ class Strategy:
     def __init__(self, config):
         # Each entry_condition is a list of subconditions (ANDed together)
         # Multiple entry_conditions are ORed together
+        # Conditions are compiled here, so the config is only interpreted once per run
         self.entry_conditions = [
-            [Condition(subcond['lhs'], subcond['operator'], subcond['rhs']) 
-             for subcond in condition]
+            tuple(Condition(subcond['lhs'], subcond['operator'], subcond['rhs'])
+                  for subcond in condition)
             for condition in config['entry_conditions']
         ]
         
         self.exit_conditions = [
-            [Condition(subcond['lhs'], subcond['operator'], subcond['rhs'])
-             for subcond in condition]
+            tuple(Condition(subcond['lhs'], subcond['operator'], subcond['rhs'])
+                  for subcond in condition)
             for condition in config['exit_conditions']
         ]
         
         self.risk_manager = RiskManager(config.get('risk_management', {}))
+        self.execution = ExecutionModel(config.get('execution', {}))
+        self.exit_reason = None
+
+        # Bar x condition checks made so far, read by the pipeline instrumentation
+        self.condition_evaluations = 0
+        self.entry_size = sum(len(group) for group in self.entry_conditions)
+        self.exit_size = sum(len(group) for group in self.exit_conditions)
+
+    def required_columns(self):
+        """Dataframe columns read by the entry and exit conditions"""
+        columns = {'close'}
+        for condition_group in self.entry_conditions + self.exit_conditions:
+            for condition in condition_group:
+                columns.update(condition.columns)
+        return columns
         
     def check_entry(self, data):
+        self.condition_evaluations += self.entry_size
         for condition_group in self.entry_conditions:
             # All subconditions in the group must be true
             if all(condition.evaluate(data) for condition in condition_group):
@@ -88,22 +145,41 @@ class Strategy:
         
     def check_exit(self, data, entry_price):
         """Check both strategy exit conditions and risk management"""
+        self.condition_evaluations += self.exit_size
         strategy_exit = any(
             all(condition.evaluate(data) for condition in condition_group)
             for condition_group in self.exit_conditions
         )
         
         #  risk management conditions
-        risk_exit = self.risk_manager.check_exit_conditions(
+        risk_exit = self.risk_manager.triggered_exit(
             data['close'], 
             entry_price
         )
-        if strategy_exit:
-            print("Strategy exit condition met")
-        if risk_exit:
-            print("Risk management exit condition met")
-        return strategy_exit or risk_exit
+        # Why the trade is closed, for the trade log
+        self.exit_reason = 'signal' if strategy_exit else risk_exit
+        return strategy_exit or risk_exit is not None
         # return strategy_exit
+
+    def entry_mask(self, df):
+        """Boolean array of bars where check_entry would be True"""
+        return self._conditions_mask(self.entry_conditions, df)
+
+    def exit_mask(self, df):
+        """Boolean array of bars where the strategy exit conditions are met (risk management excluded)"""
+        return self._conditions_mask(self.exit_conditions, df)
+
+    def _conditions_mask(self, condition_groups, df):
+        # OR across groups, AND within a group; each column is pulled out of df once
+        arrays = {}
+        mask = np.zeros(len(df), dtype=bool)
+        self.condition_evaluations += len(df) * sum(len(group) for group in condition_groups)
+        for condition_group in condition_groups:
+            group_mask = np.ones(len(df), dtype=bool)
+            for condition in condition_group:
+                group_mask &= condition.evaluate_array(df, arrays)
+            mask |= group_mask
+        return mask
         
     def reset_risk_manager(self):
         """Reset risk manager for new trade"""
@@ -115,6 +191,18 @@ class RiskManager:
         self.take_profit = config.get('take_profit', None)
         self.trailing_stop = config.get('trailing_stop_loss', None)
         self.trailing_take_profit = config.get('trailing_take_profit', None)
+
+        # Percentages parsed once instead of on every bar, as floats so 1.5% stays 1.5%
+        if self.stop_loss:
+            self.stop_loss_pct = float(self.stop_loss['value'])
+        if self.take_profit:
+            self.take_profit_pct = float(self.take_profit['value'])
+        if self.trailing_stop:
+            self.trailing_stop_activation = float(self.trailing_stop['activation']['value'])
+            self.trailing_stop_callback = float(self.trailing_stop['callback']['value'])
+        if self.trailing_take_profit:
+            self.trailing_take_profit_activation = float(self.trailing_take_profit['activation']['value'])
+            self.trailing_take_profit_callback = float(self.trailing_take_profit['callback']['value'])
         
         self.highest_price = None
         self.lowest_price = None
@@ -126,52 +214,58 @@ class RiskManager:
         
     def check_exit_conditions(self, current_price, entry_price):
         """Check all risk management exit conditions"""
+        return self.triggered_exit(current_price, entry_price) is not None
+
+    def triggered_exit(self, current_price, entry_price):
+        """Update the tracked prices with this bar and return the exit reason, or None"""
         if not entry_price:
-            return False
+            return None
             
         if self.highest_price is None:
             self.initialize_trade(entry_price)
-            
-        profit_pct = ((current_price - entry_price) / entry_price) * 100
         
         # Update tracking prices
         self.highest_price = max(self.highest_price, current_price)
         self.lowest_price = min(self.lowest_price, current_price)
+
+        return self.exit_reason(current_price, entry_price, self.highest_price)
+
+    def exit_reason(self, current_price, entry_price, highest_price):
+        """Which risk rule (if any) closes the trade at current_price, given the peak so far"""
+        profit_pct = ((current_price - entry_price) / entry_price) * 100
         
         if self.stop_loss:
-            stop_price = entry_price * (1 - self.stop_loss['value']/100)
+            stop_price = entry_price * (1 - self.stop_loss_pct/100)
             if current_price <= stop_price:
-                return True
+                return 'stop_loss'
                 
         if self.take_profit:
-            take_profit_price = entry_price * (1 + int(self.take_profit['value'])/100)
+            take_profit_price = entry_price * (1 + self.take_profit_pct/100)
             if current_price >= take_profit_price:
-                return True
+                return 'take_profit'
                 
         if self.trailing_stop:
-            activation_pct = int(self.trailing_stop['activation']['value'])
-            callback_pct = int(self.trailing_stop['callback']['value'])
+            activation_pct = self.trailing_stop_activation
+            callback_pct = self.trailing_stop_callback
             
             # Only activate trailing stop if we're in sufficient profit
             if profit_pct >= activation_pct:
-                # print("Trailing stop activated")
-                trailing_stop_price = self.highest_price * (1 - callback_pct/100)
+                trailing_stop_price = highest_price * (1 - callback_pct/100)
                 if current_price <= trailing_stop_price:
-                    return True
+                    return 'trailing_stop'
                     
         if self.trailing_take_profit:
-            activation_pct = int(self.trailing_take_profit['activation']['value'])
-            callback_pct = int(self.trailing_take_profit['callback']['value'])
+            activation_pct = self.trailing_take_profit_activation
+            callback_pct = self.trailing_take_profit_callback
             
             if profit_pct >= activation_pct:
-                # print("Trailing take profit activated")
                 #   track how far price has fallen from peak
-                drawdown_from_peak = ((self.highest_price - current_price) / self.highest_price) * 100
+                drawdown_from_peak = ((highest_price - current_price) / highest_price) * 100
                 if drawdown_from_peak >= callback_pct:
-                    return True
+                    return 'trailing_take_profit'
                     
-        return False
-        
+        return None
+
     def reset(self):
         """Reset tracking variables for new trade"""
         self.highest_price = None
@@ -0,0 +1,321 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from backtest.utils import parse_indicator
+
+NAN = float('nan')
+
+
+class RollingMean:
+    """
+    O(1) rolling mean; NaN until the window is full. Uses the arithmetic of pandas
+    rolling().mean() (Kahan-compensated running sum, the repeated value itself when
+    the whole window holds one value), so results match the batch indicators bit for
+    bit and a comparison like close > sma_7 on a flat stretch can't flip.
+    """
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        # Separate compensations for values entering and leaving the window, as in pandas
+        self.add_compensation = 0.0
+        self.remove_compensation = 0.0
+        self.negatives = 0
+        self.repeats = 0
+        self.prev = NAN
+
+    def update(self, x):
+        if len(self.window) == self.period:
+            old = self.window[0]
+            y = -old - self.remove_compensation
+            t = self.total + y
+            self.remove_compensation = t - self.total - y
+            self.total = t
+            if math.copysign(1.0, old) < 0:
+                self.negatives -= 1
+        self.window.append(x)
+        y = x - self.add_compensation
+        t = self.total + y
+        self.add_compensation = t - self.total - y
+        self.total = t
+        if math.copysign(1.0, x) < 0:
+            self.negatives += 1
+        self.repeats = self.repeats + 1 if x == self.prev else 1
+        self.prev = x
+
+        if len(self.window) < self.period:
+            return NAN
+        if self.repeats >= self.period:
+            return x
+        mean = self.total / self.period
+        # A window without negative (or positive) values can't have a mean of the other sign
+        if self.negatives == 0 and mean < 0:
+            return 0.0
+        if self.negatives == self.period and mean > 0:
+            return 0.0
+        return mean
+
+
+class ExponentialMean:
+    """
+    ewm(com=com, adjust=False).mean() one value at a time, with pandas' arithmetic.
+    NaN until the first non-NaN value, which seeds it.
+    """
+    def __init__(self, com):
+        self.alpha = 1. / (1. + com)
+        self.old_weight_factor = 1. - self.alpha
+        self.old_weight = 1.
+        self.value = NAN
+
+    def update(self, x):
+        if math.isnan(self.value):
+            self.value = x
+            return self.value
+        self.old_weight *= self.old_weight_factor
+        if not math.isnan(x):
+            # Skipped on a constant series, where the formula would add rounding noise
+            if self.value != x:
+                self.value = (self.old_weight * self.value + self.alpha * x) / (self.old_weight + self.alpha)
+            self.old_weight = 1.
+        return self.value
+
+
+class StreamingSMA:
+    def __init__(self, period, source='close'):
+        self.source = source
+        self.mean = RollingMean(period)
+        self.value = NAN
+
+    def update(self, candle):
+        self.value = self.mean.update(candle[self.source])
+        return self.value
+
+
+class StreamingEMA:
+    """Matches ewm(span=period, adjust=False): seeded with the first value"""
+    def __init__(self, period, source='close'):
+        self.source = source
+        # pandas turns span into a center of mass before deriving alpha
+        self.mean = ExponentialMean((period - 1) / 2)
+        self.value = NAN
+
+    def update_value(self, x):
+        self.value = self.mean.update(x)
+        return self.value
+
+    def update(self, candle):
+        return self.update_value(candle[self.source])
+
+
+class Wilder:
+    """Wilder's smoothing seeded with the mean of the first period values, like calculate_wilder"""
+    def __init__(self, period):
+        self.period = period
+        self.seed = []
+        alpha = 1 / period
+        # calculate_wilder passes alpha, which pandas turns into a center of mass
+        self.mean = ExponentialMean((1 - alpha) / alpha)
+        self.value = NAN
+
+    def update(self, x):
+        if len(self.seed) < self.period:
+            self.seed.append(x)
+            if len(self.seed) == self.period:
+                # np.mean sums pairwise, exactly like values[:period].mean() in calculate_wilder
+                self.value = self.mean.update(float(np.mean(self.seed)))
+            return self.value
+        self.value = self.mean.update(x)
+        return self.value
+
+
+class StreamingRSI:
+    """Matches calculate_rsi: simple rolling means of gains and losses"""
+    def __init__(self, period=14, source='close'):
+        self.source = source
+        self.gains = RollingMean(period)
+        self.losses = RollingMean(period)
+        self.prev = None
+        self.value = NAN
+
+    def update(self, candle):
+        x = candle[self.source]
+        # The first bar has no change; calculate_rsi counts it as zero gain and loss
+        delta = 0.0 if self.prev is None else x - self.prev
+        self.prev = x
+        gain = self.gains.update(delta if delta > 0 else 0.0)
+        loss = self.losses.update(-delta if delta < 0 else 0.0)
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            self.value = NAN
+        elif loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - (100 / (1 + gain / loss))
+        return self.value
+
+
+class StreamingTR:
+    def __init__(self):
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, candle):
+        high, low = candle['high'], candle['low']
+        if self.prev_close is None:
+            self.value = high - low
+        else:
+            self.value = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = candle['close']
+        return self.value
+
+
+class StreamingATR:
+    def __init__(self, period=14, smoothing='sma'):
+        self.tr = StreamingTR()
+        self.smoother = Wilder(period) if smoothing == 'wilder' else RollingMean(period)
+        self.value = NAN
+
+    def update(self, candle):
+        self.value = self.smoother.update(self.tr.update(candle))
+        return self.value
+
+
+class StreamingMACD:
+    """MACD line in value, plus signal and hist, matching calculate_macd"""
+    def __init__(self, fast=12, slow=26, signal=9, source='close'):
+        self.source = source
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal_ema = StreamingEMA(signal)
+        self.value = self.signal = self.hist = NAN
+
+    def update(self, candle):
+        x = candle[self.source]
+        self.value = self.fast.update_value(x) - self.slow.update_value(x)
+        self.signal = self.signal_ema.update_value(self.value)
+        self.hist = self.value - self.signal
+        return self.value
+
+
+class StreamingROC:
+    def __init__(self, period=10, source='close'):
+        self.source = source
+        self.window = deque(maxlen=period + 1)
+        self.value = NAN
+
+    def update(self, candle):
+        self.window.append(candle[self.source])
+        if len(self.window) <= self.window.maxlen - 1:
+            self.value = NAN
+        else:
+            old = self.window[0]
+            self.value = divide(self.window[-1] - old, old) * 100
+        return self.value
+
+
+class StreamingCandleReturn:
+    def __init__(self):
+        self.value = NAN
+
+    def update(self, candle):
+        self.value = divide(candle['close'] - candle['open'], candle['open']) * 100
+        return self.value
+
+
+CUSTOM_OPERATORS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: divide(a, b),
+}
+
+
+def divide(a, b):
+    """Float division with pandas semantics: x/0 is +-inf and 0/0 is NaN"""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class IncrementalIndicatorEngine:
+    """
+    Keeps O(1)-per-candle state for a set of indicator names (the same names
+    the batch IndicatorCalculator understands) plus custom indicators.
+    update(candle) returns the candle merged with the current indicator
+    values, ready for Strategy.check_entry/check_exit. States are plain
+    objects, so an engine can be pickled and resumed later instead of
+    recomputing history.
+    """
+    def __init__(self, names, custom_indicators=None):
+        self.custom_indicators = list(custom_indicators or [])
+        custom_names = {indicator['name'] for indicator in self.custom_indicators}
+        # Custom indicator operands have to be tracked too
+        wanted = set(names) - custom_names
+        for indicator in self.custom_indicators:
+            wanted.update(op for op in (indicator['op1'], indicator['op2']) if op not in custom_names)
+
+        self.states = {}
+        # name -> (state key, attribute) so MACD line/signal/hist share one state
+        self.outputs = {}
+        for name in sorted(wanted):
+            spec = self._state_for(name)
+            if spec is not None:
+                key, factory, attribute = spec
+                if key not in self.states:
+                    self.states[key] = factory()
+                self.outputs[name] = (key, attribute)
+
+    def _state_for(self, name):
+        if name == 'tr':
+            return ('tr',), StreamingTR, 'value'
+        if name == 'candle_return':
+            return ('candle_return',), StreamingCandleReturn, 'value'
+        if name == 'volume_ma_20':
+            return ('volume_sma', (20,)), lambda: StreamingSMA(20, 'volume'), 'value'
+        parsed = parse_indicator(name)
+        if parsed is None:
+            # Raw candle field
+            return None
+        kind, params = parsed
+        if kind == 'sma':
+            return parsed, lambda: StreamingSMA(params[0]), 'value'
+        if kind == 'ema':
+            return parsed, lambda: StreamingEMA(params[0]), 'value'
+        if kind == 'volume_sma':
+            return parsed, lambda: StreamingSMA(params[0], 'volume'), 'value'
+        if kind == 'rsi':
+            return parsed, lambda: StreamingRSI(params[0]), 'value'
+        if kind == 'atr':
+            return parsed, lambda: StreamingATR(params[0]), 'value'
+        if kind == 'atr_wilder':
+            return parsed, lambda: StreamingATR(params[0], 'wilder'), 'value'
+        if kind == 'roc':
+            return parsed, lambda: StreamingROC(params[0]), 'value'
+        if kind in ('macd', 'macd_signal', 'macd_hist'):
+            attribute = {'macd': 'value', 'macd_signal': 'signal', 'macd_hist': 'hist'}[kind]
+            return ('macd', params), lambda: StreamingMACD(*params), attribute
+        raise ValueError(f"Indicator {name} has no streaming implementation")
+
+    def update(self, candle):
+        for state in self.states.values():
+            state.update(candle)
+        values = dict(candle)
+        for name, (key, attribute) in self.outputs.items():
+            values[name] = getattr(self.states[key], attribute)
+        for indicator in self.custom_indicators:
+            if indicator['oper'] not in CUSTOM_OPERATORS:
+                raise ValueError(f"Invalid operator: {indicator['oper']}. Must be one of +,-,*,/")
+            values[indicator['name']] = CUSTOM_OPERATORS[indicator['oper']](
+                values[indicator['op1']], values[indicator['op2']]
+            )
+        return values
+
+    def warm_up(self, candles):
+        """Feed history (e.g. CandleStore.iter_candles) and return the latest values"""
+        values = None
+        for candle in candles:
+            values = self.update(candle)
+        return values
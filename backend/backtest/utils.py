@@ -1,24 +1,49 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 import requests
-import time
+from backtest.candles import arrays_to_frame, klines_to_arrays
+from backtest.fetcher import KlineFetcher, interval_to_ms
+
+# Shared so every request in the process draws from the same rate-limit budget
+kline_fetcher = KlineFetcher()
 
 def calculate_sma(data, period):
     return data.rolling(window=period).mean()
 
 def calculate_tr(data):
-    high = data['high']
-    low = data['low']
-    close = data['close'].shift(1)
-    
-    tr1 = high - low
-    tr2 = abs(high - close)
-    tr3 = abs(low - close)
-    
-    tr = pd.DataFrame([tr1, tr2, tr3]).max()
-    return tr
+    high = data['high'].to_numpy(dtype=float)
+    low = data['low'].to_numpy(dtype=float)
+    close = data['close'].to_numpy(dtype=float)
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+
+    # fmax skips NaN like DataFrame.max(), so the first bar's TR is high - low
+    tr = np.fmax.reduce([
+        high - low,
+        np.abs(high - prev_close),
+        np.abs(low - prev_close)
+    ])
+    return pd.Series(tr, index=data.index)
 
-def calculate_atr(data, period=14):
+def calculate_wilder(data, period):
+    """Wilder's smoothing (RMA), seeded with the simple mean of the first period values"""
+    values = data.to_numpy(dtype=float)
+    seeded = np.full(len(values), np.nan)
+    if len(values) >= period:
+        seeded[period - 1] = values[:period].mean()
+        seeded[period:] = values[period:]
+    return pd.Series(seeded, index=data.index).ewm(alpha=1 / period, adjust=False).mean()
+
+def calculate_atr(data, period=14, smoothing='sma'):
+    """ATR over true range; smoothing is 'sma' (rolling mean) or 'wilder'"""
     tr = calculate_tr(data)
+    if smoothing == 'wilder':
+        return calculate_wilder(tr, period)
     return tr.rolling(window=period).mean()
 
 def calculate_rsi(data, period=14):
@@ -28,6 +53,9 @@ def calculate_rsi(data, period=14):
     rs = gain / loss
     return 100 - (100 / (1 + rs))
 
+def calculate_ema(data, period):
+    return data.ewm(span=period, adjust=False).mean()
+
 def calculate_macd(data, fast=12, slow=26, signal=9):
     exp1 = data.ewm(span=fast, adjust=False).mean()
     exp2 = data.ewm(span=slow, adjust=False).mean()
@@ -46,23 +74,9 @@ def calculate_candle_return(data):
 
 def transform_data(prices, PAIR):
     print(f"Retrieved {len(prices)} candles.")
-    
-    df = pd.DataFrame(prices, columns=[
-        "open time", "open", "high", "low", "close", "volume",
-        "close time", "quote asset volume", "number of trades",
-        "taker buy base asset volume", "taker buy quote asset volume", "ignore"
-    ])
-    
-    # Convert numeric columns
-    numeric_columns = ["open", "high", "low", "close", "volume", 
-                      "quote asset volume", "number of trades",
-                      "taker buy base asset volume", "taker buy quote asset volume"]
-    for col in numeric_columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Convert timestamps
-    df["open time"] = pd.to_datetime(df["open time"], unit="ms")
-    df["close time"] = pd.to_datetime(df["close time"], unit="ms")
+
+    # Typed column arrays first, then the compact frame schema (no "ignore" column)
+    df = arrays_to_frame(klines_to_arrays(prices))
     
     print("Calculated technical indicators...")
     
@@ -82,51 +96,15 @@ def fetch_price_history_by_limit(symbol, BASE_URL, interval="1m", limit=180):
     return response.json()
 
 def fetch_price_history_by_interval(symbol, interval, start_time, end_time=None):
-    """Fetch large historical data using pagination."""
-    url = "https://api.binance.com/api/v3/klines"
-    all_klines = []
-
-    while True:
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "startTime": start_time,
-            "limit": 1000,
-        }
-        if end_time:
-            params["endTime"] = end_time
-        print("Fetching data...")
-        response = requests.get(url, params=params)
-        print("Fetched data...")
-        # print(response)
-        # print(f"Status Code: {response.status_code}")
-        # print(f"Headers: {response.headers}")
-        # print(f"Content: {response.text[:500]}")  # Print the first 500 characters of the content
-
-        response.raise_for_status()
-        data = response.json()
-        # print(data)
-        
-        if not data:
-            break  
-        
-        all_klines.extend(data)
-        start_time = data[-1][6] + 1  
-
-        # Break if we've reached the end_time
-        if end_time and start_time >= end_time:
-            break
-
-        time.sleep(0.1)
+    """Fetch large historical data using concurrent, rate-limited pagination."""
+    return kline_fetcher.fetch(symbol, interval, start_time, end_time)
 
-    return all_klines
 
 
-
-def add_technical_indicators(df, custom_indicators=None):
+def add_technical_indicators(df, custom_indicators=None, required=None, dataset_key=None):
 
     calculator = IndicatorCalculator()
-    return calculator.add_indicators(df, custom_indicators)
+    return calculator.add_indicators(df, custom_indicators, required, dataset_key)
 
 
 # def calculate_technical_indicators(df):
@@ -139,25 +117,189 @@ def add_technical_indicators(df, custom_indicators=None):
     
 #     return add_technical_indicators(df, all_indicators) 
 
+# Parameterized indicator names, e.g. sma_37, ema_12, rsi_7, atr_21, atr_wilder_14, roc_5, macd_12_26_9.
+# kind -> (name pattern, default params when the suffix is omitted)
+INDICATOR_PATTERNS = {
+    'sma': (re.compile(r'^sma_(\d+)$'), None),
+    'ema': (re.compile(r'^ema_(\d+)$'), None),
+    'volume_sma': (re.compile(r'^volume_sma_(\d+)$'), None),
+    'rsi': (re.compile(r'^rsi(?:_(\d+))?$'), (14,)),
+    'atr': (re.compile(r'^atr(?:_(\d+))?$'), (14,)),
+    'atr_wilder': (re.compile(r'^atr_wilder(?:_(\d+))?$'), (14,)),
+    'roc': (re.compile(r'^roc(?:_(\d+))?$'), (10,)),
+    'macd': (re.compile(r'^macd(?:_(\d+)_(\d+)_(\d+))?$'), (12, 26, 9)),
+    'macd_signal': (re.compile(r'^macd_signal(?:_(\d+)_(\d+)_(\d+))?$'), (12, 26, 9)),
+    'macd_hist': (re.compile(r'^macd_hist(?:_(\d+)_(\d+)_(\d+))?$'), (12, 26, 9)),
+}
+
+# Longest lookback accepted for a parameterized indicator
+MAX_INDICATOR_PERIOD = 10000
+
+
+def parse_indicator(name):
+    """Return (kind, params) for a parameterized indicator name, or None"""
+    for kind, (pattern, defaults) in INDICATOR_PATTERNS.items():
+        match = pattern.match(name)
+        if not match:
+            continue
+        if match.group(1) is None:
+            return kind, defaults
+        params = tuple(int(group) for group in match.groups())
+        if any(p < 1 or p > MAX_INDICATOR_PERIOD for p in params):
+            raise ValueError(f"Invalid period in indicator {name}: must be between 1 and {MAX_INDICATOR_PERIOD}")
+        return kind, params
+    return None
+
+
+def indicator_spec(kind, params):
+    """(columns it is computed from, function) for a parameterized indicator"""
+    if kind == 'sma':
+        return ('close',), lambda x: calculate_sma(x['close'], params[0])
+    if kind == 'ema':
+        return ('close',), lambda x: calculate_ema(x['close'], params[0])
+    if kind == 'volume_sma':
+        return ('volume',), lambda x: calculate_sma(x['volume'], params[0])
+    if kind == 'rsi':
+        return ('close',), lambda x: calculate_rsi(x['close'], params[0])
+    if kind == 'atr':
+        return ('tr',), lambda x: calculate_sma(x['tr'], params[0])
+    if kind == 'atr_wilder':
+        return ('tr',), lambda x: calculate_wilder(x['tr'], params[0])
+    if kind == 'roc':
+        return ('close',), lambda x: calculate_roc(x['close'], params[0])
+
+    # MACD pieces are chained so the EMAs are computed once per parameter set
+    suffix = '_'.join(str(p) for p in params)
+    if kind == 'macd':
+        fast, slow, _ = params
+        return ('close',), lambda x: calculate_ema(x['close'], fast) - calculate_ema(x['close'], slow)
+    if kind == 'macd_signal':
+        return (f'macd_{suffix}',), lambda x: calculate_ema(x[f'macd_{suffix}'], params[2])
+    if kind == 'macd_hist':
+        return (f'macd_{suffix}', f'macd_signal_{suffix}'), lambda x: x[f'macd_{suffix}'] - x[f'macd_signal_{suffix}']
+    raise ValueError(f"Unknown indicator kind: {kind}")
+
+
+class IndicatorCache:
+    """
+    Process-wide memo of computed indicator series, keyed by
+    (dataset key, indicator kind, params). The dataset key identifies the
+    candles (symbol, interval, range and row count), so repeated runs and
+    sweeps over the same candles never recompute a series. Least recently
+    used entries are evicted past max_bytes.
+    """
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            values = self.entries.get(key)
+            if values is not None:
+                self.entries.move_to_end(key)
+            return values
+
+    def put(self, key, values):
+        values = values.copy()
+        values.flags.writeable = False
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = values
+            self.size += values.nbytes
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+
+indicator_cache = IndicatorCache()
+
+
 class IndicatorCalculator:
-    def __init__(self):
+    def __init__(self, cache=indicator_cache):
+        # Computed when no required columns are given; name -> (columns it is computed from, function)
         self.base_indicators = {
-            'sma_20': lambda x: calculate_sma(x['close'], 20),
-            'sma_50': lambda x: calculate_sma(x['close'], 50),
-            'sma_200': lambda x: calculate_sma(x['close'], 200),
-            'volume_sma_5': lambda x: calculate_sma(x['volume'], 5),
-            'volume_ma_20': lambda x: calculate_sma(x['volume'], 20),
-            'volume_sma_50': lambda x: calculate_sma(x['volume'], 50),
-            'tr': calculate_tr,
-            'atr': lambda x: calculate_atr(x, 14),
-            'rsi': lambda x: calculate_rsi(x['close'], 14),
-            'candle_return': calculate_candle_return
+            'sma_20': indicator_spec('sma', (20,)),
+            'sma_50': indicator_spec('sma', (50,)),
+            'sma_200': indicator_spec('sma', (200,)),
+            'volume_sma_5': indicator_spec('volume_sma', (5,)),
+            'volume_ma_20': indicator_spec('volume_sma', (20,)),
+            'volume_sma_50': indicator_spec('volume_sma', (50,)),
+            'tr': (('high', 'low', 'close'), calculate_tr),
+            # ATR reuses the tr column instead of recomputing true range
+            'atr': indicator_spec('atr', (14,)),
+            'rsi': indicator_spec('rsi', (14,)),
+            'candle_return': (('open', 'close'), calculate_candle_return)
         }
+        self.cache = cache
         
         self.available_columns = [
             'open', 'high', 'low', 'close', 'volume',
             *self.base_indicators.keys()
         ]
+
+    def lookup(self, name):
+        """(cache key, dependencies, function) for a built-in or parameterized indicator, or None"""
+        if name == 'volume_ma_20':
+            return ('volume_sma', (20,)), *self.base_indicators[name]
+        if name in ('tr', 'candle_return'):
+            return (name, ()), *self.base_indicators[name]
+        parsed = parse_indicator(name)
+        if parsed is None:
+            return None
+        return parsed, *indicator_spec(*parsed)
+
+    def is_available(self, name):
+        return name in self.available_columns or self.lookup(name) is not None
+
+    def resolve(self, required, custom_indicators=None):
+        """
+        Names of the built-in and custom indicators needed to produce the
+        required columns, dependencies first.
+        """
+        custom_by_name = {indicator['name']: indicator for indicator in custom_indicators or []}
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order or name in visiting:
+                return
+            visiting.add(name)
+            if name in custom_by_name:
+                deps = (custom_by_name[name]['op1'], custom_by_name[name]['op2'])
+            else:
+                spec = self.lookup(name)
+                if spec is None:
+                    # Raw candle column (or unknown, reported when the strategy reads it)
+                    return
+                deps = spec[1]
+            for dep in deps:
+                visit(dep)
+            order.append(name)
+
+        for name in required:
+            visit(name)
+        return order
+
+    def compute(self, df, name, dataset_key=None):
+        """Add one built-in/parameterized indicator column, served from the cache when possible"""
+        cache_key, _, func = self.lookup(name)
+        if dataset_key is not None and self.cache is not None:
+            key = (dataset_key, len(df)) + cache_key
+            values = self.cache.get(key)
+            if values is None:
+                values = pd.Series(func(df)).to_numpy(dtype=float)
+                self.cache.put(key, values)
+            df[name] = values
+        else:
+            df[name] = func(df)
         
     def calculate_custom_indicator(self, df, indicator_def):
         """
@@ -170,9 +312,9 @@ class IndicatorCalculator:
         """
         try:
             # Validate operands
-            if indicator_def['op1'] not in self.available_columns:
+            if not self.is_available(indicator_def['op1']):
                 raise ValueError(f"Invalid operand 1: {indicator_def['op1']}. Must be one of {self.available_columns}")
-            if indicator_def['op2'] not in self.available_columns:
+            if not self.is_available(indicator_def['op2']):
                 raise ValueError(f"Invalid operand 2: {indicator_def['op2']}. Must be one of {self.available_columns}")
                 
             op1_values = df[indicator_def['op1']]
@@ -195,19 +337,36 @@ class IndicatorCalculator:
             print(f"Error calculating custom indicator {indicator_def['name']}: {e}")
             return None
 
-    def add_indicators(self, df, custom_indicators=None):
-        """Add both built-in and custom indicators to dataframe"""
-        # First calculate all built-in indicators
-        for name, func in self.base_indicators.items():
+    def add_indicators(self, df, custom_indicators=None, required=None, dataset_key=None):
+        """
+        Add built-in and custom indicators to dataframe.
+        With required (e.g. Strategy.required_columns()), only those columns
+        and what they depend on are computed; otherwise the base set is.
+        dataset_key (symbol, interval, start, end) enables the shared indicator cache.
+        """
+        custom_names = {indicator['name'] for indicator in custom_indicators or []}
+        if required is None:
+            order = self.resolve(list(self.base_indicators) + list(custom_names), custom_indicators)
+        else:
+            order = self.resolve(required, custom_indicators)
+
+        # First calculate built-in indicators, dependencies before dependants
+        for name in order:
+            if name in custom_names:
+                continue
             try:
-                df[name] = func(df)
+                self.compute(df, name, dataset_key)
             except Exception as e:
                 print(f"Error calculating built-in indicator {name}: {e}")
                 df[name] = None
                 
-        # Then calculate custom indicators if any
+        # Then calculate custom indicators, ones they read before them
         if custom_indicators:
-            for indicator in custom_indicators:
+            custom_by_name = {indicator['name']: indicator for indicator in custom_indicators}
+            for name in order:
+                if name not in custom_by_name:
+                    continue
+                indicator = custom_by_name[name]
                 try:
                     # print(indicator)
                     result = self.calculate_custom_indicator(df, indicator)
@@ -218,4 +377,4 @@ class IndicatorCalculator:
                 except Exception as e:
                     print(f"Error adding custom indicator {indicator['name']}: {e}")
                     
-        return df
\ No newline at end of file
+        return df
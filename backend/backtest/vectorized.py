@@ -0,0 +1,72 @@
+from backtest.backtest import execute_trade
+from backtest.kernels import EXIT_REASONS, risk_params, simulate_trades, sweep_risk_params
+
+
+def kernel_inputs(df, strategy):
+    """Close prices, entry/exit signal masks and (with intrabar fills) the bar arrays the exit kernel reads"""
+    bars = {}
+    if strategy.execution.intrabar:
+        bars = {
+            'bar_open': df['open'].to_numpy(dtype=float),
+            'high': df['high'].to_numpy(dtype=float),
+            'low': df['low'].to_numpy(dtype=float),
+        }
+    return df['close'].to_numpy(dtype=float), strategy.entry_mask(df), strategy.exit_mask(df), bars
+
+
+def record_trades(coin_object, strategy, kernel_result):
+    """Enter and exit coin_object's trades from simulate_trades output, priced by the strategy's execution model"""
+    df = coin_object.df
+    entries, exits, reasons, exit_prices = kernel_result
+    # Looked up for all trades at once; per-trade .iloc calls dominated long runs
+    entry_prices = df['close'].to_numpy()[entries]
+    entry_times = df['close time'].iloc[entries].tolist()
+    exit_times = df['close time'].iloc[exits[exits != -1]].tolist()
+
+    for i, (reason, exit_price) in enumerate(zip(reasons, exit_prices)):
+        coin_object.enter_trade(entry_prices[i], entry_times[i])
+        # The last trade is still open at the end of the data
+        if i == len(exit_times):
+            break
+
+        trade_result = execute_trade(
+            entry_price=coin_object.entry_price,
+            exit_price=exit_price,
+            entry_time=coin_object.entry_time,
+            exit_time=exit_times[i],
+            exit_reason=EXIT_REASONS[reason],
+            execution=strategy.execution
+        )
+        coin_object.exit_trade(trade_result, trade_result['profit_percentage'])
+        strategy.reset_risk_manager()
+
+
+def run_vectorized_backtest(coin_object, strategy, implementation=None):
+    """
+    Vectorized equivalent of calling backtest_strategy on every row of coin_object.df.
+    Conditions are evaluated as whole-column masks, then the path-dependent exits
+    (trailing stops, intrabar fills) are resolved for all trades by the exit kernel.
+    implementation picks the kernel (see simulate_trades).
+    """
+    close, entry_signals, exit_signals, bars = kernel_inputs(coin_object.df, strategy)
+    result = simulate_trades(
+        close, entry_signals, exit_signals, risk_params(strategy.risk_manager),
+        intrabar=strategy.execution.intrabar, implementation=implementation, **bars
+    )
+    record_trades(coin_object, strategy, result)
+
+
+def run_risk_sweep(coin_objects, strategies):
+    """
+    run_vectorized_backtest for strategies that differ only in their risk management,
+    each with its own coin over the same frame. The conditions are evaluated once
+    and the exit kernel is swept over every strategy's risk settings.
+    """
+    strategy = strategies[0]
+    close, entry_signals, exit_signals, bars = kernel_inputs(coin_objects[0].df, strategy)
+    results = sweep_risk_params(
+        close, entry_signals, exit_signals, [risk_params(s.risk_manager) for s in strategies],
+        intrabar=strategy.execution.intrabar, **bars
+    )
+    for coin_object, variant, result in zip(coin_objects, strategies, results):
+        record_trades(coin_object, variant, result)
@@ -0,0 +1,156 @@
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from backtest.candle_store import CandleStore
+from backtest.data import load_indicator_frame
+from backtest.optimizer import (
+    SharedFrame, backtest_trades, evaluate_grid, expand_grid, grid_required_columns, rank_results
+)
+from backtest.report_generator import ReportGenerator
+
+
+def make_windows(n_rows, in_sample, out_of_sample, step=None, anchored=False):
+    """
+    Rolling (is_start, is_stop, oos_start, oos_stop) row ranges, stops exclusive.
+    anchored keeps every in-sample slice starting at row 0.
+    """
+    step = step or out_of_sample
+    if in_sample < 1 or out_of_sample < 1:
+        raise ValueError("in_sample and out_of_sample must be at least 1 bar")
+    if step < out_of_sample:
+        raise ValueError("step must be at least out_of_sample, or out-of-sample windows would overlap")
+
+    windows = []
+    is_start = 0
+    while is_start + in_sample + out_of_sample <= n_rows:
+        is_stop = is_start + in_sample
+        windows.append((0 if anchored else is_start, is_stop, is_stop, is_stop + out_of_sample))
+        is_start += step
+    if not windows:
+        raise ValueError(f"Not enough candles ({n_rows}) for one {in_sample}+{out_of_sample} bar window")
+    return windows
+
+
+# Set in each worker process by _init_worker
+_shared_frame = None
+_combinations = None
+
+
+def _init_worker(spec, combinations):
+    global _shared_frame, _combinations
+    _shared_frame = SharedFrame.attach(spec)
+    _combinations = combinations
+
+
+def _metrics(trades):
+    return ReportGenerator(trades, initial_balance=1).calculate_basic_metrics()
+
+
+def evaluate_window(frame, window, combinations, metric):
+    """Optimize on the in-sample slice, then trade the best params on the out-of-sample slice"""
+    is_start, is_stop, oos_start, oos_stop = window
+    in_sample = frame(is_start, is_stop)
+    best = rank_results(evaluate_grid(in_sample, combinations), metric)[0]
+    best_config = next(config for params, config in combinations if params == best["params"])
+
+    # The out-of-sample slice still sits on indicators computed over the whole series
+    out_of_sample = frame(oos_start, oos_stop)
+    oos_trades = backtest_trades(out_of_sample, best_config)
+    open_times = frame(is_start, oos_stop)['open time']
+    return {
+        "in_sample": {"start": open_times.iloc[0], "end": open_times.iloc[is_stop - is_start - 1], "bars": is_stop - is_start},
+        "out_of_sample": {"start": open_times.iloc[oos_start - is_start], "end": open_times.iloc[-1], "bars": oos_stop - oos_start},
+        "best_params": best["params"],
+        "in_sample_metrics": best["metrics"],
+        "out_of_sample_metrics": _metrics(oos_trades),
+        "trades": oos_trades
+    }
+
+
+def _evaluate_window(args):
+    window, metric = args
+    return evaluate_window(_shared_frame.frame, window, _combinations, metric)
+
+
+def stitch_equity(window_results, initial_balance=1):
+    """Compound every out-of-sample trade in order into one equity curve"""
+    equity = initial_balance
+    curve = []
+    for result in window_results:
+        for trade in result["trades"]:
+            equity *= 1 + trade['profit_percentage'] / 100
+            curve.append({"time": trade['exit_time'], "equity": equity})
+    return curve
+
+
+def run_walk_forward(df, combinations, windows, metric='total_return', max_workers=None):
+    """Evaluate windows for expand_grid combinations in parallel over one shared copy of the indicator frame"""
+    shared = SharedFrame.create(df)
+    try:
+        mp_context = multiprocessing.get_context('spawn')
+        workers = max_workers or int(os.getenv('OPTIMIZER_WORKERS', os.cpu_count() or 2))
+        workers = max(1, min(workers, len(windows)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(shared.spec, combinations)) as pool:
+            window_results = list(pool.map(_evaluate_window, [(window, metric) for window in windows]))
+    finally:
+        shared.unlink()
+
+    oos_trades = [trade for result in window_results for trade in result["trades"]]
+    return {
+        "metric": metric,
+        "windows": window_results,
+        "equity_curve": stitch_equity(window_results),
+        "out_of_sample_metrics": _metrics(oos_trades)
+    }
+
+
+def walk_forward(config, param_grid, candle_store, settings, metric='total_return', max_workers=None):
+    """
+    settings: {"in_sample": bars, "out_of_sample": bars, "step": bars, "anchored": false}.
+    Indicators for every grid variant are computed once over start_date..end_date.
+    """
+    combinations = expand_grid(config, param_grid)
+    df = load_indicator_frame(config, candle_store, required=grid_required_columns(combinations))
+    windows = make_windows(
+        len(df),
+        int(settings['in_sample']),
+        int(settings['out_of_sample']),
+        int(settings['step']) if settings.get('step') else None,
+        settings.get('anchored', False)
+    )
+    return run_walk_forward(df, combinations, windows, metric, max_workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward optimization over rolling windows")
+    parser.add_argument('config', help="Strategy config JSON (same format as POST /api/backtest)")
+    parser.add_argument('grid', help='JSON mapping config paths to value lists or {"start", "stop", "step"} ranges')
+    parser.add_argument('--in-sample', type=int, required=True, help="In-sample bars per window")
+    parser.add_argument('--out-of-sample', type=int, required=True, help="Out-of-sample bars per window")
+    parser.add_argument('--step', type=int, default=None, help="Bars between windows (default: out-of-sample)")
+    parser.add_argument('--anchored', action='store_true', help="Grow the in-sample slice from the first bar")
+    parser.add_argument('--metric', default='total_return', help="Basic metric to optimize")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    with open(args.grid) as f:
+        param_grid = json.load(f)
+
+    settings = {
+        "in_sample": args.in_sample,
+        "out_of_sample": args.out_of_sample,
+        "step": args.step,
+        "anchored": args.anchored
+    }
+    result = walk_forward(config, param_grid, CandleStore(), settings, args.metric, args.workers)
+    print(json.dumps(result, indent=4, default=str))
+
+
+if __name__ == "__main__":
+    main()
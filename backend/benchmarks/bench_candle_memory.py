@@ -0,0 +1,91 @@
+"""
+Compare candle parsing and frame memory before and after the compact dtype layout.
+
+    cd backend && python benchmarks/bench_candle_memory.py --rows 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.candles import KLINE_FIELDS, arrays_to_frame, klines_to_arrays, parse_klines_json
+
+
+def legacy_parse(text):
+    """json.loads + transform_data as it was before the compact layout"""
+    df = pd.DataFrame(json.loads(text), columns=KLINE_FIELDS)
+    numeric_columns = ["open", "high", "low", "close", "volume",
+                      "quote asset volume", "number of trades",
+                      "taker buy base asset volume", "taker buy quote asset volume"]
+    for col in numeric_columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df["open time"] = pd.to_datetime(df["open time"], unit="ms")
+    df["close time"] = pd.to_datetime(df["close time"], unit="ms")
+    return df
+
+
+def compact_parse(text):
+    return arrays_to_frame(klines_to_arrays(parse_klines_json(text)))
+
+
+def synthetic_payload(rows, seed=0):
+    """A /api/v3/klines style JSON body: int times and counts, prices and volumes as strings"""
+    rng = np.random.default_rng(seed)
+    open_time = 1_700_000_000_000 + 60_000 * np.arange(rows)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.001, rows))), 4)
+    spread = np.round(np.abs(rng.normal(0, 0.002, rows)) * close, 4)
+    volume = np.round(rng.exponential(1000, rows), 3)
+    trades = rng.integers(1, 5000, rows)
+    klines = [
+        [int(t), f"{c:.4f}", f"{c + s:.4f}", f"{c - s:.4f}", f"{c:.4f}", f"{v:.3f}",
+         int(t) + 59_999, f"{v * c:.4f}", int(n), f"{v / 2:.3f}", f"{v * c / 2:.4f}", "0"]
+        for t, c, s, v, n in zip(open_time.tolist(), close.tolist(), spread.tolist(), volume.tolist(), trades.tolist())
+    ]
+    return json.dumps(klines)
+
+
+def measure(func, text, repeat):
+    """Best wall time over repeat runs, peak traced memory of one run and the frame's footprint"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, result.memory_usage(deep=True).sum(), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'legacy s':>11}{'compact s':>11}{'legacy peak MB':>16}{'compact peak MB':>17}"
+          f"{'legacy frame MB':>17}{'compact frame MB':>18}")
+    for rows in args.rows:
+        text = synthetic_payload(rows)
+        legacy_time, legacy_peak, legacy_bytes, expected = measure(legacy_parse, text, args.repeat)
+        compact_time, compact_peak, compact_bytes, actual = measure(compact_parse, text, args.repeat)
+        for name in ("open", "high", "low", "close"):
+            if not np.array_equal(expected[name].to_numpy(), actual[name].to_numpy()):
+                raise AssertionError(f"{name} differs from the legacy parse")
+        if not np.array_equal(expected["close time"].to_numpy(), actual["close time"].to_numpy(dtype='datetime64[ns]')):
+            raise AssertionError("close time differs from the legacy parse")
+        print(f"{rows:>10}{legacy_time:>11.3f}{compact_time:>11.3f}{legacy_peak / 2**20:>16.1f}"
+              f"{compact_peak / 2**20:>17.1f}{legacy_bytes / 2**20:>17.1f}{compact_bytes / 2**20:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
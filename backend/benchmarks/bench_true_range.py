@@ -0,0 +1,87 @@
+"""
+Compare the NumPy true range / ATR kernels with the previous pandas implementation.
+
+    cd backend && python benchmarks/bench_true_range.py --rows 1000000 2000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.utils import calculate_atr, calculate_tr
+
+
+def legacy_calculate_tr(data):
+    """calculate_tr as it was before the NumPy rewrite"""
+    high = data['high']
+    low = data['low']
+    close = data['close'].shift(1)
+
+    tr1 = high - low
+    tr2 = abs(high - close)
+    tr3 = abs(low - close)
+
+    return pd.DataFrame([tr1, tr2, tr3]).max()
+
+
+def legacy_calculate_atr(data, period=14):
+    return legacy_calculate_tr(data).rolling(window=period).mean()
+
+
+def synthetic_candles(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, rows)))
+    spread = np.abs(rng.normal(0, 0.002, rows)) * close
+    return pd.DataFrame({
+        'open': np.roll(close, 1),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+    })
+
+
+def measure(func, df, repeat):
+    """Best wall time over repeat runs and peak traced memory of one run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        ("tr", legacy_calculate_tr, calculate_tr),
+        ("atr_14", legacy_calculate_atr, calculate_atr),
+    ]
+    print(f"{'case':<8}{'rows':>12}{'legacy s':>12}{'numpy s':>12}{'speedup':>10}{'legacy MB':>12}{'numpy MB':>11}")
+    for rows in args.rows:
+        df = synthetic_candles(rows)
+        for name, legacy, current in cases:
+            legacy_time, legacy_peak, expected = measure(legacy, df, args.repeat)
+            current_time, current_peak, actual = measure(current, df, args.repeat)
+            if not np.allclose(expected.to_numpy(dtype=float), actual.to_numpy(dtype=float), equal_nan=True):
+                raise AssertionError(f"{name} results differ from the legacy implementation")
+            print(f"{name:<8}{rows:>12}{legacy_time:>12.3f}{current_time:>12.3f}"
+                  f"{legacy_time / current_time:>9.1f}x{legacy_peak / 2**20:>12.1f}{current_peak / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Benchmark suite for indicators, both backtest engines and report generation, with JSON baselines.
+
+    cd backend && python benchmarks/suite.py run --datasets clv 10k 1m --output benchmarks/baselines/baseline.json
+    cd backend && python benchmarks/suite.py run --output /tmp/current.json
+    cd backend && python benchmarks/suite.py compare benchmarks/baselines/baseline.json /tmp/current.json
+
+Datasets are the bundled data/CLVUSDT.csv ("clv") and synthetic 1m candles of
+10k, 1m or 10m rows. Strategies come from input.json-style config files
+(--config, default the repository's input.json). Every case gets one untimed
+warm-up call (imports, numba compilation, allocator growth) before it is timed.
+compare exits with status 1 when a case got slower than the baseline by more
+than --threshold and by at least --min-difference seconds.
+
+Timings are only comparable on the machine that produced them: baseline.json
+is a developer reference recorded at the end of a change series, not a CI gate.
+Record a fresh baseline on the machine you compare on.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to Python path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from backtest.backtest import backtest_strategy, iter_rows
+from backtest.main import BacktestContext, Coin
+from backtest.log import TradeEventBuffer
+from backtest.report_generator import ReportGenerator
+from backtest.strategy import Strategy
+from backtest.utils import IndicatorCalculator
+from backtest.vectorized import run_vectorized_backtest
+
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+CLV_PATH = os.path.join(REPO_DIR, 'data', 'CLVUSDT.csv')
+DEFAULT_CONFIG = os.path.join(REPO_DIR, 'input.json')
+SYNTHETIC_ROWS = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+# A case is a regression when it is this much slower than its baseline...
+DEFAULT_THRESHOLD = 0.10
+# ...and by at least this many seconds, so millisecond cases don't trip on noise
+DEFAULT_MIN_DIFFERENCE = 0.005
+
+
+def load_clv():
+    df = pd.read_csv(CLV_PATH)
+    df['open time'] = pd.to_datetime(df['open time'])
+    df['close time'] = pd.to_datetime(df['close time'])
+    return df
+
+
+def synthetic_candles(rows, seed=0):
+    """
+    1m candles in the candle store layout. Prices cycle around 1.0 with noise and
+    occasional jumps, so input.json-style thresholds (sma_20 vs 1.0, 5% candles)
+    keep producing trades at any length.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows)
+    log_close = 0.005 + 0.04 * np.sin(2 * np.pi * t / 240) + rng.normal(0, 0.01, rows)
+    log_close += np.where(rng.random(rows) < 0.005, rng.normal(0, 0.06, rows), 0)
+    close = np.exp(log_close)
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.004, rows)) * close
+    open_time = 1_577_836_800_000 + 60_000 * t
+    volume = rng.exponential(1000, rows)
+    return pd.DataFrame({
+        'open time': open_time.astype('datetime64[ms]'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': volume,
+        'close time': (open_time + 59_999).astype('datetime64[ms]'),
+        'quote asset volume': volume * close,
+        'number of trades': rng.integers(1, 5000, rows).astype(np.int32),
+        'taker buy base asset volume': volume / 2,
+        'taker buy quote asset volume': volume * close / 2,
+    })
+
+
+def load_dataset(name):
+    if name == 'clv':
+        return load_clv()
+    if name in SYNTHETIC_ROWS:
+        return synthetic_candles(SYNTHETIC_ROWS[name])
+    raise ValueError(f"Unknown dataset {name}. Must be 'clv' or one of {list(SYNTHETIC_ROWS)}")
+
+
+def timed(func, setup, repeat):
+    """Wall times of repeat calls of func(setup()), setup excluded, plus the last result"""
+    # Untimed warm-up, so one-off costs (JIT compilation, lazy imports) don't land in the first run
+    with redirect_stdout(io.StringIO()):
+        result = func(setup())
+    timings = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        # The code under test still prints in places; keep that out of the timing output
+        with redirect_stdout(io.StringIO()):
+            result = func(arg)
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def run_engine(df, config, engine):
+    """All trades of one backtest run on an indicator frame"""
+    # Trade events stay unlogged so only the engine itself is measured
+    context = BacktestContext(events=TradeEventBuffer('WARNING'))
+    coin = Coin(config.get('ticker', ''), config.get('ticker', '').upper(), df, context)
+    strategy = Strategy(config)
+    if engine == 'vectorized':
+        run_vectorized_backtest(coin, strategy)
+    else:
+        for row in iter_rows(df):
+            backtest_strategy(coin, row, strategy)
+    return coin.context.all_trades
+
+
+def bundled_insights():
+    """insights_data of the newest report shipped in backend/reports, or None"""
+    paths = sorted(glob.glob(os.path.join(BACKEND_DIR, 'reports', 'report_*.json')), key=os.path.getmtime)
+    if not paths:
+        return None
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def report_builder_case(repeat):
+    """ReportBuilder.save_report (HTML + JSON + PDF) into a scratch directory; None if unavailable"""
+    try:
+        from reports.builder import ReportBuilder
+    except ImportError as e:
+        print(f"Skipping report_builder: {str(e)}")
+        return None
+    insights = bundled_insights()
+    if insights is None:
+        print("Skipping report_builder: no bundled report JSON to render")
+        return None
+
+    output_dir = tempfile.mkdtemp()
+
+    class ScratchReportBuilder(ReportBuilder):
+        @staticmethod
+        def get_reports_dir():
+            return output_dir
+
+    try:
+        timings, _ = timed(lambda builder: builder.save_report(), lambda: ScratchReportBuilder(insights), repeat)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return timings
+
+
+def summarize(timings, **fields):
+    return {"seconds": min(timings), "mean_seconds": float(np.mean(timings)), "runs": timings, **fields}
+
+
+def run_suite(datasets, config_paths, repeat):
+    results = {}
+    for config_path in config_paths:
+        with open(config_path) as f:
+            config = json.load(f)
+        config_name = os.path.splitext(os.path.basename(config_path))[0]
+        required = Strategy(config).required_columns()
+
+        for dataset in datasets:
+            candles = load_dataset(dataset)
+            rows = len(candles)
+            print(f"{config_name} / {dataset}: {rows} rows")
+
+            timings, df = timed(
+                lambda frame: IndicatorCalculator().add_indicators(frame, config.get('custom_indicators'), required),
+                candles.copy, repeat
+            )
+            results[f"indicators/{config_name}/{dataset}"] = summarize(timings, rows=rows)
+            # The full base set, as computed when no strategy narrows it down
+            all_timings, _ = timed(
+                lambda frame: IndicatorCalculator().add_indicators(frame, config.get('custom_indicators')),
+                candles.copy, repeat
+            )
+            results[f"indicators_all/{config_name}/{dataset}"] = summarize(all_timings, rows=rows)
+
+            trades = None
+            for engine in ('loop', 'vectorized'):
+                timings, trades = timed(lambda frame: run_engine(frame, config, engine), lambda: df, repeat)
+                results[f"engine_{engine}/{config_name}/{dataset}"] = summarize(
+                    timings, rows=rows, trades=len(trades), bars_per_second=rows / min(timings)
+                )
+
+            timings, _ = timed(lambda t: ReportGenerator(t, initial_balance=1).generate_full_report(), lambda: trades, repeat)
+            results[f"report/{config_name}/{dataset}"] = summarize(timings, trades=len(trades))
+
+    timings = report_builder_case(repeat)
+    if timings is not None:
+        results["report_builder"] = summarize(timings)
+    return results
+
+
+def run_command(args):
+    results = run_suite(args.datasets, args.config, args.repeat)
+    output = {
+        "created_at": datetime.utcnow().isoformat(),
+        "machine": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    print(f"{'case':<45}{'best s':>12}{'mean s':>12}")
+    for name, result in results.items():
+        print(f"{name:<45}{result['seconds']:>12.4f}{result['mean_seconds']:>12.4f}")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=4)
+        print(f"Saved results to {args.output}")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_difference=DEFAULT_MIN_DIFFERENCE):
+    """
+    (rows of (case, baseline s, current s, ratio, status), regressed?) for cases in both runs.
+    A case only counts as slower or faster when it moved by more than threshold
+    and by more than min_difference seconds.
+    """
+    rows = []
+    regressed = False
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            rows.append((name, None, result["seconds"], None, "new"))
+            continue
+        before = baseline["results"][name]["seconds"]
+        ratio = result["seconds"] / before if before > 0 else float('inf')
+        difference = result["seconds"] - before
+        if ratio > 1 + threshold and difference > min_difference:
+            status = "REGRESSION"
+            regressed = True
+        elif ratio < 1 - threshold and -difference > min_difference:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, before, result["seconds"], ratio, status))
+    for name in baseline["results"]:
+        if name not in current["results"]:
+            rows.append((name, baseline["results"][name]["seconds"], None, None, "missing"))
+    return rows, regressed
+
+
+def compare_command(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows, regressed = compare(baseline, current, args.threshold, args.min_difference)
+
+    print(f"{'case':<45}{'baseline s':>12}{'current s':>12}{'ratio':>9}  status")
+    for name, before, after, ratio, status in rows:
+        before = f"{before:.4f}" if before is not None else "-"
+        after = f"{after:.4f}" if after is not None else "-"
+        ratio = f"{ratio:.2f}x" if ratio is not None else "-"
+        print(f"{name:<45}{before:>12}{after:>12}{ratio:>9}  {status}")
+    if regressed:
+        print(f"Slower than baseline by more than {args.threshold:.0%} and {args.min_difference * 1000:.0f}ms")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the benchmarks and optionally save a JSON result file")
+    run_parser.add_argument('--datasets', nargs='+', default=['clv', '10k'], choices=['clv', *SYNTHETIC_ROWS])
+    run_parser.add_argument('--config', nargs='+', default=[DEFAULT_CONFIG], help="input.json-style strategy configs")
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--output', help="Where to write the JSON results, e.g. benchmarks/baselines/baseline.json")
+    run_parser.set_defaults(handler=run_command)
+
+    compare_parser = commands.add_parser('compare', help="Compare two result files and fail on regressions")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="Allowed slowdown as a fraction (0.1 = 10%%)")
+    compare_parser.add_argument('--min-difference', type=float, default=DEFAULT_MIN_DIFFERENCE,
+                                help="Smallest slowdown in seconds that counts as a regression")
+    compare_parser.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
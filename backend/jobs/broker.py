@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from backtest.instrumentation import registry
+from backtest.pipeline import STAGES, PipelineError, run_backtest_pipeline
+
+
+# Per-worker-process resources, created on first use inside the worker
+_worker_resources = {}
+
+
+def _get_worker_resources():
+    if not _worker_resources:
+        # Imported here so the MongoDB client is only ever created inside the worker
+        from auth.models import Database
+        from backtest.candle_store import CandleStore
+        from models.backtest import BacktestModel
+
+        _worker_resources['backtest_model'] = BacktestModel(Database())
+        _worker_resources['candle_store'] = CandleStore()
+    return _worker_resources
+
+
+class JobProgress:
+    """Records per-stage timings of one job in the shared job table"""
+    def __init__(self, jobs, job_id):
+        self.jobs = jobs
+        self.job_id = job_id
+        self.current_stage = None
+
+    def _update(self, **changes):
+        # Manager dict proxies don't see nested mutation, so write the whole record back
+        job = self.jobs[self.job_id]
+        job.update(changes)
+        self.jobs[self.job_id] = job
+
+    def __call__(self, stage):
+        now = datetime.utcnow().isoformat()
+        job = self.jobs[self.job_id]
+        stages = job['stages']
+        if self.current_stage:
+            stages[self.current_stage].update(status='completed', finished_at=now)
+        stages[stage].update(status='running', started_at=now)
+        self.current_stage = stage
+        self._update(status='running', stage=stage, stages=stages)
+
+    def finish(self, status, **fields):
+        now = datetime.utcnow().isoformat()
+        stages = self.jobs[self.job_id]['stages']
+        if self.current_stage:
+            stages[self.current_stage].update(
+                status='completed' if status == 'completed' else 'failed',
+                finished_at=now
+            )
+        self._update(status=status, stage=None, stages=stages, finished_at=now, **fields)
+
+
+def execute_backtest_job(jobs, job_id, config):
+    """
+    Worker entry point: run the backtest pipeline and record the outcome in the job table.
+    Returns the run's metrics snapshot so the web process can add it to its registry.
+    """
+    progress = JobProgress(jobs, job_id)
+    try:
+        resources = _get_worker_resources()
+        result = run_backtest_pipeline(
+            config,
+            resources['backtest_model'],
+            resources['candle_store'],
+            progress=progress
+        )
+        progress.finish(
+            'completed',
+            message=result.get('message'),
+            backtest_id=result.get('backtest_id'),
+            report_id=result.get('report_id'),
+            report_url=result.get('report_url')
+        )
+        return result.get('metrics')
+    except PipelineError as e:
+        progress.finish('failed', error=e.message)
+        return e.metrics
+    except Exception as e:
+        print(f"Backtest job {job_id} failed: {str(e)}")
+        traceback.print_exc()
+        progress.finish('failed', error=str(e))
+        return None
+
+
+def _record_job_metrics(future):
+    """Done callback in the web process: count a worker's run in the /metrics registry"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    metrics = future.result()
+    if metrics:
+        registry.record(metrics)
+
+
+def new_job(job_id):
+    """Job table record of a queued job, every stage pending"""
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "stage": None,
+        "stages": {stage: {"status": "pending"} for stage in STAGES},
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+class LocalBroker:
+    """
+    Local stand-in for a message broker: jobs are handed to a process pool and
+    their state is kept in a multiprocessing.Manager dict readable from the web process.
+
+    The job table belongs to the web process that created the broker, so the
+    app must run as a single web worker (e.g. gunicorn -w 1 --threads N): with
+    several, a status poll that lands on another worker doesn't find the job.
+    target runs each job in the pool and must be importable by the workers.
+    """
+    def __init__(self, max_workers=None, target=execute_backtest_job):
+        # spawn, not fork: the web process holds threads and a MongoDB client
+        mp_context = multiprocessing.get_context('spawn')
+        self.manager = mp_context.Manager()
+        self.jobs = self.manager.dict()
+        self.pool = ProcessPoolExecutor(
+            max_workers=max_workers or int(os.getenv('BACKTEST_JOB_WORKERS', os.cpu_count() or 2)),
+            mp_context=mp_context
+        )
+        self.target = target
+
+    def submit(self, config):
+        job_id = str(uuid.uuid4())
+        self.jobs[job_id] = new_job(job_id)
+        future = self.pool.submit(self.target, self.jobs, job_id, config)
+        future.add_done_callback(_record_job_metrics)
+        return job_id
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+        self.manager.shutdown()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Start the broker lazily so importing the app doesn't spawn processes"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = LocalBroker()
+    return _broker
@@ -5,14 +5,15 @@ class BacktestModel:
     def __init__(self, db):
         self.collection = db.backtests
 
-    def create_backtest(self, user_id, input_params, results, report_id, insights):
-        """Store backtest results in MongoDB"""
+    def create_backtest(self, user_id, input_params, results, report_id, insights, metrics=None):
+        """Store backtest results in MongoDB (metrics: pipeline stage timings and counters)"""
         backtest = {
             "user_id": user_id,
             "input_params": input_params,
             "results": results,
             "report_id": report_id,
             "insights": insights,
+            "metrics": metrics,
             "created_at": datetime.utcnow(),
             "status": "completed"
         }
@@ -1,21 +1,23 @@
 import uuid
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from auth.routes import token_required
-from agenticAI.insights import generate_insights
 # from reports.builder import save_report
 from models.backtest import BacktestModel
-from backtest.utils import add_technical_indicators, transform_data, fetch_price_history_by_interval
-from backtest.backtest import backtest_strategy
-from backtest.report_generator import ReportGenerator
+from backtest.candle_store import CandleStore
+from backtest.data import parse_time_range
+from backtest.optimizer import optimize
+from backtest.pipeline import PipelineError, run_backtest_pipeline
+from backtest.screener import ALL_USDT_PAIRS, resolve_symbols, screen
+from backtest.walkforward import walk_forward
+from jobs.broker import get_broker
 from datetime import datetime
-from backtest.strategy import Strategy
-from backtest.main import Coin
 import pandas as pd
 import os
 import json
 
 backtest_routes = Blueprint('backtest_routes', __name__)
 backtest_model = None
+candle_store = CandleStore()
 
 def init_routes(db):
     global backtest_model
@@ -25,12 +27,6 @@ def init_routes(db):
     # @token_required
     def run_backtest():
         try:
-            try:
-                Coin.reset()
-            except Exception as e:
-                print(f"Error in Coin.reset(): {str(e)}")
-                return jsonify({"status": "error", "message": f"Error in Coin.reset(): {str(e)}"}), 500
-
             try:
                 config = request.get_json()
                 # print(config)
@@ -39,109 +35,12 @@ def init_routes(db):
                 print(f"Error in parsing request JSON: {str(e)}")
                 return jsonify({"status": "error", "message": f"Error in parsing request JSON: {str(e)}"}), 400
 
-            coins = [config["ticker"]]
-
-            try:
-                start_date_object = datetime.strptime(config['start_date'], "%Y-%m-%d")
-                end_date_object = datetime.strptime(config['end_date'], "%Y-%m-%d")
-            except Exception as e:
-                print(f"Invalid date format: {str(e)}")
-                return jsonify({"status": "error", "message": f"Invalid date format: {str(e)}"}), 400
-
-            start_time = int(start_date_object.timestamp()) * 1000
-            end_time = int(end_date_object.timestamp()) * 1000
-
-            interval = config['interval']
-            coin_objects = []
-
-            for coin in coins:
-                try:
-                    df = None
-                    PAIR = coin.upper()
-                    # if os.path.exists(f'../data/{PAIR}.csv'):
-                    #     df = pd.read_csv(f'../data/{PAIR}.csv')
-                    #     # df = calculate_technical_indicators(df)
-                    # else:
-                    print("Calling fetch data function")
-                    prices = fetch_price_history_by_interval(PAIR, interval, start_time, end_time)
-                    print("Returned from fetch data function")
-                    print("Calling Transform data function")
-                    df = transform_data(prices, PAIR)
-                    print("Returned from transform data function")
-                    # save to file
-                    # df.to_csv(f'../data/{PAIR}.csv', index=False)
-                    coin_objects.append(Coin(coin, PAIR, df))
-                except Exception as e:
-                    print(f"Error handling coin {coin}: {str(e)}")
-                    return jsonify({"status": "error", "message": f"Error handling coin {coin}: {str(e)}"}), 500
-
             try:
-                print("Calling add_technical_indicators function")
-                df = add_technical_indicators(df, config['custom_indicators'])
-                print("Returned from add_technical_indicators function")
-            except Exception as e:
-                print(f"Error adding technical indicators: {str(e)}")
-                return jsonify({"status": "error", "message": f"Error adding technical indicators: {str(e)}"}), 500
+                result = run_backtest_pipeline(config, backtest_model, candle_store)
+            except PipelineError as e:
+                return jsonify({"status": "error", "message": e.message}), e.status_code
 
-            # Run backtest
-            strategy = Strategy(config)
-
-            try:
-                print("Starting backtest...")
-                # Run the backtest
-                for t in range(len(coin_objects[0].df)):
-                    # print(t)
-                    for coin in coin_objects:
-                        current_data = coin.df.iloc[t]
-                        if len(current_data) > 0:
-                            backtest_strategy(coin, current_data, strategy)
-            except Exception as e:
-                print(f"Error during backtest loop: {str(e)}")
-                return jsonify({"status": "error", "message": f"Error during backtest loop: {str(e)}"}), 500
-
-            # Generate report
-            if len(Coin.all_trades) > 0:
-                try:
-                    # print("Helloooooooo")
-                    report_generator = ReportGenerator(Coin.all_trades, initial_balance=1)
-                    report_filename = f"backtest_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                    report_path = f"reports/{report_filename}"
-                    # print("Helloooooooo")
-                    report = report_generator.generate_full_report()
-                    report["symbol"] = config["ticker"]
-                    # save report to file
-                    with open("test.json", 'w') as f:
-                        json.dump(report, f)
-                    insightsAndReportID = generate_insights(report)
-                    report_id = insightsAndReportID['report_id']
-                    # print("Helloooooooo")
-
-                    # Store in MongoDB
-                    backtest_id = backtest_model.create_backtest(
-                        user_id="123",
-                        # user_id=current_user['_id'],
-                        input_params=config,
-                        results=report,
-                        report_id=report_id,
-                        insights=insightsAndReportID['insights']
-                    )
-
-                    return jsonify({
-                        "status": "success",
-                        "backtest_id": backtest_id,
-                        "report_url": f"/report/{report_id}",
-                        "report_id": report_id,
-                        "data": report,
-                        "insights": insightsAndReportID
-                    }), 200
-                except Exception as e:
-                    print(f"Error generating report or saving to database: {str(e)}")
-                    return jsonify({"status": "error", "message": f"Error generating report or saving to database: {str(e)}"}), 500
-            else:
-                return jsonify({
-                    "status": "success",
-                    "message": "No trades generated"
-                }), 200
+            return jsonify(result), 200
 
         except Exception as e:
             print(f"An unexpected error occured!! {str(e)}")
@@ -151,6 +50,147 @@ def init_routes(db):
             }), 500
 
 
+    @backtest_routes.route('/backtest/jobs', methods=['POST'])
+    # @token_required
+    def submit_backtest_job():
+        """
+        Queue a backtest and return immediately; poll the status URL for progress.
+        Jobs are tracked in this process's broker, so serve the app from a single
+        web worker or polls can reach a worker that doesn't know the job.
+        """
+        try:
+            config = request.get_json()
+        except Exception as e:
+            print(f"Error in parsing request JSON: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error in parsing request JSON: {str(e)}"}), 400
+
+        try:
+            job_id = get_broker().submit(config)
+        except Exception as e:
+            print(f"Error queueing backtest job: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error queueing backtest job: {str(e)}"}), 500
+
+        return jsonify({
+            "status": "queued",
+            "job_id": job_id,
+            "status_url": f"/api/backtest/jobs/{job_id}"
+        }), 202
+
+
+    @backtest_routes.route('/backtest/jobs/<job_id>', methods=['GET'])
+    # @token_required
+    def get_backtest_job(job_id):
+        job = get_broker().get(job_id)
+        if not job:
+            return jsonify({
+                "status": "error",
+                "message": "Job not found"
+            }), 404
+
+        return jsonify({
+            "status": "success",
+            "data": job
+        }), 200
+
+
+    @backtest_routes.route('/optimize', methods=['POST'])
+    # @token_required
+    def run_optimization():
+        """Grid-search numeric config fields; body is {"config", "param_grid", "metric", "top"}"""
+        try:
+            body = request.get_json()
+            config = body['config']
+            param_grid = body['param_grid']
+        except Exception as e:
+            print(f"Error in parsing request JSON: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error in parsing request JSON: {str(e)}"}), 400
+
+        try:
+            result = optimize(
+                config,
+                param_grid,
+                candle_store,
+                metric=body.get('metric', 'total_return'),
+                top=body.get('top', 20)
+            )
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except Exception as e:
+            print(f"Error during optimization: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error during optimization: {str(e)}"}), 500
+
+        return jsonify({
+            "status": "success",
+            "data": result
+        }), 200
+
+
+    @backtest_routes.route('/walkforward', methods=['POST'])
+    # @token_required
+    def run_walk_forward():
+        """
+        Walk-forward optimization; body is {"config", "param_grid", "metric",
+        "walk_forward": {"in_sample", "out_of_sample", "step", "anchored"}} with sizes in bars
+        """
+        try:
+            body = request.get_json()
+            config = body['config']
+            param_grid = body['param_grid']
+            settings = body['walk_forward']
+        except Exception as e:
+            print(f"Error in parsing request JSON: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error in parsing request JSON: {str(e)}"}), 400
+
+        try:
+            result = walk_forward(
+                config,
+                param_grid,
+                candle_store,
+                settings,
+                metric=body.get('metric', 'total_return')
+            )
+        except (KeyError, ValueError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except Exception as e:
+            print(f"Error during walk-forward: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error during walk-forward: {str(e)}"}), 500
+
+        return jsonify({
+            "status": "success",
+            "data": result
+        }), 200
+
+
+    @backtest_routes.route('/screen', methods=['POST'])
+    # @token_required
+    def run_screen():
+        """
+        Run one strategy over many symbols; body is {"config", "symbols", "metric"}.
+        Streams one NDJSON line per finished symbol, then the ranked leaderboard.
+        """
+        try:
+            body = request.get_json()
+            config = body['config']
+        except Exception as e:
+            print(f"Error in parsing request JSON: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error in parsing request JSON: {str(e)}"}), 400
+
+        try:
+            parse_time_range(config)
+            symbols = resolve_symbols(body.get('symbols', ALL_USDT_PAIRS))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        except Exception as e:
+            print(f"Error loading symbols: {str(e)}")
+            return jsonify({"status": "error", "message": f"Error loading symbols: {str(e)}"}), 500
+
+        def generate():
+            for entry in screen(config, symbols, candle_store, metric=body.get('metric', 'total_return')):
+                yield json.dumps(entry, default=float) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
     @backtest_routes.route('/backtest/<backtest_id>', methods=['GET'])
     @token_required
     def get_backtest_result(current_user, backtest_id):
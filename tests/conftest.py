@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+# The backend packages (backtest, reports, ...) are imported as top-level modules
+sys.path.insert(0, BACKEND_DIR)
+
+# Bound now, before pytest puts the repo root first on sys.path, where the
+# legacy top-level backtest.py would otherwise shadow the backend package
+import backtest  # noqa: E402,F401
+
+
+@pytest.fixture(autouse=True, scope="session")
+def backend_first_on_path():
+    # Spawned pool workers start from this sys.path and import backtest afresh
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.syspath_prepend(BACKEND_DIR)
+        yield
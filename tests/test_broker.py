@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+# The pipeline imports the insights client, which needs python-dotenv
+pytest.importorskip("dotenv")
+
+STAGES = ['fetch', 'indicators', 'backtest', 'report', 'insights', 'store']
+
+
+def fake_job(jobs, job_id, config):
+    """Broker target run in a spawned worker, standing in for execute_backtest_job"""
+    for stage in STAGES:
+        job = jobs[job_id]
+        job['stages'][stage]['status'] = 'completed'
+        job.update(status='running', stage=stage)
+        jobs[job_id] = job
+    job = jobs[job_id]
+    job.update(status='completed', stage=None, backtest_id=config['backtest_id'])
+    jobs[job_id] = job
+    return {"status": "success", "stages": {"backtest": 0.01}, "counters": {"bars": 100}}
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    from jobs import broker
+    from backtest.instrumentation import MetricsRegistry
+    monkeypatch.setattr(broker, 'registry', MetricsRegistry())
+    return broker
+
+
+def run_job(broker, monkeypatch, pipeline):
+    monkeypatch.setattr(broker, '_get_worker_resources', lambda: {'backtest_model': None, 'candle_store': None})
+    monkeypatch.setattr(broker, 'run_backtest_pipeline', pipeline)
+    jobs = {'job': broker.new_job('job')}
+    return jobs, broker.execute_backtest_job(jobs, 'job', {"symbol": "CLVUSDT"})
+
+
+def test_job_records_each_stage_and_the_result(broker, monkeypatch):
+    def pipeline(config, backtest_model, candle_store, progress):
+        for stage in broker.STAGES:
+            progress(stage)
+        return {"message": "done", "backtest_id": "b1", "report_id": "r1", "report_url": "/r1", "metrics": {"status": "success"}}
+
+    jobs, metrics = run_job(broker, monkeypatch, pipeline)
+    job = jobs['job']
+    assert metrics == {"status": "success"}
+    assert (job['status'], job['stage'], job['backtest_id'], job['report_url']) == ('completed', None, 'b1', '/r1')
+    assert [stage['status'] for stage in job['stages'].values()] == ['completed'] * len(broker.STAGES)
+    assert all(stage['started_at'] <= stage['finished_at'] for stage in job['stages'].values())
+
+
+def test_pipeline_error_fails_the_running_stage(broker, monkeypatch):
+    def pipeline(config, backtest_model, candle_store, progress):
+        progress('fetch')
+        progress('indicators')
+        error = broker.PipelineError("No data found for CLVUSDT", 404)
+        error.metrics = {"status": "error"}
+        raise error
+
+    jobs, metrics = run_job(broker, monkeypatch, pipeline)
+    job = jobs['job']
+    assert metrics == {"status": "error"}
+    assert (job['status'], job['error']) == ('failed', "No data found for CLVUSDT")
+    assert [job['stages'][stage]['status'] for stage in broker.STAGES[:3]] == ['completed', 'failed', 'pending']
+
+
+def test_unexpected_error_fails_the_job(broker, monkeypatch, capsys):
+    def pipeline(config, backtest_model, candle_store, progress):
+        progress('fetch')
+        raise KeyError('close')
+
+    jobs, metrics = run_job(broker, monkeypatch, pipeline)
+    assert metrics is None
+    assert (jobs['job']['status'], jobs['job']['error']) == ('failed', "'close'")
+    assert jobs['job']['stages']['fetch']['status'] == 'failed'
+    assert "Backtest job job failed" in capsys.readouterr().out
+
+
+def test_broker_runs_job_in_worker_and_serves_its_progress(broker):
+    local = broker.LocalBroker(max_workers=1, target=fake_job)
+    try:
+        job_id = local.submit({"backtest_id": "b1"})
+        assert local.get(job_id)['status'] in ('queued', 'running', 'completed')
+        deadline = time.monotonic() + 60
+        while local.get(job_id)['status'] != 'completed':
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        job = local.get(job_id)
+        assert job['backtest_id'] == 'b1'
+        assert list(job['stages']) == broker.STAGES == STAGES
+        assert all(stage['status'] == 'completed' for stage in job['stages'].values())
+        assert local.get('missing') is None
+
+        # The worker's metrics reach the web process registry
+        deadline = time.monotonic() + 10
+        while not broker.registry.runs:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert broker.registry.counters == {'bars': 100}
+    finally:
+        local.shutdown()
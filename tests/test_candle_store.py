@@ -0,0 +1,70 @@
+import io
+import logging
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from backtest.candle_store import CandleStore, merge_ranges, subtract_ranges
+
+MINUTE = 60_000
+START = 1704067200000
+
+
+def test_merge_ranges():
+    assert merge_ranges([]) == []
+    assert merge_ranges([[10, 20], [0, 5]]) == [[0, 5], [10, 20]]
+    # Overlapping, nested and adjacent (touching at +1) ranges collapse
+    assert merge_ranges([[0, 10], [5, 15], [16, 20], [30, 40], [32, 35]]) == [[0, 20], [30, 40]]
+
+
+def test_subtract_ranges():
+    assert subtract_ranges(0, 100, []) == [[0, 100]]
+    assert subtract_ranges(0, 100, [[0, 100]]) == []
+    assert subtract_ranges(10, 20, [[0, 100]]) == []
+    assert subtract_ranges(0, 100, [[20, 30], [50, 60]]) == [[0, 19], [31, 49], [61, 100]]
+    # Ranges outside the request are ignored
+    assert subtract_ranges(40, 55, [[0, 10], [50, 60], [90, 95]]) == [[40, 49]]
+    assert subtract_ranges(0, 10, [[5, 20]]) == [[0, 4]]
+
+
+def fake_klines(symbol, interval, start_time, end_time):
+    """Klines opening within [start_time, end_time], aligned to the minute like Binance's"""
+    open_times = np.arange(-(-start_time // MINUTE) * MINUTE, end_time + 1, MINUTE)
+    return [
+        [t, "1", "2", "0.5", "1.5", "10", t + MINUTE - 1, "15", 3, "4", "6", "0"]
+        for t in open_times
+    ]
+
+
+def test_store_only_fetches_missing_ranges(tmp_path):
+    calls = []
+
+    def fetch(symbol, interval, start_time, end_time):
+        calls.append((start_time, end_time))
+        return fake_klines(symbol, interval, start_time, end_time)
+
+    store = CandleStore(root=str(tmp_path), fetch=fetch)
+    with redirect_stdout(io.StringIO()):
+        store.load("TEST", "1m", START + 10 * MINUTE, START + 19 * MINUTE)
+        arrays = store.load("TEST", "1m", START, START + 29 * MINUTE)
+        store.load("TEST", "1m", START + 5 * MINUTE, START + 25 * MINUTE)
+
+    assert calls == [
+        (START + 10 * MINUTE, START + 19 * MINUTE),
+        (START, START + 10 * MINUTE - 1),
+        # Coverage is kept in open-time milliseconds
+        (START + 19 * MINUTE + 1, START + 29 * MINUTE),
+    ]
+    assert arrays["open time"].tolist() == [START + i * MINUTE for i in range(30)]
+    assert store.missing_ranges("TEST", "1m", START, START + 29 * MINUTE) == []
+
+
+def test_store_logs_instead_of_printing(tmp_path, caplog, capsys):
+    store = CandleStore(root=str(tmp_path), fetch=fake_klines)
+    with caplog.at_level(logging.DEBUG, logger='backtest'):
+        store.get_frame("TEST", "1m", START, START + 9 * MINUTE)
+    assert capsys.readouterr().out == ""
+    assert [record.getMessage() for record in caplog.records] == [
+        f"Fetching TEST 1m candles {START} - {START + 9 * MINUTE}",
+        "Retrieved 10 TEST 1m candles",
+    ]
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pytest
+
+from backtest.candles import KLINE_FIELDS, arrays_to_frame, klines_to_arrays, parse_klines_json
+
+KLINE = [
+    1700000000000, "0.12340000", "0.12400000", "0.12300000", "0.12350000", "12345.60000000",
+    1700000059999, "1524.12345678", 42, "6000.10000000", "740.12345678", "0"
+]
+
+
+def test_parse_klines_json():
+    values = parse_klines_json(json.dumps([KLINE, KLINE]))
+    assert values.shape == (2, len(KLINE_FIELDS))
+    assert values.dtype == np.float64
+    assert values[0].tolist() == [float(field) for field in KLINE]
+    arrays = klines_to_arrays(values)
+    assert arrays["open time"][0] == 1700000000000
+    assert arrays["number of trades"][0] == 42
+
+
+def test_frame_keeps_condition_columns_exact():
+    # Conditions compare these columns against thresholds, so none may be rounded on the way in
+    values = parse_klines_json(json.dumps([KLINE]))
+    df = arrays_to_frame(klines_to_arrays(values))
+    for i, name in enumerate(KLINE_FIELDS):
+        if name in df and name not in ("open time", "close time"):
+            assert df[name].iloc[0] == values[0, i], name
+
+
+def test_parse_empty_klines():
+    assert parse_klines_json("[]").shape == (0, len(KLINE_FIELDS))
+
+
+@pytest.mark.parametrize("text", [
+    # Truncated mid-row, as from a dropped connection
+    json.dumps([KLINE, KLINE])[:-40],
+    "",
+    # Non-numeric field
+    json.dumps([KLINE[:4] + ["n/a"] + KLINE[5:]]),
+    # A row missing its last field
+    json.dumps([KLINE, KLINE[:-1]]),
+    json.dumps([KLINE[:-1], KLINE[:-1]]),
+    # Binance error payload
+    json.dumps({"code": -1121, "msg": "Invalid symbol."}),
+])
+def test_malformed_klines_raise(text):
+    with pytest.raises(ValueError):
+        parse_klines_json(text)
@@ -0,0 +1,44 @@
+import io
+import random
+import threading
+from contextlib import redirect_stdout
+
+from backtest.differential import condition_columns, indicator_frame, load_candles, random_config, run_reference
+from backtest.main import Coin
+
+
+def test_coins_start_with_their_own_state():
+    first, second = Coin('a', 'A', None), Coin('b', 'B', None)
+    assert first.context is not second.context
+    assert first.trade_history is not second.trade_history
+    assert first.context.all_trades is not second.context.all_trades
+
+
+def test_concurrent_backtests_keep_their_trades_apart():
+    with redirect_stdout(io.StringIO()):
+        df = indicator_frame(load_candles())
+    rng = random.Random(3)
+    columns = condition_columns(df)
+    configs = []
+    expected = []
+    # Two configs that each trade, on different bars
+    while len(configs) < 2:
+        config = random_config(rng, df, columns)
+        trades = run_reference(df, config)
+        if trades and trades not in expected:
+            configs.append(config)
+            expected.append(trades)
+
+    start = threading.Barrier(len(configs))
+    results = [None] * len(configs)
+
+    def run(i):
+        start.wait()
+        results[i] = run_reference(df, configs[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(configs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == expected
@@ -0,0 +1,24 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from backtest.differential import ENGINES, indicator_frame, load_candles, run_differential
+
+CONFIGS_PER_SEED = 25
+
+
+@pytest.fixture(scope="module")
+def indicator_df():
+    with redirect_stdout(io.StringIO()):
+        return indicator_frame(load_candles())
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_engine_matches_reference_loop(indicator_df, engine, seed):
+    result = run_differential(indicator_df, CONFIGS_PER_SEED, seed, [engine])
+    assert result["reference_trades"] > 0
+    assert not result["failures"], "\n".join(
+        f"config {failure['index']}: {failure['diffs'][:5]}" for failure in result["failures"]
+    )
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from backtest.equity import downsample_curve, drawdown_stats, equity_curve, equity_metrics, holding_mask
+
+DAY = np.timedelta64(86_400_000, 'ms')
+
+
+def daily_close_times(n):
+    return np.datetime64('2024-01-01T23:59:59.999') + np.arange(n) * DAY
+
+
+def test_drawdown_stats():
+    equity = np.array([1.0, 1.2, 0.9, 1.0, 1.3, 1.1])
+    max_drawdown, duration, drawdown = drawdown_stats(equity)
+    assert max_drawdown == pytest.approx(25)
+    # Underwater from bar 2 to bar 3, recovered on bar 4
+    assert duration == 2
+    assert drawdown[4] == 0
+    assert drawdown[5] == pytest.approx(1.1 / 1.3 - 1)
+
+
+def test_drawdown_stats_never_recovering():
+    max_drawdown, duration, _ = drawdown_stats(np.array([2.0, 1.5, 1.0, 0.5]))
+    assert max_drawdown == pytest.approx(75)
+    assert duration == 3
+
+
+def test_holding_mask_covers_entry_to_exit_returns():
+    held = holding_mask(8, np.array([1, 5]), np.array([3, 7]))
+    assert held.tolist() == [False, False, True, True, False, False, True, True]
+
+
+def test_equity_curve_matches_trade_returns_at_exits():
+    close = np.array([100.0, 110.0, 121.0, 121.0, 100.0])
+    # Bought on bar 0, sold on bar 2 for +20% after costs instead of the +21% close move
+    equity, held = equity_curve(close, np.array([0]), np.array([2]), trade_returns=[20.0])
+    assert equity.tolist() == pytest.approx([1.0, 1.1, 1.2, 1.2, 1.2])
+    assert held.tolist() == [False, True, True, False, False]
+
+
+def test_equity_metrics():
+    # One year of daily bars doubling the balance, with a 10% dip in the middle
+    equity = 2 ** (np.arange(366) / 365)
+    equity[180:190] *= 0.9
+    held = np.ones(366, dtype=bool)
+    held[:183] = False
+    metrics = equity_metrics(equity, daily_close_times(366), held, traded_value=3.0)
+    assert metrics["total_return"] == 100
+    assert metrics["cagr"] == 100
+    # Measured from the bar-179 peak, one day of growth before the dip
+    max_drawdown = (1 - 0.9 * 2 ** (1 / 365)) * 100
+    assert metrics["max_drawdown"] == round(max_drawdown, 2)
+    assert metrics["max_drawdown_duration_bars"] == 10
+    assert metrics["max_drawdown_duration_days"] == 10
+    assert metrics["calmar_ratio"] == round(100 / max_drawdown, 2)
+    assert metrics["exposure"] == pytest.approx(50, abs=0.2)
+    assert metrics["turnover"] == round(3.0 / equity.mean(), 2)
+
+    returns = equity[1:] / equity[:-1] - 1
+    assert metrics["sharpe_ratio"] == round(returns.mean() / returns.std(ddof=1) * np.sqrt(365), 2)
+
+
+def test_equity_metrics_flat_curve():
+    metrics = equity_metrics(np.ones(10), daily_close_times(10), np.zeros(10, dtype=bool))
+    assert metrics["total_return"] == 0
+    assert metrics["max_drawdown"] == 0
+    assert metrics["sharpe_ratio"] is None
+    assert metrics["sortino_ratio"] is None
+    assert metrics["calmar_ratio"] is None
+    assert equity_metrics(np.ones(1), daily_close_times(1), np.zeros(1, dtype=bool)) == {}
+
+
+def test_downsample_curve_keeps_last_point():
+    equity = np.linspace(1, 2, 1001)
+    curve = downsample_curve(daily_close_times(1001), equity, points=10)
+    assert len(curve) == 10
+    assert curve[0] == {"time": "2024-01-01T23:59:59", "equity": 1.0}
+    assert curve[-1]["equity"] == 2.0
+    assert downsample_curve([], np.array([])) == []
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.execution import ExecutionModel
+from backtest.portfolio import PortfolioData, run_portfolio_backtest
+from backtest.strategy import RiskManager
+
+RISK = RiskManager({
+    "stop_loss": {"type": "fixed", "value": 2, "sign": "%"},
+    "take_profit": {"type": "fixed", "value": 3, "sign": "%"},
+})
+INTRABAR = ExecutionModel({"intrabar": True})
+
+
+@pytest.mark.parametrize("bar, expected", [
+    # (open, high, low)
+    ((100, 102, 99), None),
+    ((100, 101, 97.5), ('stop_loss', 98)),
+    # Gapped below the stop: filled at the open, not the stop
+    ((96, 97, 95), ('stop_loss', 96)),
+    ((101, 104, 100), ('take_profit', 103)),
+    ((105, 106, 104), ('take_profit', 105)),
+    # Both levels inside the range: the stop is assumed to have hit first
+    ((100, 104, 97), ('stop_loss', 98)),
+])
+def test_intrabar_exit(bar, expected):
+    bar_open, high, low = bar
+    result = INTRABAR.intrabar_exit(RISK, 100, bar_open, high, low)
+    if expected is None:
+        assert result is None
+    else:
+        assert result[0] == expected[0]
+        assert result[1] == pytest.approx(expected[1])
+
+
+def test_intrabar_exit_without_fixed_levels():
+    risk_manager = RiskManager({"trailing_stop_loss": {"type": "trailing", "activation": {"value": 1}, "callback": {"value": 1}}})
+    assert INTRABAR.intrabar_exit(risk_manager, 100, 100, 150, 50) is None
+
+
+def test_fill_charges_slippage_and_fees():
+    execution = ExecutionModel({"taker_fee": 0.1, "maker_fee": 0.02, "slippage": 0.05, "intrabar": True})
+    taker = execution.fill(100, 110, 'signal')
+    entry_cost = 100 * 1.0005 * 1.001
+    assert taker["entry_fill"] == pytest.approx(100.05)
+    assert taker["exit_fill"] == pytest.approx(110 * 0.9995)
+    assert taker["profit_percentage"] == pytest.approx((110 * 0.9995 * 0.999 / entry_cost - 1) * 100)
+    # Take-profits rest on the book: no slippage and the maker fee
+    maker = execution.fill(100, 110, 'take_profit')
+    assert maker["exit_fill"] == 110
+    assert maker["profit_percentage"] == pytest.approx((110 * 0.9998 / entry_cost - 1) * 100)
+    assert execution.entry_cost(100) == pytest.approx(entry_cost)
+
+
+def test_default_model_is_free():
+    execution = ExecutionModel({})
+    assert not execution.has_costs
+    assert execution.fill(100, 110)["profit_percentage"] == pytest.approx(10)
+
+
+def test_negative_costs_are_rejected():
+    with pytest.raises(ValueError):
+        ExecutionModel({"slippage": -0.1})
+
+
+def test_portfolio_cash_is_net_of_costs():
+    config = {
+        "entry_conditions": [[{"lhs": "enter", "operator": ">", "rhs": {"type": "number_input", "value": 0.5}}]],
+        "exit_conditions": [[{"lhs": "leave", "operator": ">", "rhs": {"type": "number_input", "value": 0.5}}]],
+        "risk_management": {"stop_loss": {"type": "fixed", "value": 2, "sign": "%"}},
+        "execution": {"taker_fee": 0.1, "slippage": 0.05, "intrabar": True},
+    }
+    close = [100.0, 104.0, 110.0, 100.0, 101.0, 101.0]
+    df = pd.DataFrame({
+        'close time': np.datetime64('2024-01-01T00:00:59.999') + np.arange(6) * np.timedelta64(60_000, 'ms'),
+        'open': close,
+        'high': [c * 1.001 for c in close],
+        # Bar 4 dips through the 2% stop below its 100 entry
+        'low': [99.9, 103.9, 109.9, 99.9, 97.0, 100.9],
+        'close': close,
+        'enter': [1.0, 0, 0, 1.0, 0, 0],
+        'leave': [0, 0, 1.0, 0, 0, 0],
+    })
+    data = PortfolioData.from_frames({'TEST': df}, set(df.columns) - {'close time'})
+    result = run_portfolio_backtest(data, config)
+
+    trades = result["all_trades"]
+    assert [trade['exit_reason'] for trade in trades] == ['signal', 'stop_loss']
+    # The stop level, less slippage
+    assert trades[1]['exit_price'] == pytest.approx(98 * 0.9995)
+    growth = np.prod([1 + trade['profit_percentage'] / 100 for trade in trades])
+    assert result["final_equity"] == pytest.approx(growth)
+    assert sum(trade['pnl'] for trade in trades) == pytest.approx(growth - 1)
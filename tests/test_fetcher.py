@@ -0,0 +1,103 @@
+import io
+import json
+import threading
+from contextlib import redirect_stdout
+
+import numpy as np
+import pytest
+
+from backtest.fetcher import KlineFetcher, RateLimiter
+
+MINUTE = 60_000
+START = 1704067200000
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.text = json.dumps(body if body is not None else [])
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Serves 1m klines for any window, with one repeated candle past each window end"""
+    def __init__(self, rate_limited=0):
+        self.rate_limited = rate_limited
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params):
+        with self._lock:
+            self.requests.append(params)
+            if self.rate_limited:
+                self.rate_limited -= 1
+                return FakeResponse(429, headers={'Retry-After': '0'})
+        open_times = range(params['startTime'], params['endTime'] + MINUTE + 1, MINUTE)
+        body = [[t, "1", "2", "0.5", "1.5", "10", t + MINUTE - 1, "15", 3, "4", "6", "0"] for t in open_times]
+        return FakeResponse(200, body, {'X-MBX-USED-WEIGHT-1M': '10'})
+
+
+class RecordingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__()
+        self.back_offs = []
+
+    def back_off(self, seconds):
+        self.back_offs.append(seconds)
+        super().back_off(seconds)
+
+
+def new_fetcher(session, limiter=None):
+    fetcher = KlineFetcher(max_workers=4, limiter=limiter)
+    fetcher.session = session
+    return fetcher
+
+
+def test_windows_hold_at_most_limit_candles():
+    fetcher = KlineFetcher()
+    end = START + 2500 * MINUTE - 1
+    assert fetcher.windows('1m', START, end) == [
+        (START, START + 1000 * MINUTE - 1),
+        (START + 1000 * MINUTE, START + 2000 * MINUTE - 1),
+        (START + 2000 * MINUTE, end),
+    ]
+    assert fetcher.windows('1m', START, START) == [(START, START)]
+
+
+def test_fetch_orders_and_deduplicates_pages():
+    session = FakeSession()
+    with redirect_stdout(io.StringIO()):
+        klines = new_fetcher(session).fetch('TEST', '1m', START, START + 2500 * MINUTE - 1)
+    assert len(session.requests) == 3
+    open_times = klines[:, 0]
+    assert np.all(np.diff(open_times) == MINUTE)
+    assert open_times[0] == START
+
+
+def test_fetch_backs_off_when_rate_limited():
+    session = FakeSession(rate_limited=2)
+    limiter = RecordingLimiter()
+    with redirect_stdout(io.StringIO()):
+        klines = new_fetcher(session, limiter).fetch('TEST', '1m', START, START + 10 * MINUTE)
+    assert limiter.back_offs == [0, 0]
+    assert len(session.requests) == 3
+    assert len(klines) == 12
+
+
+def test_fetch_raises_when_rate_limited_on_every_retry():
+    session = FakeSession(rate_limited=KlineFetcher.MAX_RETRIES)
+    with redirect_stdout(io.StringIO()), pytest.raises(OSError, match="HTTP 429"):
+        new_fetcher(session).fetch('TEST', '1m', START, START + 10 * MINUTE)
+    assert len(session.requests) == KlineFetcher.MAX_RETRIES
+
+
+def test_limiter_trusts_server_weight():
+    limiter = RateLimiter(capacity=100)
+    limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '90'})
+    assert limiter.tokens <= 10
+    limiter.back_off(30)
+    assert limiter.tokens == 0
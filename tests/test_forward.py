@@ -0,0 +1,98 @@
+import itertools
+import json
+import sys
+import types
+
+import numpy as np
+
+from backtest import forward
+from backtest.forward import BinanceKlineStream
+
+START = 1700000000000
+MINUTE = 60_000
+
+
+def ws_message(i, closed=True):
+    open_time = START + i * MINUTE
+    return json.dumps({"k": {
+        "t": open_time, "T": open_time + MINUTE - 1, "x": closed,
+        "o": "1", "h": "2", "l": "0.5", "c": "1.5", "v": "10",
+        "q": "15", "n": 3, "V": "4", "Q": "6",
+    }})
+
+
+class FakeConnection:
+    def __init__(self, messages, error):
+        self.messages = list(messages)
+        self.error = error
+        self.closed = False
+
+    def recv(self):
+        if not self.messages:
+            raise self.error
+        return self.messages.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeFetcher:
+    def __init__(self, indices):
+        self.indices = indices
+        self.calls = []
+
+    def fetch(self, symbol, interval, start_time, end_time=None):
+        self.calls.append((symbol, interval, start_time))
+        open_times = START + np.array(self.indices) * MINUTE
+        klines = np.ones((len(open_times), 12))
+        klines[:, 0] = open_times
+        klines[:, 6] = open_times + MINUTE - 1
+        return klines
+
+
+def test_kline_stream_reconnects_and_backfills(monkeypatch):
+    websocket = types.ModuleType('websocket')
+
+    class WebSocketException(Exception):
+        pass
+
+    connections = [
+        FakeConnection([ws_message(0, closed=False), ws_message(0)], WebSocketException("connection lost")),
+        OSError("network unreachable"),
+        # Candle 3 closes while backfilling, so it arrives both ways
+        FakeConnection([ws_message(3), ws_message(4)], WebSocketException("connection lost")),
+    ]
+
+    def create_connection(url):
+        connection = connections.pop(0)
+        if isinstance(connection, Exception):
+            raise connection
+        return connection
+
+    websocket.WebSocketException = WebSocketException
+    websocket.create_connection = create_connection
+    monkeypatch.setitem(sys.modules, 'websocket', websocket)
+    sleeps = []
+    monkeypatch.setattr(forward.time, 'sleep', sleeps.append)
+
+    fetcher = FakeFetcher([1, 2, 3])
+    stream = BinanceKlineStream('clvusdt', '1m', fetcher=fetcher)
+    candles = list(itertools.islice(iter(stream), 5))
+
+    open_times = [candle['open time'].value // 1_000_000 for candle in candles]
+    assert open_times == [START + i * MINUTE for i in range(5)]
+    assert fetcher.calls == [('CLVUSDT', '1m', START + MINUTE)]
+    # Backoff doubles while reconnecting fails
+    assert sleeps == [1, 2]
+
+
+def test_kline_stream_backfill_drops_open_candle(monkeypatch):
+    # Halfway through candle 5, which is still open until its close time
+    now = START + 5 * MINUTE + MINUTE // 2
+    monkeypatch.setattr(forward.time, 'time', lambda: now / 1000)
+    fetcher = FakeFetcher([0, 4, 5])
+    stream = BinanceKlineStream('clvusdt', '1m', fetcher=fetcher)
+    assert stream.backfill() == []
+    stream.last_open_time = START - MINUTE
+    assert [open_time for open_time, _ in stream.backfill()] == [START, START + 4 * MINUTE]
+    assert fetcher.calls == [('CLVUSDT', '1m', START)]
@@ -0,0 +1,188 @@
+import io
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.differential import load_candles
+from backtest.utils import (
+    INDICATOR_PATTERNS, MAX_INDICATOR_PERIOD, IndicatorCache, IndicatorCalculator,
+    calculate_atr, calculate_tr, calculate_wilder, parse_indicator,
+)
+
+
+def legacy_calculate_tr(data):
+    """calculate_tr as it was before the NumPy rewrite"""
+    close = data['close'].shift(1)
+    tr1 = data['high'] - data['low']
+    tr2 = abs(data['high'] - close)
+    tr3 = abs(data['low'] - close)
+    return pd.DataFrame([tr1, tr2, tr3]).max()
+
+
+@pytest.fixture(scope="module")
+def candles():
+    return load_candles()
+
+
+def test_true_range_matches_pandas_formula(candles):
+    expected = legacy_calculate_tr(candles)
+    tr = calculate_tr(candles)
+    # First bar has no previous close, so its TR is high - low
+    assert tr.iloc[0] == candles['high'].iloc[0] - candles['low'].iloc[0]
+    np.testing.assert_array_equal(tr.to_numpy(), expected.to_numpy())
+    np.testing.assert_array_equal(
+        calculate_atr(candles, 14).to_numpy(), expected.rolling(window=14).mean().to_numpy()
+    )
+
+
+def test_wilder_matches_recursive_definition():
+    values = pd.Series([3.0, 1.0, 4.0, 1.0, 5.0, 9.0, 2.0, 6.0])
+    period = 3
+    expected = [np.nan, np.nan, (3 + 1 + 4) / 3]
+    for value in values[period:]:
+        expected.append((expected[-1] * (period - 1) + value) / period)
+    np.testing.assert_allclose(calculate_wilder(values, period).to_numpy(), expected, rtol=1e-12)
+    # Too short to seed
+    assert calculate_wilder(values[:2], period).isna().all()
+
+
+@pytest.mark.parametrize("name,expected", [
+    ('sma_37', ('sma', (37,))),
+    ('ema_12', ('ema', (12,))),
+    ('volume_sma_5', ('volume_sma', (5,))),
+    ('rsi', ('rsi', (14,))),
+    ('rsi_7', ('rsi', (7,))),
+    ('atr', ('atr', (14,))),
+    ('atr_21', ('atr', (21,))),
+    ('atr_wilder', ('atr_wilder', (14,))),
+    ('atr_wilder_10', ('atr_wilder', (10,))),
+    ('roc', ('roc', (10,))),
+    ('roc_5', ('roc', (5,))),
+    ('macd', ('macd', (12, 26, 9))),
+    ('macd_5_35_5', ('macd', (5, 35, 5))),
+    ('macd_signal', ('macd_signal', (12, 26, 9))),
+    ('macd_signal_5_35_5', ('macd_signal', (5, 35, 5))),
+    ('macd_hist', ('macd_hist', (12, 26, 9))),
+    ('macd_hist_5_35_5', ('macd_hist', (5, 35, 5))),
+    ('sma_10000', ('sma', (MAX_INDICATOR_PERIOD,))),
+])
+def test_parse_indicator(name, expected):
+    assert parse_indicator(name) == expected
+
+
+def test_every_pattern_is_covered():
+    kinds = {parse_indicator(name)[0] for name in ['sma_1', 'ema_1', 'volume_sma_1', 'rsi', 'atr', 'atr_wilder', 'roc', 'macd', 'macd_signal', 'macd_hist']}
+    assert kinds == set(INDICATOR_PATTERNS)
+
+
+@pytest.mark.parametrize("name", ['sma_0', 'ema_10001', 'rsi_0', 'atr_wilder_0', 'macd_0_26_9', 'macd_hist_12_26_10001'])
+def test_parse_indicator_rejects_out_of_range_periods(name):
+    with pytest.raises(ValueError):
+        parse_indicator(name)
+
+
+@pytest.mark.parametrize("name", ['sma', 'sma_', 'sma_7x', 'wma_5', 'macd_12_26', 'close', 'volume_ma_20', 'rsi_-1'])
+def test_parse_indicator_ignores_unknown_names(name):
+    assert parse_indicator(name) is None
+
+
+def test_resolve_puts_dependencies_first():
+    calculator = IndicatorCalculator(cache=None)
+    assert calculator.resolve(['macd_hist_5_35_5', 'close']) == [
+        'macd_5_35_5', 'macd_signal_5_35_5', 'macd_hist_5_35_5',
+    ]
+    assert calculator.resolve(['atr_wilder_7', 'atr', 'tr']) == ['tr', 'atr_wilder_7', 'atr']
+
+
+def test_resolve_orders_custom_indicators_on_other_indicators():
+    custom = [
+        # Listed before the custom indicator it reads
+        {"name": "band_ratio", "op1": "spread", "oper": "/", "op2": "atr_wilder_7"},
+        {"name": "spread", "op1": "sma_5", "oper": "-", "op2": "ema_9"},
+        {"name": "unused", "op1": "close", "oper": "*", "op2": "rsi"},
+    ]
+    calculator = IndicatorCalculator(cache=None)
+    order = calculator.resolve(['band_ratio'], custom)
+    assert order == ['sma_5', 'ema_9', 'spread', 'tr', 'atr_wilder_7', 'band_ratio']
+
+    df = load_candles().head(300).copy()
+    with redirect_stdout(io.StringIO()):
+        df = calculator.add_indicators(df, custom, required=['band_ratio'])
+    assert 'unused' not in df
+    np.testing.assert_array_equal(df['spread'], df['sma_5'] - df['ema_9'])
+    np.testing.assert_array_equal(df['band_ratio'], df['spread'] / df['atr_wilder_7'])
+
+
+def test_cache_hits_and_misses():
+    cache = IndicatorCache()
+    values = np.arange(4.0)
+    assert cache.get('a') is None
+    cache.put('a', values)
+    assert cache.get('a') is not values
+    np.testing.assert_array_equal(cache.get('a'), values)
+    # The first value put under a key is kept
+    cache.put('a', np.zeros(4))
+    np.testing.assert_array_equal(cache.get('a'), values)
+    assert cache.size == values.nbytes
+    cache.clear()
+    assert cache.get('a') is None and cache.size == 0
+
+
+def test_cache_evicts_least_recently_used_past_budget():
+    cache = IndicatorCache(max_bytes=3 * 80)
+    for key in 'abc':
+        cache.put(key, np.zeros(10))
+    cache.get('a')
+    cache.put('d', np.zeros(10))
+    assert list(cache.entries) == ['c', 'a', 'd']
+    assert cache.size == 3 * 80
+    # A single entry over the budget is still kept
+    cache.put('big', np.zeros(100))
+    assert list(cache.entries) == ['big']
+    assert cache.size == 800
+
+
+def test_cached_arrays_are_read_only():
+    cache = IndicatorCache()
+    values = np.arange(3.0)
+    cache.put('a', values)
+    values[0] = 99
+    cached = cache.get('a')
+    assert cached[0] == 0
+    with pytest.raises(ValueError):
+        cached[0] = 99
+
+    calculator = IndicatorCalculator(cache=cache)
+    df = load_candles().head(50).copy()
+    calculator.compute(df, 'sma_5', dataset_key='clv')
+    expected = df['sma_5'].to_numpy().copy()
+    df.loc[df.index[10], 'sma_5'] = -1
+    np.testing.assert_array_equal(cache.get(('clv', 50, 'sma', (5,))), expected)
+
+
+def test_cache_key_separates_datasets_and_lengths():
+    cache = IndicatorCache()
+    calculator = IndicatorCalculator(cache=cache)
+    candles = load_candles()
+    full = candles.head(100).copy()
+    calculator.compute(full, 'sma_5', dataset_key='clv')
+
+    # Same dataset key, but the candles grew: a miss, not the 100-row column
+    longer = candles.head(120).copy()
+    calculator.compute(longer, 'sma_5', dataset_key='clv')
+    np.testing.assert_array_equal(longer['sma_5'], longer['close'].rolling(5).mean())
+
+    # Same length, different candles under another key
+    shifted = candles.iloc[100:200].reset_index(drop=True).copy()
+    calculator.compute(shifted, 'sma_5', dataset_key='other')
+    np.testing.assert_array_equal(shifted['sma_5'], shifted['close'].rolling(5).mean())
+
+    assert set(cache.entries) == {('clv', 100, 'sma', (5,)), ('clv', 120, 'sma', (5,)), ('other', 100, 'sma', (5,))}
+
+    # A repeat run is served from the cache
+    again = candles.head(100).copy()
+    again['close'] = 0.0
+    calculator.compute(again, 'sma_5', dataset_key='clv')
+    np.testing.assert_array_equal(again['sma_5'], full['sma_5'])
@@ -0,0 +1,50 @@
+from backtest.instrumentation import MetricsRegistry, RunMetrics
+
+
+def test_run_metrics_times_each_stage_once_closed():
+    metrics = RunMetrics()
+    metrics.stage('fetch')
+    metrics.stage('backtest')
+    metrics.count('bars', 1000)
+    metrics.count('bars', 500)
+    metrics.count('condition_evaluations', 3000)
+    snapshot = metrics.finish('success')
+
+    assert snapshot["status"] == 'success'
+    assert list(snapshot["stages"]) == ['fetch', 'backtest']
+    assert snapshot["counters"] == {'bars': 1500, 'condition_evaluations': 3000}
+    # Stages and total are each rounded to the microsecond
+    assert snapshot["total_seconds"] >= sum(snapshot["stages"].values()) - 1e-5
+
+
+def test_repeated_stage_accumulates():
+    metrics = RunMetrics()
+    metrics.stage('report')
+    metrics.stage('store')
+    metrics.stage('report')
+    snapshot = metrics.finish('success')
+    assert set(snapshot["stages"]) == {'report', 'store'}
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.record({
+        "status": "success", "stages": {"backtest": 0.5}, "counters": {"bars": 100},
+        "bars_per_second": 200.0,
+    })
+    registry.record({
+        "status": "error", "stages": {"backtest": 0.05}, "counters": {"bars": 10},
+        "bars_per_second": 1.0,
+    })
+    text = registry.render()
+    lines = text.splitlines()
+    assert 'backtest_runs_total{status="error"} 1' in lines
+    assert 'backtest_runs_total{status="success"} 1' in lines
+    assert 'backtest_stage_seconds_bucket{stage="backtest",le="0.1"} 1' in lines
+    assert 'backtest_stage_seconds_bucket{stage="backtest",le="1"} 2' in lines
+    assert 'backtest_stage_seconds_bucket{stage="backtest",le="+Inf"} 2' in lines
+    assert 'backtest_stage_seconds_count{stage="backtest"} 2' in lines
+    assert 'backtest_bars_total 110' in lines
+    # Failed runs don't overwrite the throughput gauge
+    assert 'backtest_bars_per_second 200.0' in lines
+    assert text.endswith("\n")
@@ -0,0 +1,129 @@
+import io
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.differential import diff_trades, new_coin, run_reference
+from backtest.kernels import EXIT_REASONS, HAS_NUMBA, TAKE_PROFIT, risk_params, simulate_trades
+from backtest.strategy import RiskManager, Strategy
+from backtest.vectorized import run_vectorized_backtest
+
+IMPLEMENTATIONS = [
+    'python',
+    'numpy',
+    pytest.param('compiled', marks=pytest.mark.skipif(not HAS_NUMBA, reason="numba is not installed")),
+]
+
+RISK_CASES = [
+    {},
+    {"stop_loss": {"type": "fixed", "value": 1.5, "sign": "%"}},
+    {"take_profit": {"type": "fixed", "value": 2.5, "sign": "%"}},
+    {
+        "stop_loss": {"type": "fixed", "value": 2, "sign": "%"},
+        "take_profit": {"type": "fixed", "value": 3, "sign": "%"},
+    },
+    {"trailing_stop_loss": {"type": "trailing", "activation": {"value": 1, "sign": "%"}, "callback": {"value": 0.5, "sign": "%"}}},
+    {"trailing_take_profit": {"type": "trailing", "activation": {"value": 1.5, "sign": "%"}, "callback": {"value": 1, "sign": "%"}}},
+    {
+        "stop_loss": {"type": "fixed", "value": 3.5, "sign": "%"},
+        "take_profit": {"type": "fixed", "value": 6, "sign": "%"},
+        "trailing_stop_loss": {"type": "trailing", "activation": {"value": 2, "sign": "%"}, "callback": {"value": 1.5, "sign": "%"}},
+        "trailing_take_profit": {"type": "trailing", "activation": {"value": 1, "sign": "%"}, "callback": {"value": 2, "sign": "%"}},
+    },
+]
+
+EXECUTION_CASES = [
+    {},
+    {"intrabar": True},
+    {"intrabar": True, "taker_fee": 0.04, "maker_fee": 0.02, "slippage": 0.01},
+]
+
+CONFIGS = [
+    {
+        "ticker": "kernel",
+        "entry_conditions": [[{"lhs": "enter", "operator": ">", "rhs": {"type": "number_input", "value": 0.5}}]],
+        "exit_conditions": [[{"lhs": "leave", "operator": ">", "rhs": {"type": "number_input", "value": 0.5}}]],
+        "risk_management": risk_management,
+        "execution": execution,
+    }
+    for risk_management in RISK_CASES
+    for execution in EXECUTION_CASES
+]
+
+
+@pytest.fixture(scope="module")
+def gapped_df():
+    """Random-walk candles where some bars open far from the previous close, with random entry/exit signals"""
+    rng = np.random.default_rng(7)
+    n = 3000
+    gaps = np.where(rng.random(n) < 0.05, rng.normal(0, 0.04, n), 0)
+    bodies = rng.normal(0, 0.01, n)
+    log_close = np.log(100) + np.cumsum(gaps + bodies)
+    close = np.exp(log_close)
+    bar_open = np.exp(log_close - bodies)
+    spread = np.abs(rng.normal(0, 0.006, n))
+    close_time = np.datetime64('2024-01-01T00:00:59.999') + np.arange(n) * np.timedelta64(60_000, 'ms')
+    return pd.DataFrame({
+        'open': bar_open,
+        'high': np.maximum(bar_open, close) * (1 + spread),
+        'low': np.minimum(bar_open, close) * (1 - spread),
+        'close': close,
+        'close time': close_time,
+        'enter': (rng.random(n) < 0.08).astype(float),
+        'leave': (rng.random(n) < 0.03).astype(float),
+    })
+
+
+@pytest.fixture(scope="module")
+def reference_trades(gapped_df):
+    with redirect_stdout(io.StringIO()):
+        return [run_reference(gapped_df, config) for config in CONFIGS]
+
+
+@pytest.mark.parametrize("implementation", IMPLEMENTATIONS)
+@pytest.mark.parametrize("index", range(len(CONFIGS)))
+def test_kernel_matches_reference_loop(gapped_df, reference_trades, implementation, index):
+    coin = new_coin(gapped_df, CONFIGS[index])
+    run_vectorized_backtest(coin, Strategy(CONFIGS[index]), implementation)
+    assert diff_trades(reference_trades[index], coin.context.all_trades) == []
+
+
+def test_cases_cover_every_exit_reason_and_gap_fill(gapped_df, reference_trades):
+    """Guards the equivalence test above against data that never reaches some exit paths"""
+    reasons = {trade['exit_reason'] for trades in reference_trades for trade in trades}
+    assert reasons == set(EXIT_REASONS[1:])
+
+    bar_open = gapped_df.set_index('close time')['open']
+    gap_fills = set()
+    for config, trades in zip(CONFIGS, reference_trades):
+        # Without costs the logged exit price is the raw fill
+        if config["execution"] != {"intrabar": True}:
+            continue
+        for trade in trades:
+            if trade['exit_reason'] in ('stop_loss', 'take_profit') and trade['exit_price'] == bar_open[trade['exit_time']]:
+                gap_fills.add(trade['exit_reason'])
+    assert gap_fills == {'stop_loss', 'take_profit'}
+
+
+def test_fractional_take_profit_is_not_truncated():
+    risk_manager = RiskManager({"take_profit": {"type": "fixed", "value": 1.5, "sign": "%"}})
+    assert risk_manager.take_profit_pct == 1.5
+    # A 1% level (the old int() truncation) would already close the trade at +1.2%
+    assert risk_manager.exit_reason(101.2, 100, 101.2) is None
+    assert risk_manager.exit_reason(101.6, 100, 101.6) == 'take_profit'
+
+
+@pytest.mark.parametrize("implementation", IMPLEMENTATIONS)
+def test_kernel_fractional_take_profit(implementation):
+    params = risk_params(RiskManager({"take_profit": {"type": "fixed", "value": 1.5, "sign": "%"}}))
+    close = np.array([100.0, 101.2, 101.6, 101.0])
+    entry_signals = np.array([True, False, False, False])
+    entries, exits, reasons, exit_prices = simulate_trades(
+        close, entry_signals, np.zeros(4, dtype=bool), params, implementation=implementation
+    )
+    assert entries.tolist() == [0]
+    assert exits.tolist() == [2]
+    assert reasons.tolist() == [TAKE_PROFIT]
+    assert exit_prices.tolist() == [101.6]
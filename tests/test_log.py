@@ -0,0 +1,67 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.log import TradeEventBuffer, read_condition_trace, write_condition_trace
+from backtest.strategy import Strategy
+
+
+def test_buffer_counts_every_event_and_samples_details():
+    buffer = TradeEventBuffer('DEBUG', sample_every=2, max_events=3)
+    for i in range(5):
+        buffer.record('entry', 'TEST', i, 1.0)
+        buffer.record('exit', 'TEST', i, 1.1, reason='signal')
+    assert buffer.counts == {'entry': 5, 'exit:signal': 5}
+    # Every 2nd event of each kind, capped at 3
+    assert [(kind, time) for kind, _, time, _, _ in buffer.events] == [('entry', 0), ('exit', 0), ('entry', 2)]
+
+
+def test_buffer_keeps_no_details_above_debug():
+    buffer = TradeEventBuffer('INFO')
+    buffer.record('entry', 'TEST', 0, 1.0)
+    assert buffer.counts == {'entry': 1}
+    assert buffer.events == []
+
+
+def test_flush_logs_summary_then_clears(caplog):
+    buffer = TradeEventBuffer('DEBUG')
+    buffer.record('entry', 'TEST', 0, 1.0)
+    buffer.record('exit', 'TEST', 1, 1.1, reason='take_profit')
+    with caplog.at_level(logging.DEBUG, logger='backtest'):
+        buffer.flush('TEST')
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages[0] == "TEST trade events: entry=1, exit:take_profit=1"
+    assert "exit TEST 1 @ 1.1 (take_profit)" in messages[1]
+    assert buffer.counts == {} and buffer.events == []
+
+
+def test_invalid_level():
+    with pytest.raises(ValueError):
+        TradeEventBuffer('LOUD')
+
+
+def test_condition_trace_round_trip(tmp_path):
+    strategy = Strategy({
+        "entry_conditions": [[
+            {"lhs": "close", "operator": ">", "rhs": {"type": "number_input", "value": 2}},
+            {"lhs": "close", "operator": "<", "rhs": {"type": "indicator", "indicator": "sma_20"}},
+        ]],
+        "exit_conditions": [[{"lhs": "close", "operator": "<=", "rhs": {"type": "number_input", "value": 1}}]],
+    })
+    close = np.arange(11, dtype=float) % 4
+    df = pd.DataFrame({
+        'close time': np.datetime64('2024-01-01T00:00:59.999') + np.arange(11) * np.timedelta64(60_000, 'ms'),
+        'close': close,
+        'sma_20': np.full(11, 2.5),
+    })
+    path = write_condition_trace(str(tmp_path / 'trace.bin'), strategy, df)
+    header, outcomes = read_condition_trace(path)
+    assert header["conditions"] == [
+        "entry[0][0]: close > 2.0",
+        "entry[0][1]: close < sma_20",
+        "exit[0][0]: close <= 1.0",
+    ]
+    assert header["n_bars"] == 11
+    assert outcomes.tolist() == [(close > 2).tolist(), (close < 2.5).tolist(), (close <= 1).tolist()]
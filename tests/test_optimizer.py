@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import optimizer
+from backtest.differential import load_candles
+from backtest.optimizer import SharedFrame, expand_grid, expand_values, rank_results
+
+CONFIG = {
+    "ticker": "clvusdt",
+    "entry_conditions": [[{"lhs": "close", "operator": ">", "rhs": {"type": "indicator", "indicator": "sma_20"}}]],
+    "exit_conditions": [[{"lhs": "close", "operator": "<", "rhs": {"type": "indicator", "indicator": "sma_20"}}]],
+    "risk_management": {"stop_loss": {"type": "fixed", "value": 2, "sign": "%"}},
+}
+
+
+def test_expand_values():
+    assert expand_values([3, 1, 2]) == [3, 1, 2]
+    assert expand_values({"start": 5, "stop": 20, "step": 5}) == [5, 10, 15, 20]
+    assert expand_values({"start": 1, "stop": 3}) == [1, 2, 3]
+    # Float steps land on the stop instead of drifting past or short of it
+    assert expand_values({"start": 0.1, "stop": 0.3, "step": 0.1}) == [0.1, 0.2, 0.3]
+    assert expand_values({"start": 0.5, "stop": 1.2, "step": 0.25}) == [0.5, 0.75, 1.0]
+    assert expand_values({"start": 3, "stop": 1, "step": 1}) == []
+    with pytest.raises(ValueError):
+        expand_values({"start": 1, "stop": 3, "step": 0})
+
+
+def test_expand_grid_sets_each_combination_on_a_copy():
+    grid = {
+        "risk_management.stop_loss.value": {"start": 0.5, "stop": 1.5, "step": 0.5},
+        "entry_conditions.0.0.rhs.indicator": ["sma_20", "ema_9"],
+    }
+    combinations = expand_grid(CONFIG, grid)
+    assert [params for params, _ in combinations] == [
+        {"risk_management.stop_loss.value": value, "entry_conditions.0.0.rhs.indicator": indicator}
+        for value in [0.5, 1.0, 1.5] for indicator in ["sma_20", "ema_9"]
+    ]
+    for params, variant in combinations:
+        assert variant["risk_management"]["stop_loss"]["value"] == params["risk_management.stop_loss.value"]
+        assert variant["entry_conditions"][0][0]["rhs"]["indicator"] == params["entry_conditions.0.0.rhs.indicator"]
+    assert CONFIG["risk_management"]["stop_loss"]["value"] == 2
+    assert CONFIG["entry_conditions"][0][0]["rhs"]["indicator"] == "sma_20"
+    assert expand_grid(CONFIG, {}) == [({}, CONFIG)]
+
+
+@pytest.mark.parametrize("path", [
+    "risk_management.take_profit.value",
+    "entry_conditions.3.0.rhs.value",
+    "ticker.value",
+    "missing",
+])
+def test_expand_grid_rejects_paths_missing_from_config(path):
+    with pytest.raises(ValueError, match="not found"):
+        expand_grid(CONFIG, {path: [1, 2]})
+
+
+def test_expand_grid_limits_combinations(monkeypatch):
+    monkeypatch.setattr(optimizer, 'MAX_COMBINATIONS', 6)
+    grid = {"risk_management.stop_loss.value": [1, 2, 3], "entry_conditions.0.0.rhs.indicator": ["sma_20", "ema_9"]}
+    assert len(expand_grid(CONFIG, grid)) == 6
+    grid["risk_management.stop_loss.value"].append(4)
+    with pytest.raises(ValueError, match="8 combinations"):
+        expand_grid(CONFIG, grid)
+
+
+def test_shared_frame_round_trip():
+    df = load_candles()
+    df['sma_20'] = df['close'].rolling(20).mean()
+    shared = SharedFrame.create(df)
+    try:
+        attached = SharedFrame.attach(shared.spec)
+        frame = attached.frame()
+        # Every numeric and datetime column, with its own dtype
+        pd.testing.assert_frame_equal(frame, df.reset_index(drop=True))
+        pd.testing.assert_frame_equal(attached.frame(10, 25), df.iloc[10:25].reset_index(drop=True))
+        # Views on the block, not copies
+        assert not frame['close'].to_numpy().flags.owndata
+        attached.close()
+    finally:
+        shared.unlink()
+
+
+def test_rank_results_orders_by_metric_with_failures_last():
+    results = [
+        {"params": {"a": 1}, "metrics": {"total_return": 1.5}},
+        {"params": {"a": 2}, "metrics": {}},
+        {"params": {"a": 3}, "metrics": {"total_return": -4}},
+        {"params": {"a": 4}, "metrics": {}, "error": "bad"},
+        {"params": {"a": 5}, "metrics": {"total_return": 7}},
+        {"params": {"a": 6}, "metrics": {"total_return": 1.5}},
+    ]
+    ranked = rank_results(results)
+    assert [result["params"]["a"] for result in ranked] == [5, 1, 6, 3, 2, 4]
+    assert [result["rank"] for result in ranked] == [1, 2, 3, 4, 5, 6]
+    assert [result["params"]["a"] for result in rank_results(results, top=2)] == [5, 1]
+
+    by_trades = rank_results([
+        {"params": {"a": 1}, "metrics": {"total_trades": 3}},
+        {"params": {"a": 2}, "metrics": {"total_trades": 9}},
+    ], metric='total_trades')
+    assert [result["params"]["a"] for result in by_trades] == [2, 1]
@@ -0,0 +1,71 @@
+import io
+from contextlib import redirect_stdout
+
+import numpy as np
+import pytest
+
+# The pipeline imports the insights client, which needs python-dotenv
+pytest.importorskip("dotenv")
+
+from backtest import pipeline  # noqa: E402
+from backtest.candle_store import CandleStore  # noqa: E402
+from backtest.data import parse_time_range  # noqa: E402
+from backtest.instrumentation import RunMetrics  # noqa: E402
+from backtest.log import TradeEventBuffer  # noqa: E402
+
+HOUR = 3_600_000
+
+CONFIG = {
+    "ticker": "aaausdt",
+    "interval": "1h",
+    "start_date": "2024-01-01",
+    "end_date": "2024-01-08",
+    "entry_conditions": [[{"lhs": "close", "operator": ">", "rhs": {"type": "indicator", "indicator": "sma_7"}}]],
+    "exit_conditions": [[{"lhs": "close", "operator": "<", "rhs": {"type": "indicator", "indicator": "sma_7"}}]],
+}
+
+
+def random_walk_klines(symbol, interval, start_time, end_time):
+    open_times = np.arange(-(-start_time // HOUR) * HOUR, end_time + 1, HOUR)
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, len(open_times))))
+    return [
+        [t, str(c), str(c * 1.005), str(c * 0.995), str(c), "10", t + HOUR - 1, "15", 3, "4", "6", "0"]
+        for t, c in zip(open_times, close)
+    ]
+
+
+@pytest.mark.parametrize("engine", ['loop', 'vectorized'])
+def test_backtest_stage_ends_with_the_engine(tmp_path, monkeypatch, engine):
+    metrics = RunMetrics()
+    stages = []
+
+    def progress(stage):
+        metrics.stage(stage)
+        stages.append(stage)
+
+    calls = []
+    flush = TradeEventBuffer.flush
+    equity = pipeline.single_symbol_equity
+
+    def recording_flush(self, symbol):
+        calls.append(('flush', stages[-1]))
+        return flush(self, symbol)
+
+    def recording_equity(*args):
+        calls.append(('equity', stages[-1]))
+        return equity(*args)
+
+    monkeypatch.setattr(TradeEventBuffer, 'flush', recording_flush)
+    monkeypatch.setattr(pipeline, 'single_symbol_equity', recording_equity)
+
+    config = {**CONFIG, "engine": engine}
+    start_time, end_time = parse_time_range(config)
+    with redirect_stdout(io.StringIO()):
+        trades, _ = pipeline.run_single_symbol(
+            config, CandleStore(str(tmp_path), fetch=random_walk_klines), start_time, end_time, progress, metrics
+        )
+
+    assert trades
+    assert stages == ['fetch', 'indicators', 'backtest', 'report']
+    assert calls == [('flush', 'report'), ('equity', 'report')]
+    assert metrics.counters['bars'] == 7 * 24 + 1
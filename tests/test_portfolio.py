@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.portfolio import PortfolioData, parse_allocation, portfolio_summary, run_portfolio_backtest
+from backtest.report_generator import ReportGenerator
+
+CONFIG = {
+    "entry_conditions": [[{"lhs": "enter", "operator": ">", "rhs": {"type": "number_input", "value": 0.5}}]],
+    "exit_conditions": [[{"lhs": "leave", "operator": ">", "rhs": {"type": "number_input", "value": 0.5}}]],
+}
+
+
+def test_parse_allocation_defaults_to_equal_weight():
+    assert parse_allocation({}, 4) == (4, 0.25)
+    assert parse_allocation({"allocation": {"max_positions": 2}}, 4) == (2, 0.5)
+
+
+def test_parse_allocation_fixed_fraction():
+    assert parse_allocation({"allocation": {"method": "fixed_fraction"}}, 3) == (3, 0.1)
+    assert parse_allocation({"allocation": {"method": "fixed_fraction", "fraction": "0.3", "max_positions": 2}}, 3) == (2, 0.3)
+
+
+@pytest.mark.parametrize("allocation", [
+    {"method": "kelly"},
+    {"max_positions": 0},
+    {"method": "fixed_fraction", "fraction": 0},
+    {"method": "fixed_fraction", "fraction": 1.5},
+])
+def test_parse_allocation_rejects_invalid_settings(allocation):
+    with pytest.raises(ValueError):
+        parse_allocation({"allocation": allocation}, 2)
+
+
+def frame(close, enter, leave, start=0):
+    close_time = np.datetime64('2024-01-01T00:00:59.999') + (start + np.arange(len(close))) * np.timedelta64(60_000, 'ms')
+    return pd.DataFrame({
+        'close time': close_time,
+        'close': np.asarray(close, dtype=float),
+        'enter': np.asarray(enter, dtype=float),
+        'leave': np.asarray(leave, dtype=float),
+    })
+
+
+def portfolio_data():
+    frames = {
+        # Enters on bar 0 at 100, exits on bar 2 at 110
+        'AAA': frame([100, 105, 110, 90], [1, 0, 0, 0], [0, 0, 1, 0]),
+        # Enters on its first candle (bar 1) at 50, exits on bar 3 at 45
+        'BBB': frame([50, 40, 45], [1, 0, 0], [0, 0, 1], start=1),
+    }
+    return PortfolioData.from_frames(frames, {'close', 'enter', 'leave'})
+
+
+def test_aligned_data_marks_missing_bars_nan():
+    data = portfolio_data()
+    assert data.symbols == ['AAA', 'BBB']
+    assert len(data.close_times) == 4
+    assert np.isnan(data.field('close')[0, 1])
+
+
+def test_shared_capital_respects_max_positions():
+    result = run_portfolio_backtest(portfolio_data(), {**CONFIG, "allocation": {"max_positions": 1}})
+    assert [(trade['symbol'], trade['exit_price']) for trade in result["all_trades"]] == [('AAA', 110)]
+    assert result["final_equity"] == pytest.approx(1.1)
+    assert result["open_positions"] == []
+    assert result["condition_evaluations"] == 4 * 2 * 2
+
+
+def test_equal_weight_splits_capital():
+    result = run_portfolio_backtest(portfolio_data(), CONFIG)
+    trades = {trade['symbol']: trade for trade in result["all_trades"]}
+    # BBB enters a bar later with the half AAA left free
+    assert trades['AAA']['allocation'] == pytest.approx(0.5)
+    assert trades['BBB']['allocation'] == pytest.approx(0.5)
+    assert trades['AAA']['pnl'] == pytest.approx(0.05)
+    assert trades['BBB']['pnl'] == pytest.approx(-0.05)
+    assert result["final_equity"] == pytest.approx(1.0)
+
+
+def test_report_return_agrees_with_portfolio_equity():
+    data = portfolio_data()
+    result = run_portfolio_backtest(data, CONFIG)
+    summary = portfolio_summary(data, result)
+    # Compounding +10% and -10% trades as if each used all the capital gives -1%
+    assert ReportGenerator(result["all_trades"]).calculate_basic_metrics()["total_return"] == -1
+    assert summary["basic_metrics"]["total_return"] == round(result["total_return"], 2) == 0
+    assert summary["basic_metrics"]["final_balance"] == pytest.approx(result["final_equity"])
+    # From 1.025 on bar 1 (AAA at 105) to 0.95 on bar 2 (AAA sold at 110, BBB at 40)
+    assert summary["basic_metrics"]["max_drawdown"] == round((1 - 0.95 / 1.025) * 100, 2)
@@ -0,0 +1,172 @@
+import io
+import math
+import random
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.differential import condition_columns, indicator_frame, load_candles, random_config, run_reference
+from backtest.report_generator import ReportGenerator
+
+
+class LegacyReportGenerator:
+    """The per-trade report code TradeColumns replaced, kept as the reference for its output"""
+    def __init__(self, trades):
+        self.trades = trades
+
+    def calculate_basic_metrics(self):
+        if not self.trades:
+            return {}
+        profits = [t.get('profit_percentage', 0) for t in self.trades]
+        winning = [p for p in profits if p > 0]
+        losing = [p for p in profits if p <= 0]
+        cumulative_returns = np.cumprod(1 + np.array(profits) / 100) - 1
+        return {
+            "total_trades": len(self.trades),
+            "winning_trades": len(winning),
+            "losing_trades": len(losing),
+            "win_rate": round(len(winning) / len(self.trades) * 100, 2),
+            "average_profit": round(np.mean(profits), 2),
+            "largest_win": round(max(profits), 2),
+            "largest_loss": round(min(profits), 2),
+            "average_win": round(np.mean(winning), 2) if winning else 0,
+            "average_loss": round(np.mean(losing), 2) if losing else 0,
+            "total_return": round(cumulative_returns[-1] * 100, 2),
+        }
+
+    def calculate_time_based_metrics(self):
+        empty = {"monthly_metrics": {}, "best_month": None, "worst_month": None}
+        if not self.trades:
+            return empty
+        df = pd.DataFrame(self.trades)
+        df['exit_time'] = pd.to_datetime(df['exit_time'], errors='coerce')
+        df = df.dropna(subset=['exit_time'])
+        if df.empty:
+            return empty
+        df['month'] = df['exit_time'].dt.to_period('M')
+        monthly_returns = {}
+        for month, group in df.groupby('month'):
+            monthly_returns[str(month)] = {
+                "return": round(sum(group.get('profit_percentage', 0)), 2),
+                "trades": len(group),
+                "win_rate": round(len(group[group['profit_percentage'] > 0]) / len(group), 2),
+            }
+        return {
+            "monthly_metrics": monthly_returns,
+            "best_month": max(monthly_returns.items(), key=lambda x: x[1]['return'])[0],
+            "worst_month": min(monthly_returns.items(), key=lambda x: x[1]['return'])[0],
+        }
+
+    def analyze_trade_patterns(self):
+        if not self.trades:
+            return {"trade_details": [], "pattern_metrics": {}}
+        trade_details = [
+            {
+                "profit_percentage": round(trade.get('profit_percentage', 0), 2),
+                "profit_size": self.classify_profit_size(trade.get('profit_percentage', 0)),
+                "trade_duration": self.calculate_trade_duration(trade),
+            }
+            for trade in self.trades
+        ]
+        df = pd.DataFrame(trade_details)
+        sizes = ['large_win', 'medium_win', 'small_win', 'small_loss', 'medium_loss', 'large_loss']
+        keys = ['large_wins', 'medium_wins', 'small_wins', 'small_losses', 'medium_losses', 'large_losses']
+        return {
+            "trade_details": trade_details,
+            "pattern_metrics": {
+                "profit_distribution": {key: len(df[df['profit_size'] == size]) for key, size in zip(keys, sizes)}
+            },
+        }
+
+    def classify_profit_size(self, profit_pct):
+        if profit_pct > 20:
+            return "large_win"
+        elif profit_pct > 10:
+            return "medium_win"
+        elif profit_pct > 0:
+            return "small_win"
+        elif profit_pct > -10:
+            return "small_loss"
+        elif profit_pct > -20:
+            return "medium_loss"
+        return "large_loss"
+
+    def calculate_trade_duration(self, trade):
+        duration = pd.to_datetime(trade['exit_time']) - pd.to_datetime(trade['entry_time'])
+        parts = ""
+        if duration.days > 0:
+            parts += f"{duration.days}d"
+        if duration.seconds // 3600 > 0:
+            parts += f"{duration.seconds // 3600}h"
+        if (duration.seconds % 3600) // 60 > 0:
+            parts += f"{(duration.seconds % 3600) // 60}m"
+        return parts or "0m"
+
+    def generate_full_report(self):
+        return {
+            "basic_metrics": self.calculate_basic_metrics(),
+            "time_metrics": self.calculate_time_based_metrics(),
+            "trade_analysis": self.analyze_trade_patterns(),
+        }
+
+
+def normalized(value):
+    """Numbers as floats with NaN made comparable, so numpy and Python scalars compare equal"""
+    if isinstance(value, dict):
+        return {key: normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalized(item) for item in value]
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return 'nan' if math.isnan(value) else float(value)
+    return value
+
+
+@pytest.fixture(scope="module")
+def real_trades():
+    with redirect_stdout(io.StringIO()):
+        df = indicator_frame(load_candles())
+        rng = random.Random(5)
+        columns = condition_columns(df)
+        trade_logs = [run_reference(df, random_config(rng, df, columns)) for _ in range(10)]
+    trade_logs = [trades for trades in trade_logs if trades]
+    assert trade_logs
+    return trade_logs
+
+
+def trade(profit, entry='2024-01-01 00:00', exit='2024-01-01 05:30'):
+    return {
+        "profit_percentage": profit,
+        "entry_time": pd.Timestamp(entry),
+        "exit_time": pd.Timestamp(exit),
+    }
+
+
+EDGE_CASES = {
+    "no_trades": [],
+    "all_losses": [trade(-1.5), trade(-12, exit='2024-02-03 00:01'), trade(-25), trade(0)],
+    "nan_profit": [trade(3), trade(float('nan'), exit='2024-01-02 07:00'), trade(-4, exit='2024-03-01 00:00')],
+    "large_wins": [trade(35, exit='2024-01-09 23:59'), trade(15), trade(0.01)],
+}
+
+
+def assert_same_report(trades):
+    with redirect_stdout(io.StringIO()):
+        report = ReportGenerator(trades).generate_full_report()
+    assert normalized(report) == normalized(LegacyReportGenerator(trades).generate_full_report())
+
+
+def test_report_matches_per_trade_code_on_real_trades(real_trades):
+    for trades in real_trades:
+        assert_same_report(trades)
+
+
+@pytest.mark.parametrize("case", EDGE_CASES)
+def test_report_matches_per_trade_code_on_edge_cases(case):
+    assert_same_report(EDGE_CASES[case])
+
+
+def test_nan_profit_is_neither_win_nor_loss():
+    metrics = ReportGenerator(EDGE_CASES["nan_profit"]).calculate_basic_metrics()
+    assert (metrics["total_trades"], metrics["winning_trades"], metrics["losing_trades"]) == (3, 1, 1)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from backtest.candles import KLINE_COLUMNS
+from backtest.resample import TimeframeStore, bucket_start, resample_arrays
+
+MINUTE = 60_000
+# 2024-01-01 00:00 UTC, a Monday
+START = 1704067200000
+
+
+def minute_arrays(n, start=START):
+    rng = np.random.default_rng(3)
+    open_times = start + np.arange(n, dtype=np.int64) * MINUTE
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return {
+        "open time": open_times,
+        "open": close - rng.normal(0, 0.5, n),
+        "high": close + rng.random(n),
+        "low": close - rng.random(n),
+        "close": close,
+        "volume": rng.random(n),
+        "close time": open_times + MINUTE - 1,
+        "quote asset volume": rng.random(n),
+        "number of trades": rng.integers(0, 50, n),
+        "taker buy base asset volume": rng.random(n),
+        "taker buy quote asset volume": rng.random(n),
+    }
+
+
+def test_resample_arrays_aggregates_each_bucket():
+    base = minute_arrays(60)
+    resampled = resample_arrays(base, "15m")
+    assert resampled["open time"].tolist() == [START + i * 15 * MINUTE for i in range(4)]
+    assert resampled["close time"].tolist() == [START + (i + 1) * 15 * MINUTE - 1 for i in range(4)]
+    for i in range(4):
+        rows = slice(i * 15, (i + 1) * 15)
+        assert resampled["open"][i] == base["open"][rows][0]
+        assert resampled["high"][i] == base["high"][rows].max()
+        assert resampled["low"][i] == base["low"][rows].min()
+        assert resampled["close"][i] == base["close"][rows][-1]
+        assert resampled["volume"][i] == pytest.approx(base["volume"][rows].sum())
+        assert resampled["number of trades"][i] == base["number of trades"][rows].sum()
+    assert [resampled[name].dtype for name, _ in KLINE_COLUMNS] == [np.dtype(dtype) for _, dtype in KLINE_COLUMNS]
+
+
+def test_resample_arrays_drops_incomplete_trailing_bucket():
+    resampled = resample_arrays(minute_arrays(50), "15m")
+    assert len(resampled["open time"]) == 3
+
+
+def test_resample_arrays_keeps_bucket_with_missing_minutes_inside():
+    # Exchange outages leave gaps; the bucket is complete once its last minute is in
+    base = minute_arrays(30)
+    keep = np.r_[0:5, 10:30]
+    resampled = resample_arrays({name: values[keep] for name, values in base.items()}, "15m")
+    assert len(resampled["open time"]) == 2
+    assert resampled["open"][0] == base["open"][0]
+
+
+def test_resample_arrays_empty():
+    resampled = resample_arrays(minute_arrays(0), "1h")
+    assert all(len(values) == 0 for values in resampled.values())
+
+
+def test_weekly_buckets_open_on_monday():
+    # Thursday 1970-01-01 falls in the week opening Monday 1969-12-29
+    assert bucket_start(np.int64(0), "1w") == -3 * 86_400_000
+    assert bucket_start(np.int64(START + 3 * 86_400_000), "1w") == START
+
+
+class GrowingCandleStore:
+    """1m candle store stand-in whose data grows like a live store's"""
+    root = "memory"
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def load(self, symbol, interval, start_time, end_time):
+        open_times = self.arrays["open time"]
+        lo = np.searchsorted(open_times, start_time, side='left')
+        hi = np.searchsorted(open_times, end_time, side='right')
+        return {name: values[lo:hi] for name, values in self.arrays.items()}
+
+
+def test_timeframe_cache_sees_new_base_candles():
+    base = minute_arrays(120, start=START + 7 * 86_400_000)
+    start, end = int(base["open time"][0]), int(base["open time"][0]) + 2 * 3_600_000
+    store = GrowingCandleStore({name: values[:50] for name, values in base.items()})
+    timeframes = TimeframeStore(store)
+    assert len(timeframes.load("TEST", "15m", start, end)["open time"]) == 3
+
+    store.arrays = base
+    assert len(timeframes.load("TEST", "15m", start, end)["open time"]) == 8
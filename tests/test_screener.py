@@ -0,0 +1,141 @@
+import io
+import json
+import os
+from contextlib import redirect_stdout
+
+import numpy as np
+import pytest
+
+from backtest import screener
+from backtest.candle_store import CandleStore
+from backtest.data import load_indicator_frame, parse_time_range
+from backtest.optimizer import evaluate_config, rank_results
+from backtest.screener import resolve_symbols, screen
+
+HOUR = 3_600_000
+
+CONFIG = {
+    "ticker": "aaausdt",
+    "interval": "1h",
+    "start_date": "2024-01-01",
+    "end_date": "2024-01-05",
+    "entry_conditions": [[{"lhs": "close", "operator": ">", "rhs": {"type": "indicator", "indicator": "sma_7"}}]],
+    "exit_conditions": [[{"lhs": "close", "operator": "<", "rhs": {"type": "indicator", "indicator": "sma_7"}}]],
+}
+SYMBOLS = ['AAAUSDT', 'BBBUSDT', 'CCCUSDT']
+
+
+def exchange_info(*symbols):
+    return {"symbols": [
+        {"symbol": symbol, "quoteAsset": quote, "status": status} for symbol, quote, status in symbols
+    ]}
+
+
+def test_resolve_symbols_list():
+    assert resolve_symbols(['btcusdt', 'ETHUSDT', 'BTCUSDT']) == ['BTCUSDT', 'ETHUSDT']
+    with pytest.raises(ValueError):
+        resolve_symbols([])
+    with pytest.raises(ValueError, match="Invalid symbols"):
+        resolve_symbols('btcusdt')
+
+
+def test_resolve_all_usdt_pairs_from_cached_exchange_info(tmp_path, monkeypatch):
+    monkeypatch.setenv('CANDLE_STORE_DIR', str(tmp_path / 'candles'))
+    with open(tmp_path / 'exchange_info.json', 'w') as f:
+        json.dump(exchange_info(
+            ('ETHUSDT', 'USDT', 'TRADING'),
+            ('BTCUSDT', 'USDT', 'TRADING'),
+            ('ETHBTC', 'BTC', 'TRADING'),
+            ('LUNAUSDT', 'USDT', 'BREAK'),
+        ), f)
+
+    def download(url):
+        raise AssertionError("a fresh cache must not be downloaded again")
+
+    monkeypatch.setattr(screener.requests, 'get', download)
+    assert resolve_symbols('ALL_USDT') == ['BTCUSDT', 'ETHUSDT']
+
+
+def test_stale_exchange_info_is_downloaded(tmp_path, monkeypatch):
+    path = str(tmp_path / 'exchange_info.json')
+    with open(path, 'w') as f:
+        json.dump(exchange_info(('OLDUSDT', 'USDT', 'TRADING')), f)
+    os.utime(path, (0, 0))
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return exchange_info(('NEWUSDT', 'USDT', 'TRADING'))
+
+    monkeypatch.setattr(screener.requests, 'get', lambda url: Response())
+    with redirect_stdout(io.StringIO()):
+        info = screener.load_exchange_info(path)
+    assert screener.usdt_pairs(info) == ['NEWUSDT']
+    with open(path) as f:
+        assert json.load(f) == info
+
+
+def random_walk_klines(seed):
+    def fetch(symbol, interval, start_time, end_time):
+        open_times = np.arange(-(-start_time // HOUR) * HOUR, end_time + 1, HOUR)
+        rng = np.random.default_rng(seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(open_times))))
+        return [
+            [t, str(c), str(c * 1.005), str(c * 0.995), str(c), "10", t + HOUR - 1, "15", 3, "4", "6", "0"]
+            for t, c in zip(open_times, close)
+        ]
+    return fetch
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Candles for every screened symbol already on disk, so workers never download"""
+    start_time, end_time = parse_time_range(CONFIG)
+    with redirect_stdout(io.StringIO()):
+        for seed, symbol in enumerate(SYMBOLS):
+            CandleStore(str(tmp_path), fetch=random_walk_klines(seed)).update(symbol, '1h', start_time, end_time)
+    return CandleStore(str(tmp_path), fetch=None)
+
+
+def test_screen_streams_results_then_ranked_leaderboard(store):
+    with redirect_stdout(io.StringIO()):
+        entries = list(screen(CONFIG, [symbol.lower() for symbol in SYMBOLS], store, max_workers=2))
+        expected = {
+            symbol: evaluate_config(load_indicator_frame(CONFIG, store, symbol), CONFIG) for symbol in SYMBOLS
+        }
+
+    progress, final = entries[:-1], entries[-1]
+    assert sorted(entry["symbol"] for entry in progress) == SYMBOLS
+    assert [entry["completed"] for entry in progress] == [1, 2, 3]
+    assert all(entry["total"] == 3 and "error" not in entry for entry in progress)
+    for entry in progress:
+        assert entry["metrics"] == expected[entry["symbol"]]
+
+    returns = {symbol: metrics["total_return"] for symbol, metrics in expected.items()}
+    assert len(set(returns.values())) == 3
+    assert final["metric"] == 'total_return'
+    assert [entry["symbol"] for entry in final["leaderboard"]] == sorted(returns, key=returns.get, reverse=True)
+    assert [entry["rank"] for entry in final["leaderboard"]] == [1, 2, 3]
+
+
+def test_leaderboard_puts_failed_symbols_last():
+    results = [
+        {"symbol": 'AAAUSDT', "metrics": {}, "error": "No data"},
+        {"symbol": 'BBBUSDT', "metrics": {"win_rate": 40.0}},
+        {"symbol": 'CCCUSDT', "metrics": {"win_rate": 55.5}},
+    ]
+    leaderboard = rank_results(results, 'win_rate')
+    assert [entry["symbol"] for entry in leaderboard] == ['CCCUSDT', 'BBBUSDT', 'AAAUSDT']
+
+
+def test_worker_fetches_with_its_own_limiter(tmp_path, monkeypatch):
+    from backtest import utils
+    shared = utils.kline_fetcher.limiter
+    monkeypatch.setattr(screener, '_candle_store', None)
+    screener._init_worker(str(tmp_path), 4)
+    fetcher = screener._candle_store.fetch.__self__
+    assert utils.kline_fetcher.limiter is shared
+    assert fetcher.limiter is not shared
+    assert fetcher.limiter.capacity == shared.capacity // 4
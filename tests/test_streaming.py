@@ -0,0 +1,73 @@
+import io
+import pickle
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.backtest import iter_rows
+from backtest.candles import FRAME_DTYPES
+from backtest.differential import load_candles
+from backtest.streaming import IncrementalIndicatorEngine
+from backtest.utils import IndicatorCalculator
+
+NAMES = [
+    'sma_7', 'sma_20', 'ema_9', 'ema_21', 'volume_sma_5', 'volume_ma_20', 'rsi_14',
+    'tr', 'atr_14', 'atr_wilder_14', 'macd_12_26_9', 'macd_signal_12_26_9', 'macd_hist_12_26_9',
+    'roc_10', 'candle_return',
+]
+
+
+def flat_candles(n=600):
+    """Candles with long runs of an unchanged close, where rolling means must come out exact"""
+    rng = np.random.default_rng(11)
+    steps = np.where(rng.random(n) < 0.15, rng.normal(0, 0.002, n), 0)
+    close = np.round(0.1 + np.cumsum(steps), 4)
+    open_time = np.datetime64('2024-01-01T00:00') + np.arange(n) * np.timedelta64(60_000, 'ms')
+    return pd.DataFrame({
+        'open time': open_time,
+        'open': close,
+        'high': close + 0.0001,
+        'low': close - 0.0001,
+        'close': close,
+        'volume': rng.exponential(100, n),
+        'close time': open_time + np.timedelta64(59_999, 'ms'),
+        'quote asset volume': rng.exponential(10, n),
+        'number of trades': rng.integers(1, 100, n),
+        'taker buy base asset volume': rng.exponential(50, n),
+        'taker buy quote asset volume': rng.exponential(5, n),
+    }).astype(FRAME_DTYPES)
+
+
+def zero_price_candles():
+    """Candles that open or close at 0, where ROC and candle returns divide by zero"""
+    df = flat_candles(300)
+    df.loc[[50, 51, 120], ['open', 'low', 'close']] = 0.0
+    df.loc[200, 'open'] = 0.0
+    return df
+
+
+@pytest.mark.parametrize("candles", [load_candles, flat_candles, zero_price_candles], ids=['clv', 'flat', 'zero'])
+def test_streaming_matches_batch_indicators_exactly(candles):
+    df = candles()
+    with redirect_stdout(io.StringIO()):
+        batch = IndicatorCalculator().add_indicators(df.copy(), required=NAMES)
+    engine = IncrementalIndicatorEngine(NAMES)
+    streamed = pd.DataFrame([engine.update(candle) for candle in iter_rows(df)])
+    for name in NAMES:
+        # Bit-for-bit, so conditions on equal values (close > sma_7 on a flat run) agree
+        np.testing.assert_array_equal(streamed[name].to_numpy(dtype=float), batch[name].to_numpy(dtype=float), err_msg=name)
+
+
+def test_engine_resumes_after_pickling():
+    candles = list(iter_rows(flat_candles(200)))
+    engine = IncrementalIndicatorEngine(NAMES)
+    expected = [engine.update(candle) for candle in candles][-1]
+
+    engine = IncrementalIndicatorEngine(NAMES)
+    engine.warm_up(candles[:120])
+    resumed = pickle.loads(pickle.dumps(engine))
+    values = resumed.warm_up(candles[120:])
+    assert [values[name] for name in NAMES] == pytest.approx([expected[name] for name in NAMES], nan_ok=True)
+
@@ -0,0 +1,113 @@
+import io
+from contextlib import redirect_stdout
+
+import pandas as pd
+import pytest
+
+from backtest.differential import load_candles
+from backtest.optimizer import expand_grid, grid_required_columns
+from backtest.utils import IndicatorCalculator
+from backtest.walkforward import evaluate_window, make_windows, run_walk_forward, stitch_equity
+
+CONFIG = {
+    "ticker": "clvusdt",
+    "entry_conditions": [[{"lhs": "close", "operator": ">", "rhs": {"type": "indicator", "indicator": "sma_20"}}]],
+    "exit_conditions": [[{"lhs": "close", "operator": "<", "rhs": {"type": "indicator", "indicator": "sma_20"}}]],
+    "risk_management": {"stop_loss": {"type": "fixed", "value": 2, "sign": "%"}},
+}
+GRID = {
+    "entry_conditions.0.0.rhs.indicator": ["sma_7", "sma_20", "ema_9"],
+    "risk_management.stop_loss.value": [1, 3],
+}
+
+
+def test_rolling_windows_slide_by_step():
+    windows = make_windows(100, 30, 10)
+    assert windows[:2] == [(0, 30, 30, 40), (10, 40, 40, 50)]
+    assert windows[-1] == (60, 90, 90, 100)
+    for is_start, is_stop, oos_start, oos_stop in windows:
+        assert (is_stop - is_start, oos_stop - oos_start) == (30, 10)
+        # Testing starts right where training stops
+        assert oos_start == is_stop
+    # Out-of-sample windows tile the series after the first training slice
+    assert all(a[3] == b[2] for a, b in zip(windows, windows[1:]))
+
+
+def test_anchored_windows_grow_from_first_bar():
+    windows = make_windows(100, 30, 10, anchored=True)
+    assert [window[:2] for window in windows] == [(0, stop) for stop in range(30, 100, 10)]
+    assert [window[2:] for window in windows] == [(stop, stop + 10) for stop in range(30, 100, 10)]
+
+
+def test_wider_step_leaves_gaps_but_never_overlaps():
+    windows = make_windows(100, 20, 10, step=25)
+    assert windows == [(0, 20, 20, 30), (25, 45, 45, 55), (50, 70, 70, 80)]
+    assert all(a[3] <= b[2] for a, b in zip(windows, windows[1:]))
+
+
+@pytest.mark.parametrize("args", [(100, 30, 10, 5), (100, 0, 10), (100, 30, 0), (39, 30, 10)])
+def test_invalid_windows(args):
+    with pytest.raises(ValueError):
+        make_windows(*args)
+
+
+def test_stitched_equity_compounds_across_windows():
+    window_results = [
+        {"trades": [{"profit_percentage": 10, "exit_time": 1}, {"profit_percentage": -5, "exit_time": 2}]},
+        {"trades": []},
+        {"trades": [{"profit_percentage": 20, "exit_time": 5}]},
+    ]
+    curve = stitch_equity(window_results, initial_balance=100)
+    assert [point["time"] for point in curve] == [1, 2, 5]
+    # No reset at window boundaries: each point builds on the one before
+    assert [point["equity"] for point in curve] == pytest.approx([110, 104.5, 125.4])
+    assert stitch_equity([{"trades": []}]) == []
+
+
+@pytest.fixture(scope="module")
+def walk():
+    combinations = expand_grid(CONFIG, GRID)
+    with redirect_stdout(io.StringIO()):
+        df = IndicatorCalculator(cache=None).add_indicators(
+            load_candles(), required=grid_required_columns(combinations)
+        )
+        windows = make_windows(len(df), 400, 150)
+        result = run_walk_forward(df, combinations, windows, max_workers=2)
+    return df, combinations, windows, result
+
+
+def test_walk_forward_trades_each_out_of_sample_window(walk):
+    df, combinations, windows, result = walk
+    assert len(result["windows"]) == len(windows)
+    for window, window_result in zip(windows, result["windows"]):
+        is_start, is_stop, oos_start, oos_stop = window
+        assert window_result["in_sample"] == {
+            "start": df['open time'].iloc[is_start], "end": df['open time'].iloc[is_stop - 1], "bars": is_stop - is_start,
+        }
+        assert window_result["out_of_sample"]["start"] == df['open time'].iloc[oos_start]
+        assert window_result["out_of_sample"]["end"] == df['open time'].iloc[oos_stop - 1]
+        for trade in window_result["trades"]:
+            assert df['open time'].iloc[oos_start] <= pd.Timestamp(trade['entry_time']) <= df['close time'].iloc[oos_stop - 1]
+
+    # A worker's window matches the same window evaluated in this process
+    def frame(start=0, stop=None):
+        return df.iloc[start:stop].reset_index(drop=True)
+
+    with redirect_stdout(io.StringIO()):
+        local = evaluate_window(frame, windows[1], combinations, 'total_return')
+    assert local["best_params"] == result["windows"][1]["best_params"]
+    assert local["out_of_sample_metrics"] == result["windows"][1]["out_of_sample_metrics"]
+
+
+def test_walk_forward_equity_is_continuous(walk):
+    _, _, _, result = walk
+    trades = [trade for window in result["windows"] for trade in window["trades"]]
+    curve = result["equity_curve"]
+    assert len(trades) > 0 and len(curve) == len(trades)
+    equity = 1
+    for trade, point in zip(trades, curve):
+        equity *= 1 + trade['profit_percentage'] / 100
+        assert point["equity"] == pytest.approx(equity)
+    assert [point["time"] for point in curve] == sorted(point["time"] for point in curve)
+    assert result["out_of_sample_metrics"]["total_trades"] == len(trades)
+    assert result["out_of_sample_metrics"]["total_return"] == round((curve[-1]["equity"] - 1) * 100, 2)